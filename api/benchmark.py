@@ -0,0 +1,270 @@
+import json
+import random
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from .models import Prompt, Comment, prepare_new
+
+# --- Endpoint Benchmarks ---
+# Drives every API route through the Django test client and records latency
+# percentiles, DB query counts, DB time and response sizes per scenario. Used by
+# the `benchmark` management command; results are plain dicts so runs can be
+# written out as JSON and diffed across commits.
+#
+# Scenarios write to the cache (capacity counters, version bumps, cached
+# responses), so run them under isolated_caches(): the configured backends
+# with a key prefix of their own, as the command does.
+
+BENCHMARK_KEY_PREFIX = 'benchmark'
+
+
+def isolated_caches():
+    """CACHES with every alias moved under BENCHMARK_KEY_PREFIX (same backends)."""
+    return {
+        alias: {**config, 'KEY_PREFIX': f"{config.get('KEY_PREFIX', '')}{BENCHMARK_KEY_PREFIX}"}
+        for alias, config in settings.CACHES.items()
+    }
+
+
+class QueryTimer:
+    """connection.execute_wrapper() hook counting queries and their wall time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class Scenario:
+    """
+    One benchmarked request. `build(fixtures, rng)` runs untimed before every
+    request and returns `(path, data, headers)`; it may create the rows the
+    request needs (e.g. something to delete).
+    """
+
+    def __init__(self, name, method, build):
+        self.name = name
+        self.method = method
+        self.build = build
+
+
+def percentile(sorted_values, pct):
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(values, scale=1):
+    values = sorted(value * scale for value in values)
+    return {
+        'p50': round(percentile(values, 50), 3),
+        'p95': round(percentile(values, 95), 3),
+        'p99': round(percentile(values, 99), 3),
+        'mean': round(sum(values) / len(values), 3),
+        'max': round(values[-1], 3),
+    }
+
+
+# --- Fixtures ---
+def load_fixtures(rng, sample_size=200):
+    """Picks the ids, tags and words the scenarios draw from (from existing data)."""
+    prompt_rows = list(Prompt.objects.order_by('random_key').values_list('prompt_id', 'modification_code', 'title')[:sample_size])
+    if not prompt_rows:
+        raise ValueError("The database has no prompts to benchmark against.")
+    commented = list(
+        Prompt.objects.filter(comment_count__gt=5).order_by('random_key').values_list('prompt_id', flat=True)[:sample_size]
+    )
+    comments = list(Comment.objects.filter(prompt_id__in=commented[:20]).values_list('comment_id', flat=True)[:sample_size])
+    tags = [tag for tag, _ in Prompt.objects.tag_counts(order='count', limit=50)]
+    words = [word for _, _, title in prompt_rows for word in title.split() if len(word) > 3]
+    page_count = max(Prompt.objects.count() // 10, 1)
+    return {
+        'prompts': prompt_rows,
+        'commented': commented or [row[0] for row in prompt_rows],
+        'comments': comments,
+        'tags': tags or ['python'],
+        'words': words or ['prompt'],
+        'deep_page': max(page_count // 2, 1),
+    }
+
+
+def _typo(word, rng):
+    index = rng.randrange(len(word))
+    return word[:index] + word[index + 1:] if len(word) > 4 else word
+
+
+def _new_prompt(**fields):
+    prompt = prepare_new(Prompt(title='Benchmark prompt', content='Benchmark content.', tags=['benchmark'], **fields))
+    prompt.save()
+    return prompt
+
+
+def _new_comment(prompt_id):
+    return Comment.objects.create(prompt_id=prompt_id, content='Benchmark comment.')
+
+
+def _get(path, **params):
+    def build(fixtures, rng):
+        resolved = {key: value(fixtures, rng) if callable(value) else value for key, value in params.items()}
+        query = urlencode(resolved) # Words and tags from the data may contain & # % + or spaces
+        return (path(fixtures, rng) if callable(path) else path) + (f'?{query}' if query else ''), None, {}
+    return build
+
+
+def _prompt_url(fixtures, rng):
+    return reverse('api:prompt-detail', kwargs={'prompt_id': rng.choice(fixtures['prompts'])[0]})
+
+
+def _comments_url(fixtures, rng):
+    return reverse('api:comment-list-create', kwargs={'prompt_id': rng.choice(fixtures['commented'])})
+
+
+def default_scenarios():
+    """Every route in api/urls.py, with the list variants that matter for performance."""
+    prompts_url = reverse('api:prompt-list-create')
+    word = lambda fixtures, rng: rng.choice(fixtures['words'])
+    tag = lambda fixtures, rng: rng.choice(fixtures['tags'])
+
+    def conditional_detail(fixtures, rng):
+        path = _prompt_url(fixtures, rng)
+        etag = Client().get(path).headers.get('ETag', '')
+        return path, None, {'HTTP_IF_NONE_MATCH': etag}
+
+    def comment_detail(fixtures, rng):
+        comment_id = rng.choice(fixtures['comments']) if fixtures['comments'] else _new_comment(fixtures['prompts'][0][0]).pk
+        return reverse('api:comment-detail', kwargs={'comment_id': comment_id}), None, {}
+
+    def batch(include=''):
+        def build(fixtures, rng):
+            ids = [str(row[0]) for row in rng.sample(fixtures['prompts'], min(50, len(fixtures['prompts'])))]
+            return reverse('api:prompt-batch') + include, {'ids': ids}, {}
+        return build
+
+    def prompt_create(fixtures, rng):
+        return prompts_url, {'title': 'Benchmark prompt', 'content': 'Benchmark content.', 'tags': ['benchmark']}, {}
+
+    def bulk_create(fixtures, rng):
+        items = [{'title': f'Benchmark bulk {i}', 'content': 'Benchmark content.'} for i in range(20)]
+        return reverse('api:prompt-bulk-create'), items, {}
+
+    def prompt_update(fixtures, rng):
+        prompt = _new_prompt()
+        path = reverse('api:prompt-detail', kwargs={'prompt_id': prompt.pk})
+        return path, {'title': 'Benchmark edit', 'modification_code': prompt.modification_code}, {}
+
+    def prompt_delete(fixtures, rng):
+        prompt = _new_prompt()
+        path = reverse('api:prompt-detail', kwargs={'prompt_id': prompt.pk})
+        return path, {'modification_code': prompt.modification_code}, {}
+
+    def comment_create(fixtures, rng):
+        return _comments_url(fixtures, rng), {'content': 'Benchmark comment.'}, {}
+
+    def comment_write(fixtures, rng):
+        comment = _new_comment(rng.choice(fixtures['commented']))
+        path = reverse('api:comment-detail', kwargs={'comment_id': comment.pk})
+        return path, {'content': 'Benchmark edit.', 'modification_code': comment.modification_code}, {}
+
+    return [
+        Scenario('root', 'get', _get(reverse('api:api-root'))),
+        Scenario('prompt_list', 'get', _get(prompts_url)),
+        Scenario('prompt_list_search', 'get', _get(prompts_url, search=word)),
+        Scenario('prompt_list_search_relevance', 'get', _get(prompts_url, search=word, sort='relevance')),
+        Scenario('prompt_list_search_fuzzy', 'get', _get(prompts_url, search=lambda f, r: _typo(word(f, r), r), fuzzy=1)),
+        Scenario('prompt_list_search_icontains', 'get', _get(prompts_url, search=word, search_mode='icontains')),
+        Scenario('prompt_list_tags', 'get', _get(prompts_url, tags=tag)),
+        Scenario('prompt_list_tags_all', 'get', _get(prompts_url, tags=lambda f, r: f'{tag(f, r)},{tag(f, r)}', tag_mode='all')),
+        Scenario('prompt_list_sort_title', 'get', _get(prompts_url, sort='title_asc')),
+        Scenario('prompt_list_deep_page', 'get', _get(prompts_url, page=lambda f, r: f['deep_page'])),
+        Scenario('prompt_list_cursor', 'get', _get(prompts_url, pagination='cursor', sort='title_asc')),
+        Scenario('prompt_detail', 'get', _get(_prompt_url)),
+        Scenario('prompt_detail_comment_page', 'get', _get(
+            lambda f, r: reverse('api:prompt-detail', kwargs={'prompt_id': r.choice(f['commented'])}), page=2, limit=3
+        )),
+        Scenario('prompt_detail_not_modified', 'get', conditional_detail),
+        Scenario('prompt_create', 'post', prompt_create),
+        Scenario('prompt_bulk_create', 'post', bulk_create),
+        Scenario('prompt_update', 'patch', prompt_update),
+        Scenario('prompt_delete', 'delete', prompt_delete),
+        Scenario('prompt_random', 'get', _get(reverse('api:prompt-random'))),
+        Scenario('prompt_random_count', 'get', _get(reverse('api:prompt-random'), count=10)),
+        Scenario('prompt_export', 'get', _get(reverse('api:prompt-export'), tags=tag)),
+        Scenario('prompt_export_comments', 'get', _get(reverse('api:prompt-export'), tags=tag, include='comments')),
+        Scenario('prompt_batch', 'post', batch()),
+        Scenario('prompt_batch_latest_comments', 'post', batch('?include=latest_comments&n=3')),
+        Scenario('comment_list', 'get', _get(_comments_url)),
+        Scenario('comment_list_cursor', 'get', _get(_comments_url, pagination='cursor')),
+        Scenario('comment_create', 'post', comment_create),
+        Scenario('comment_detail', 'get', comment_detail),
+        Scenario('comment_update', 'patch', comment_write),
+        Scenario('comment_delete', 'delete', comment_write),
+        Scenario('tags', 'get', _get(reverse('api:tag-list'))),
+        Scenario('tags_with_counts', 'get', _get(reverse('api:tag-list'), with_counts='true', order='count', limit=50)),
+        Scenario('tags_prefix', 'get', _get(reverse('api:tag-list'), prefix=lambda f, r: tag(f, r)[:2])),
+        Scenario('cache_test', 'get', _get(reverse('api:cache-test'), key='benchmark')),
+    ]
+
+
+# --- Runner ---
+def run_scenario(scenario, fixtures, rng, iterations=50, warmup=5, client=None):
+    """Runs one scenario and returns its summary dict."""
+    client = client or Client()
+    latencies, query_counts, db_times, sizes, statuses = [], [], [], [], {}
+    path = None
+    for iteration in range(warmup + iterations):
+        path, data, headers = scenario.build(fixtures, rng)
+        request = getattr(client, scenario.method)
+        kwargs = {'content_type': 'application/json', 'data': json.dumps(data)} if data is not None else {}
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            started = time.perf_counter()
+            response = request(path, **kwargs, **headers)
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+            elapsed = time.perf_counter() - started
+        if iteration < warmup:
+            continue
+        latencies.append(elapsed)
+        query_counts.append(timer.count)
+        db_times.append(timer.seconds)
+        sizes.append(len(body))
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    return {
+        'method': scenario.method.upper(),
+        'example_path': path,
+        'iterations': iterations,
+        'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+        'latency_ms': summarize(latencies, scale=1000),
+        'db_time_ms': summarize(db_times, scale=1000),
+        'queries': summarize(query_counts),
+        'response_bytes': summarize(sizes),
+    }
+
+
+def run_benchmarks(scenarios=None, iterations=50, warmup=5, seed=0, only=None, progress=None):
+    """Runs the scenarios (all by default, or the names in `only`). Returns {name: summary}."""
+    rng = random.Random(seed)
+    fixtures = load_fixtures(rng)
+    results = {}
+    for scenario in scenarios or default_scenarios():
+        if only and scenario.name not in only:
+            continue
+        results[scenario.name] = run_scenario(scenario, fixtures, rng, iterations=iterations, warmup=warmup)
+        if progress:
+            progress(scenario.name, results[scenario.name])
+    return results
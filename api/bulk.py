@@ -0,0 +1,241 @@
+import io
+import json
+import datetime
+
+from django.db import connections
+from django.db.models import NOT_PROVIDED
+from django.utils import timezone
+
+# --- Bulk Loading Helpers ---
+# Shared by the management commands that load large files (seed_db and friends).
+# Rows go in with Postgres COPY, or bulk_create as a portable fallback; both
+# skip save() and signals, so callers reconcile counters and caches afterwards.
+# Both keep timestamps already set on the instances (bulk_create's auto_now
+# stamps are put back with one UPDATE per call).
+
+COPY = 'copy'
+BULK_CREATE = 'bulk'
+METHODS = (COPY, BULK_CREATE)
+
+
+# --- Streaming Input ---
+def iter_records(path, chunk_size=1 << 16):
+    """
+    Streams `(kind, record)` pairs from a seed file without loading it whole,
+    where kind is 'prompt' or 'comment'.
+
+    Accepts either a JSON document shaped like seed_data.json
+    (`{"prompts": [...], "comments": [...]}`) or NDJSON, one object per line
+    (`.ndjson`/`.jsonl`), where each object has `"type": "prompt"|"comment"`.
+    Objects without a type are prompts if they have a `title` (so the output of
+    GET /api/prompts/export/ loads as is), otherwise comments if they have a
+    `prompt_id`.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.ndjson', '.jsonl')):
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"Invalid JSON on line {line_number}: {e}") from e
+                kind = record.pop('type', None) or (
+                    'comment' if 'prompt_id' in record and 'title' not in record else 'prompt'
+                )
+                yield kind, record
+        else:
+            sections = {'prompts': 'prompt', 'comments': 'comment'}
+            for key, record in _iter_document_arrays(f, chunk_size):
+                if key in sections:
+                    yield sections[key], record
+
+
+def _iter_document_arrays(f, chunk_size):
+    """
+    Yields `(key, element)` for every element of every top-level array in a JSON
+    object, decoding one element at a time. Non-array values are skipped.
+    """
+    reader = _JSONReader(f, chunk_size)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.decode()
+        reader.expect(':')
+        if reader.peek() == '[':
+            reader.expect('[')
+            if reader.peek() == ']':
+                reader.expect(']')
+            else:
+                while True:
+                    yield key, reader.decode()
+                    if reader.expect(',', ']') == ']':
+                        break
+        else:
+            reader.decode()
+        if reader.expect(',', '}') == '}':
+            return
+
+
+class _JSONReader:
+    """Minimal pull reader over a text file for _iter_document_arrays."""
+    decoder = json.JSONDecoder()
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON input.")
+
+    def expect(self, *chars):
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f"Expected {' or '.join(chars)!r} at offset {self.pos}, found {char!r}.")
+        self.pos += 1
+        return char
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Most likely the value continues past the buffer; read more.
+                if self.eof or not self._fill():
+                    raise
+                continue
+            # A number at the very end of the buffer may still be incomplete.
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+# --- Writing ---
+def insert_objects(model, objs, method=COPY, batch_size=2000, using='default'):
+    """Inserts unsaved model instances with COPY or bulk_create. Returns the row count."""
+    if not objs:
+        return 0
+    if method == BULK_CREATE:
+        # pre_save() stamps auto_now/auto_now_add fields with the current time.
+        preset = {
+            field: [getattr(obj, field.attname) for obj in objs]
+            for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+        }
+        model.objects.using(using).bulk_create(objs, batch_size=batch_size)
+        _restore_timestamps(model, objs, preset, using)
+    else:
+        copy_objects(model, objs, using=using)
+    return len(objs)
+
+
+def _restore_timestamps(model, objs, preset, using):
+    """Puts back the `{field: [value per obj]}` that bulk_create overwrote (None = keep)."""
+    preset = {field: values for field, values in preset.items() if any(value is not None for value in values)}
+    if not preset:
+        return
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    pk = model._meta.pk
+    columns = [pk, *preset]
+    assignments = ', '.join(
+        f'{quote(field.column)} = COALESCE(v.{quote(field.column)}, t.{quote(field.column)})' for field in preset
+    )
+    arrays = ', '.join(f'%s::{field.db_type(connection)}[]' for field in columns)
+    params = [[pk.get_db_prep_value(obj.pk, connection) for obj in objs]]
+    params += [[field.get_db_prep_value(value, connection) for value in values] for field, values in preset.items()]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {quote(model._meta.db_table)} AS t SET {assignments} '
+            f"FROM unnest({arrays}) AS v({', '.join(quote(field.column) for field in columns)}) "
+            f'WHERE t.{quote(pk.column)} = v.{quote(pk.column)}',
+            params,
+        )
+    for field, values in preset.items():
+        for obj, value in zip(objs, values):
+            if value is not None:
+                setattr(obj, field.attname, value)
+
+
+def copy_objects(model, objs, using='default'):
+    """
+    Writes instances with `COPY ... FROM STDIN` (text format). Generated columns
+    and columns with a database default are left to Postgres. Timestamps
+    already set on the instances are kept.
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not field.generated and field.db_default is NOT_PROVIDED
+    ]
+    connection = connections[using]
+    now = timezone.now()
+    buffer = io.StringIO()
+    for obj in objs:
+        values = []
+        for field in fields:
+            value = getattr(obj, field.attname)
+            if value is None and (getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)):
+                value = now
+                setattr(obj, field.attname, value)
+            values.append(_copy_text(field.get_db_prep_save(value, connection)))
+        buffer.write('\t'.join(values))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    # copy_expert() is the driver's own method, so translate its errors to
+    # Django's (DataError, IntegrityError...) by hand.
+    with connection.cursor() as cursor, connection.wrap_database_errors:
+        cursor.copy_expert(f'COPY {table} ({columns}) FROM STDIN', buffer)
+
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _copy_text(value):
+    """Formats one value for COPY's text format."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (list, tuple)):
+        value = _array_literal(value)
+    elif isinstance(value, (datetime.datetime, datetime.date)):
+        value = value.isoformat()
+    elif not isinstance(value, str):
+        value = str(value) # numbers, UUIDs
+    return value.translate(_COPY_ESCAPES)
+
+
+def _array_literal(values):
+    items = []
+    for item in values:
+        if item is None:
+            items.append('NULL')
+        else:
+            escaped = str(item).replace('\\', '\\\\').replace('"', '\\"')
+            items.append(f'"{escaped}"')
+    return '{' + ','.join(items) + '}'
@@ -0,0 +1,86 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django_redis.cache import CONNECTION_INTERRUPTED, RedisCache
+
+from .metrics import record_cache_lookup
+from .timing import CACHE, measure
+
+# --- Timed Cache Backends ---
+# Drop-in replacements for the configured backends that report every cache
+# round trip (our own caching, capacity counters and django-ratelimit alike)
+# to the Server-Timing middleware in api/timing.py, and lookup hits and misses
+# to the metrics registry in api/metrics.py.
+
+_MISSING = object()
+
+
+class TimedCacheMixin:
+    def get(self, key, default=None, version=None, **kwargs):
+        with measure(CACHE):
+            value = super().get(key, _MISSING, version=version, **kwargs)
+        if value is _MISSING:
+            record_cache_lookup(hits=0, misses=1)
+            return default
+        record_cache_lookup(hits=1)
+        return value
+
+    def get_many(self, keys, *args, **kwargs):
+        keys = list(keys)
+        with measure(CACHE):
+            values = super().get_many(keys, *args, **kwargs)
+        if values is None:
+            values = {} # django-redis swallowed a connection error (IGNORE_EXCEPTIONS)
+        record_cache_lookup(hits=len(values), misses=len(keys) - len(values))
+        return values
+
+    def has_key(self, *args, **kwargs):
+        with measure(CACHE):
+            return super().has_key(*args, **kwargs)
+
+    def set(self, *args, **kwargs):
+        with measure(CACHE):
+            return super().set(*args, **kwargs)
+
+    def set_many(self, *args, **kwargs):
+        with measure(CACHE):
+            return super().set_many(*args, **kwargs)
+
+    def add(self, *args, **kwargs):
+        with measure(CACHE):
+            return super().add(*args, **kwargs)
+
+    def touch(self, *args, **kwargs):
+        with measure(CACHE):
+            return super().touch(*args, **kwargs)
+
+    def incr(self, *args, **kwargs):
+        with measure(CACHE):
+            return super().incr(*args, **kwargs)
+
+    def decr(self, *args, **kwargs):
+        with measure(CACHE):
+            return super().decr(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with measure(CACHE):
+            return super().delete(*args, **kwargs)
+
+    def delete_many(self, *args, **kwargs):
+        with measure(CACHE):
+            return super().delete_many(*args, **kwargs)
+
+
+class TimedRedisCache(TimedCacheMixin, RedisCache):
+    # With DJANGO_REDIS_IGNORE_EXCEPTIONS, connection errors are swallowed:
+    # _get() returns CONNECTION_INTERRUPTED, which must count as a miss, never
+    # a hit (whatever the installed version's get() does with it).
+    def _get(self, key, default, version, client):
+        value = super()._get(key, default, version, client)
+        return default if value is CONNECTION_INTERRUPTED else value
+
+
+class TimedLocMemCache(TimedCacheMixin, LocMemCache):
+    def get_many(self, keys, version=None):
+        # LocMemCache inherits BaseCache.get_many(), which calls get() per key;
+        # those calls already record the hits and misses.
+        with measure(CACHE):
+            return LocMemCache.get_many(self, keys, version=version)
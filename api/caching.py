@@ -0,0 +1,80 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import urlencode
+
+# --- Versioned Cache Helpers ---
+# Cached entries embed a "version" (generation) number in their key. Writers
+# bump the version instead of deleting keys, so stale entries simply stop being
+# read and expire on their own.
+
+TAGS_VERSION = 'tags'
+# Covers what a prompt's updated_at doesn't: its denormalized comment_count.
+PROMPT_LIST_VERSION = 'prompt-list'
+# Part of every prompt detail key next to the prompt's own version; bulk loads
+# that bypass the signals (seed_db, generate_dataset, import_prompts) bump it
+# to retire every cached detail at once.
+PROMPT_DETAIL_VERSION = 'prompt-detail'
+
+
+def prompt_version(prompt_id):
+    """Version name covering one prompt and its comments."""
+    return f'prompt:{prompt_id}'
+
+
+def _version_timeout(name):
+    # Per-prompt versions are created for any id a client asks for, existing or
+    # not, so they must expire. Outliving the entries stamped with them is
+    # enough: a re-seeded version (see get_version) never matches an older one.
+    if name.startswith('prompt:'):
+        return 2 * settings.PROMPT_DETAIL_CACHE_TIMEOUT
+    return None
+
+
+def _version_key(name):
+    return f'version:{name}'
+
+
+def get_version(name):
+    """Returns the current version number for `name`, initialising it if needed."""
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock rather than 1, so a version key that was evicted
+        # can't come back with a number older entries were stamped with.
+        cache.add(key, int(time.time() * 1000), timeout=_version_timeout(name))
+        version = cache.get(key)
+    return version
+
+
+def get_versions(*names):
+    """Like get_version() for several names, in one cache round trip when all exist."""
+    versions = cache.get_many([_version_key(name) for name in names])
+    return [versions.get(_version_key(name)) or get_version(name) for name in names]
+
+
+def bump_version(name):
+    """Invalidates every entry stamped with the current version of `name`."""
+    key = _version_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Missing key: initialising it is itself a fresh version.
+        return get_version(name)
+
+
+def make_key(prefix, version, query_params=None):
+    """Builds a cache key from a prefix, a version and (normalised) query params."""
+    key = f'{prefix}:v{version}'
+    if query_params:
+        query = urlencode(sorted(query_params.items()))
+        key += ':' + hashlib.md5(query.encode('utf-8')).hexdigest()
+    return key
+
+
+def make_etag(*parts):
+    """Returns a quoted strong ETag derived from the given parts."""
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
@@ -0,0 +1,137 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Prompt, Comment
+
+# --- Capacity Accounting ---
+# Row limits are enforced against a counter kept in the cache instead of a
+# COUNT(*) per create. Creates reserve slots with an atomic incr (so two racing
+# requests can never both take the last slot) and hand them back if the insert
+# fails; deletes give slots back through signals (see signals.py). The counter
+# expires every CAPACITY_RECONCILE_INTERVAL seconds and is then re-seeded from
+# the table, which absorbs any drift from writes that bypass the API.
+#
+# The limit is approximate around a re-seed: COUNT(*) can't see inserts still
+# in flight, so their reservations are forgotten and the table may end up over
+# the limit by at most the number of creates running at that moment. Slots
+# given back for them are clamped at 0, so the counter never goes negative.
+
+PROMPTS = 'prompts'
+COMMENTS = 'comments'
+
+RESOURCES = {
+    # name: (model, singular noun, row limit setting, per-IP quota setting)
+    PROMPTS: (Prompt, 'prompt', 'PROMPT_ROW_LIMIT', 'PROMPT_IP_QUOTA'),
+    COMMENTS: (Comment, 'comment', 'COMMENT_ROW_LIMIT', 'COMMENT_IP_QUOTA'),
+}
+
+
+class CapacityExceeded(Exception):
+    """Raised when a create would exceed a row limit or a per-IP quota."""
+
+
+def _count_key(resource):
+    return f'capacity:count:{resource}'
+
+
+def _quota_key(resource, ip):
+    return f'capacity:ip:{resource}:{ip}'
+
+
+def get_count(resource):
+    """Returns the cached row count for `resource`, seeding it from the DB if needed."""
+    key = _count_key(resource)
+    count = cache.get(key)
+    if count is None:
+        model = RESOURCES[resource][0]
+        cache.add(key, model.objects.count(), timeout=settings.CAPACITY_RECONCILE_INTERVAL)
+        count = cache.get(key)
+    return count
+
+
+def reconcile(resource=None):
+    """
+    Re-seeds the counters from the DB. Returns {resource: count}. Overwrites the
+    current value on purpose: it is for callers that just changed the table
+    behind the API's back (bulk loads), whose counter is known to be wrong.
+    """
+    counts = {}
+    for name in ([resource] if resource else RESOURCES):
+        counts[name] = RESOURCES[name][0].objects.count()
+        cache.set(_count_key(name), counts[name], timeout=settings.CAPACITY_RECONCILE_INTERVAL)
+    return counts
+
+
+def release(resource, amount=1):
+    """Gives back `amount` slots, e.g. after rows were deleted."""
+    _decr(_count_key(resource), amount)
+
+
+def _incr_count(resource, amount):
+    try:
+        return cache.incr(_count_key(resource), amount)
+    except ValueError:
+        # Expired (or never seeded): seed from the DB and try once more.
+        get_count(resource)
+        return cache.incr(_count_key(resource), amount)
+
+
+def _incr_quota(key, amount):
+    cache.add(key, 0, timeout=settings.CAPACITY_IP_QUOTA_WINDOW)
+    try:
+        return cache.incr(key, amount)
+    except ValueError:
+        cache.add(key, 0, timeout=settings.CAPACITY_IP_QUOTA_WINDOW)
+        return cache.incr(key, amount)
+
+
+def _decr(key, amount):
+    try:
+        value = cache.decr(key, amount)
+    except ValueError:
+        return # Expired: there is nothing left to give back.
+    if value < 0:
+        # More given back than was counted (a re-seed forgot the reservation).
+        # Undo the overshoot with incr rather than set() so concurrent
+        # reservations aren't overwritten.
+        cache.incr(key, -value)
+
+
+@contextmanager
+def reserve(resource, request=None, amount=1):
+    """
+    Reserves `amount` slots for the duration of an insert. Raises CapacityExceeded
+    (before the block runs) when the row limit or the client's per-IP quota would
+    be exceeded, and gives the slots back if the block raises.
+    """
+    model, noun, limit_setting, quota_setting = RESOURCES[resource]
+    claimed = []
+
+    quota = getattr(settings, quota_setting)
+    ip = request.META.get('REMOTE_ADDR') if request is not None else None
+    if quota and ip:
+        quota_key = _quota_key(resource, ip)
+        claimed.append(quota_key)
+        if _incr_quota(quota_key, amount) > quota:
+            _decr(quota_key, amount)
+            raise CapacityExceeded(
+                f"Cannot create new {noun}. You have reached your quota of {quota} {noun}s, please try again later."
+            )
+
+    limit = getattr(settings, limit_setting)
+    claimed.append(_count_key(resource))
+    if _incr_count(resource, amount) > limit:
+        for key in claimed:
+            _decr(key, amount)
+        raise CapacityExceeded(
+            f"Cannot create new {noun}. The system has reached its maximum capacity of {limit} {noun}s."
+        )
+
+    try:
+        yield
+    except BaseException:
+        for key in claimed:
+            _decr(key, amount)
+        raise
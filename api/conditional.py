@@ -0,0 +1,90 @@
+import hashlib
+
+import orjson
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags
+
+from .caching import make_etag
+
+
+def get_queryset_validators(queryset, *parts):
+    """
+    Returns `(etag, last_modified, total)` for a list resource from one aggregate
+    query: the newest `updated_at` plus the row count (so deletions change the
+    ETag too). `parts` should identify the representation (e.g. the full request
+    path). Views can hand `total` to the paginator to skip its own COUNT(*).
+    """
+    meta = queryset.order_by().aggregate(last_modified=Max('updated_at'), total=Count('pk'))
+    last_modified = meta['last_modified']
+    etag = make_etag(*parts, last_modified.isoformat() if last_modified else '', meta['total'])
+    return etag, last_modified, meta['total']
+
+
+def apply_validators(request, etag, last_modified, handler, *args, **kwargs):
+    """
+    Answers If-None-Match / If-Modified-Since with a 304 when the validators match,
+    otherwise calls `handler`. Validators are added to 200 and 304 responses.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = handler(request, *args, **kwargs)
+    if response.status_code in (200, 304):
+        if etag:
+            response.headers.setdefault('ETag', etag)
+        if timestamp is not None:
+            response.headers.setdefault('Last-Modified', http_date(timestamp))
+    return response
+
+
+def apply_content_validators(request, response, *parts):
+    """
+    Adds an ETag computed from an already built response's data and answers a
+    matching If-None-Match with 304. This saves bandwidth, not queries; it is
+    meant for responses where working out validators up front would cost more
+    than building the response.
+    """
+    if response.status_code != 200:
+        return response
+    digest = hashlib.md5(orjson.dumps(response.data, option=orjson.OPT_NON_STR_KEYS, default=str)).hexdigest()
+    etag = make_etag(*parts, digest)
+    response['ETag'] = etag
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def etag_matches(request, etag):
+    """
+    True when the request's If-None-Match lists `etag` (or `*`). For read-only
+    POST endpoints, where Django's own evaluation would answer 412.
+    """
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    return '*' in etags or etag in etags
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag/Last-Modified validators to a generic view's list()/retrieve() and
+    evaluates conditional requests before the view queries or serializes anything.
+    Views implement `get_validators(request)` returning `(etag, last_modified)`;
+    either may be None.
+
+    Keyset pages (PaginationModeMixin's `?pagination=cursor`) are validated by
+    their content instead: the up-front validators aggregate the whole filtered
+    set, which is the COUNT(*) keyset pagination exists to avoid.
+    """
+
+    def list(self, request, *args, **kwargs):
+        use_cursor_pagination = getattr(self, 'use_cursor_pagination', None)
+        if use_cursor_pagination and use_cursor_pagination():
+            response = super().list(request, *args, **kwargs)
+            return apply_content_validators(request, response, request.build_absolute_uri())
+        etag, last_modified = self.get_validators(request)
+        return apply_validators(request, etag, last_modified, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        return apply_validators(request, etag, last_modified, super().retrieve, *args, **kwargs)
+
+    def get_validators(self, request):
+        raise NotImplementedError('Views using ConditionalGetMixin must implement get_validators().')
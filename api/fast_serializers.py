@@ -0,0 +1,126 @@
+import datetime
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .serializers import CommentSerializer, PromptListSerializer
+from .timing import SERIALIZE, measure
+
+# --- Fast Read Serializers ---
+# Read-only output path for the list endpoints. Rows come from .values() with
+# exactly the columns a DRF serializer reads, and each row goes through a list
+# of converters worked out once from that serializer's fields. This skips model
+# instantiation and DRF's per-field machinery. The output is the same data, in
+# the same key order, as the DRF serializer, so the rendered JSON is
+# byte-identical; api/tests.py checks this. Only field types with a converter
+# here are supported. Anything else (method fields, nested serializers, dotted
+# sources) is rejected when the FastSerializer is created.
+
+
+def _text(value):
+    return str(value)
+
+
+def _integer(value):
+    return int(value)
+
+
+def _identity(value):
+    return value
+
+
+def _text_list(values):
+    return [str(item) if item is not None else None for item in values]
+
+
+def _datetime_converter(tz):
+    # DateTimeField.to_representation() with ISO_8601 output: enforce_timezone(),
+    # then isoformat() with a trailing +00:00 written as Z.
+    def convert(value):
+        if tz is not None:
+            value = value.astimezone(tz)
+        elif value.tzinfo is not None:
+            value = timezone.make_naive(value, datetime.timezone.utc)
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+class FastSerializer:
+    """
+    Output-only stand-in for `serializer_class(rows, many=True).data`.
+    `columns` are the names to pass to `.values()`.
+    """
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        model = serializer.Meta.model
+        self.serializer_class = serializer_class
+        self.columns = []
+        self.fields = [] # (output key, column, converter, is_datetime)
+        for field in serializer._readable_fields:
+            if field.source == '*' or '.' in field.source:
+                raise ImproperlyConfigured(f"{serializer_class.__name__}.{field.field_name}: unsupported source '{field.source}'.")
+            column = model._meta.get_field(field.source).attname
+            converter, is_datetime = self.get_converter(serializer_class, field)
+            self.columns.append(column)
+            self.fields.append((field.field_name, column, converter, is_datetime))
+
+    @staticmethod
+    def get_converter(serializer_class, field):
+        """Returns `(converter, is_datetime)`; datetime converters depend on the active timezone."""
+        # Exact type checks: a subclass may override to_representation().
+        field_type = type(field)
+        if field_type is serializers.CharField:
+            return _text, False
+        if field_type is serializers.IntegerField:
+            return _integer, False
+        if field_type is serializers.UUIDField and field.uuid_format == 'hex_verbose':
+            return _text, False
+        if field_type is serializers.PrimaryKeyRelatedField and field.pk_field is None:
+            return _identity, False # The raw pk, as DRF returns it (the renderer formats it)
+        if field_type is serializers.ListField and type(field.child) is serializers.CharField:
+            return _text_list, False
+        if field_type is serializers.DateTimeField and getattr(field, 'format', api_settings.DATETIME_FORMAT).lower() == ISO_8601.lower():
+            if getattr(field, 'timezone', None) is not None:
+                raise ImproperlyConfigured(f"{serializer_class.__name__}.{field.field_name}: per-field timezones are not supported.")
+            return None, True
+        raise ImproperlyConfigured(
+            f"{serializer_class.__name__}.{field.field_name}: no fast converter for {field_type.__name__}."
+        )
+
+    def serialize(self, rows):
+        """Turns `.values(*self.columns)` rows into the serializer's output dicts."""
+        with measure(SERIALIZE):
+            datetime_converter = _datetime_converter(timezone.get_current_timezone() if settings.USE_TZ else None)
+            plan = [
+                (key, column, datetime_converter if is_datetime else converter)
+                for key, column, converter, is_datetime in self.fields
+            ]
+            return [
+                {key: None if row[column] is None else convert(row[column]) for key, column, convert in plan}
+                for row in rows
+            ]
+
+
+prompt_list_fast = FastSerializer(PromptListSerializer)
+comment_fast = FastSerializer(CommentSerializer)
+
+
+class FastListMixin:
+    """
+    Serves a generic view's list() through a FastSerializer (`fast_serializer`).
+    Filtering and both pagination styles work on the .values() queryset as usual.
+    """
+    fast_serializer = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).values(*self.fast_serializer.columns)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.fast_serializer.serialize(page))
+        return Response(self.fast_serializer.serialize(queryset))
@@ -0,0 +1,253 @@
+import collections
+import io
+import itertools
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+import orjson
+from django.db import connections, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import capacity
+from .bulk import _copy_text
+from .caching import PROMPT_DETAIL_VERSION, PROMPT_LIST_VERSION, TAGS_VERSION, bump_version
+from .models import Prompt, generate_modification_code, generate_username
+from .serializers import PromptSerializer
+
+# --- Prompt Import Pipeline ---
+# Loads prompts from NDJSON files far bigger than memory (see the import_prompts
+# command). The file is read in batches of lines. Worker processes parse and
+# validate each line exactly as POST /api/prompts/ would (PromptSerializer, so
+# HTML is stripped and tags are checked the same way) and turn the valid ones
+# into COPY text. The main process only copies each batch into a temporary
+# staging table and merges it into api_prompt with INSERT ... ON CONFLICT, one
+# transaction per batch. Invalid lines never reach the database: they go to a
+# reject file with their line number and errors.
+#
+# A line may carry a `prompt_id`: an existing prompt with that id is updated
+# (title, content, tags, updated_at; the username never changes), any other id
+# creates a prompt with it. Lines without one always create a prompt.
+# `created_at`/`updated_at` are kept if given. Row limits are not applied.
+
+STAGING_TABLE = 'api_prompt_import'
+
+# Staging columns, in COPY order. `line` picks the last of several lines with
+# the same prompt_id within one batch.
+STAGING_COLUMNS = (
+    ('line', 'bigint'),
+    ('prompt_id', 'uuid'),
+    ('title', 'varchar(150)'),
+    ('content', 'text'),
+    ('username', 'varchar(50)'),
+    ('tags', 'varchar(30)[]'),
+    ('modification_code', 'varchar(8)'),
+    ('created_at', 'timestamptz'),
+    ('updated_at', 'timestamptz'),
+)
+
+# Built once per process: DRF builds a serializer's fields per instance, which
+# would cost more than the validation itself. run_validation() is stateless.
+_prompt_serializer = PromptSerializer()
+_timestamp_field = serializers.DateTimeField()
+_prompt_id_field = serializers.UUIDField()
+
+ImportStats = collections.namedtuple('ImportStats', 'lines inserted updated duplicates rejected')
+
+
+# --- Worker Side ---
+def prepare_line(raw, now):
+    """
+    Validates one input line. Returns `(copy_values, None)` for a valid prompt,
+    or `(None, errors)` in the same shape as the API's 400 responses.
+    """
+    try:
+        record = orjson.loads(raw)
+    except orjson.JSONDecodeError as e:
+        return None, {'non_field_errors': [f'Invalid JSON: {e}']}
+    if not isinstance(record, dict):
+        return None, {'non_field_errors': ['Expected a JSON object.']}
+
+    errors = {}
+    try:
+        data = _prompt_serializer.run_validation(record)
+    except serializers.ValidationError as e:
+        errors.update(e.detail)
+    extra = {}
+    for name, field, default in (
+        ('prompt_id', _prompt_id_field, uuid.uuid4),
+        ('created_at', _timestamp_field, lambda: now),
+        ('updated_at', _timestamp_field, lambda: now),
+    ):
+        if record.get(name) is None:
+            extra[name] = default()
+            continue
+        try:
+            extra[name] = field.run_validation(record[name])
+        except serializers.ValidationError as e:
+            errors[name] = e.detail
+    if errors:
+        return None, errors
+
+    return (
+        extra['prompt_id'],
+        data['title'],
+        data['content'],
+        (data.get('username') or generate_username())[:50],
+        data.get('tags'),
+        generate_modification_code(),
+        extra['created_at'],
+        extra['updated_at'],
+    ), None
+
+
+def prepare_batch(first_line, lines):
+    """
+    Validates a batch of raw lines (numbered from `first_line`). Returns
+    `(copy_text, rows, rejects)`: the valid rows as COPY text for the staging
+    table, their count, and a reject file line (bytes) for each invalid one.
+    """
+    now = timezone.now()
+    buffer = io.StringIO()
+    rows = 0
+    rejects = []
+    for line_number, raw in enumerate(lines, start=first_line):
+        if not raw.strip():
+            continue
+        values, errors = prepare_line(raw, now)
+        if errors:
+            rejects.append(orjson.dumps({
+                'line': line_number,
+                'errors': errors,
+                'record': raw.decode('utf-8', 'replace').rstrip('\r\n'),
+            }) + b'\n')
+            continue
+        buffer.write('\t'.join(_copy_text(value) for value in (line_number,) + values))
+        buffer.write('\n')
+        rows += 1
+    return buffer.getvalue(), rows, rejects
+
+
+# --- Loading ---
+def iter_line_batches(f, batch_size):
+    """Yields `(first line number, [raw lines])` from a binary file object."""
+    first_line = 1
+    while True:
+        lines = list(itertools.islice(f, batch_size))
+        if not lines:
+            return
+        yield first_line, lines
+        first_line += len(lines)
+
+
+class PromptImporter:
+    """
+    Runs the pipeline over one file. `workers=0` validates in this process
+    (no pool); `reject_file` is a binary file object, or None to drop rejects.
+    """
+
+    def __init__(self, batch_size=5000, workers=None, reject_file=None, using='default', progress=None):
+        self.batch_size = batch_size
+        self.workers = max((os.cpu_count() or 2) - 1, 1) if workers is None else workers
+        self.reject_file = reject_file
+        self.connection = connections[using]
+        self.progress = progress or (lambda stats: None)
+        self.counts = collections.Counter()
+        self.has_tags = False
+
+    def run(self, f):
+        """Imports every line of the binary file object `f`. Returns ImportStats."""
+        batches = iter_line_batches(f, self.batch_size)
+        self.create_staging_table()
+        try:
+            if not self.workers:
+                for first_line, lines in batches:
+                    self.load(len(lines), *prepare_batch(first_line, lines))
+            else:
+                # Bounded read-ahead: enough queued batches to keep every worker
+                # busy while this process runs COPY, without reading the whole file.
+                with ProcessPoolExecutor(self.workers, initializer=django.setup) as executor:
+                    pending = collections.deque()
+                    for first_line, lines in batches:
+                        pending.append((len(lines), executor.submit(prepare_batch, first_line, lines)))
+                        if len(pending) > self.workers * 2:
+                            line_count, future = pending.popleft()
+                            self.load(line_count, *future.result())
+                    while pending:
+                        line_count, future = pending.popleft()
+                        self.load(line_count, *future.result())
+        finally:
+            self.drop_staging_table()
+        self.invalidate()
+        return self.stats()
+
+    def stats(self):
+        return ImportStats(**{name: self.counts[name] for name in ImportStats._fields})
+
+    def create_staging_table(self):
+        # Temporary: private to this session, never WAL-logged, gone on disconnect.
+        columns = ', '.join(f'{name} {kind}' for name, kind in STAGING_COLUMNS)
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS pg_temp.{STAGING_TABLE}')
+            cursor.execute(f'CREATE TEMPORARY TABLE {STAGING_TABLE} ({columns})')
+
+    def drop_staging_table(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS pg_temp.{STAGING_TABLE}')
+
+    def load(self, line_count, copy_text, rows, rejects):
+        """COPYs one validated batch into staging and merges it into the prompt table."""
+        self.counts['lines'] += line_count
+        self.counts['rejected'] += len(rejects)
+        if self.reject_file is not None:
+            self.reject_file.writelines(rejects)
+        if rows:
+            with transaction.atomic(using=self.connection.alias):
+                merged = self.merge(copy_text)
+            updated = sum(not inserted for inserted, _ in merged)
+            self.has_tags = self.has_tags or any(has_tags for _, has_tags in merged)
+            self.counts['inserted'] += len(merged) - updated
+            self.counts['updated'] += updated
+            self.counts['duplicates'] += rows - len(merged)
+            if updated:
+                # Cached details of updated prompts are now stale: retire them
+                # all with one bump per batch, not a cache round trip per row.
+                bump_version(PROMPT_DETAIL_VERSION)
+        self.progress(self.stats())
+
+    def merge(self, copy_text):
+        """Returns `(inserted, has_tags)` for every merged row."""
+        quote = self.connection.ops.quote_name
+        table = quote(Prompt._meta.db_table)
+        columns = ', '.join(name for name, _ in STAGING_COLUMNS[1:])
+        # wrap_database_errors: copy_expert() is the driver's own method (see bulk.copy_objects).
+        with self.connection.cursor() as cursor, self.connection.wrap_database_errors:
+            cursor.execute(f'TRUNCATE {STAGING_TABLE}')
+            cursor.copy_expert(
+                f"COPY {STAGING_TABLE} ({', '.join(name for name, _ in STAGING_COLUMNS)}) FROM STDIN",
+                io.StringIO(copy_text),
+            )
+            # DISTINCT ON: ON CONFLICT can't touch the same row twice in one
+            # statement, so the last line for a repeated prompt_id wins.
+            # xmax = 0 only for rows this statement inserted.
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}, comment_count) '
+                f'SELECT DISTINCT ON (prompt_id) {columns}, 0 FROM {STAGING_TABLE} '
+                f'ORDER BY prompt_id, line DESC '
+                f'ON CONFLICT (prompt_id) DO UPDATE SET '
+                f'title = EXCLUDED.title, content = EXCLUDED.content, '
+                f'tags = EXCLUDED.tags, updated_at = EXCLUDED.updated_at '
+                f"RETURNING xmax = 0, cardinality(tags) > 0"
+            )
+            return cursor.fetchall()
+
+    def invalidate(self):
+        # The merge bypassed save() and the signals, so retire cached state by
+        # hand (cached details are retired per batch in load()).
+        if self.counts['inserted'] or self.counts['updated']:
+            bump_version(PROMPT_LIST_VERSION)
+            if self.has_tags or self.counts['updated']:
+                bump_version(TAGS_VERSION)
+            capacity.reconcile(capacity.PROMPTS)
@@ -0,0 +1,99 @@
+import json
+import platform
+import subprocess
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.utils import timezone
+from api.benchmark import isolated_caches, run_benchmarks
+from api.models import Prompt
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks every API route through the test client and reports p50/p95/p99 '
+        'latency, query counts, DB time and response size per scenario. By default a '
+        'throwaway test database is created and filled with generate_dataset. Cache '
+        'keys go under their own "benchmark" prefix on the configured cache.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prompts', type=int, default=2000, help='Dataset size (prompts) for the test database.')
+        parser.add_argument('--comments-per-prompt', type=float, default=5)
+        parser.add_argument('--seed', type=int, default=42, help='Seed for the dataset and the request mix.')
+        parser.add_argument('--iterations', type=int, default=50, help='Timed requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per scenario.')
+        parser.add_argument('--only', nargs='*', help='Run only these scenario names.')
+        parser.add_argument('--output', help='Write the results as JSON to this path.')
+        parser.add_argument('--keepdb', action='store_true', help='Keep (and reuse) the test database and its dataset.')
+        parser.add_argument(
+            '--existing', action='store_true',
+            help='Run against the configured database as-is instead of a test database. Write scenarios add and delete rows!'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be at least 1.")
+        setup_test_environment()
+        old_config = None
+        # Everything below, generate_dataset included, bumps versions and resets
+        # capacity counters: keep that out of the app's own cache keys.
+        isolated = override_settings(CACHES=isolated_caches())
+        isolated.enable()
+        try:
+            if not options['existing']:
+                old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'], aliases={'default'})
+                if Prompt.objects.count() != options['prompts']:
+                    self.stdout.write(f"Generating {options['prompts']} prompts...")
+                    call_command(
+                        'generate_dataset', prompts=options['prompts'], clear=True, seed=options['seed'],
+                        comments_per_prompt=options['comments_per_prompt'], stdout=self.stdout
+                    )
+            # Rate limits and row limits would turn the write scenarios into 429s/403s.
+            with override_settings(RATELIMIT_ENABLE=False, PROMPT_ROW_LIMIT=10**9, COMMENT_ROW_LIMIT=10**9,
+                                   PROMPT_IP_QUOTA=0, COMMENT_IP_QUOTA=0):
+                results = run_benchmarks(
+                    iterations=options['iterations'], warmup=options['warmup'], seed=options['seed'],
+                    only=options['only'], progress=self.report
+                )
+        finally:
+            if old_config is not None:
+                teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            isolated.disable()
+            teardown_test_environment()
+
+        if options['output']:
+            report = {'meta': self.get_meta(options), 'results': results}
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def report(self, name, result):
+        latency = result['latency_ms']
+        self.stdout.write(
+            f"{name:<32} p50 {latency['p50']:>8.2f}ms  p95 {latency['p95']:>8.2f}ms  p99 {latency['p99']:>8.2f}ms  "
+            f"queries {result['queries']['mean']:>5.1f}  db {result['db_time_ms']['mean']:>7.2f}ms  "
+            f"bytes {result['response_bytes']['mean']:>9.0f}  {result['status_codes']}"
+        )
+
+    @staticmethod
+    def get_meta(options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'timestamp': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'dataset': None if options['existing'] else {
+                'prompts': options['prompts'],
+                'comments_per_prompt': options['comments_per_prompt'],
+                'seed': options['seed'],
+            },
+            'iterations': options['iterations'],
+            'warmup': options['warmup'],
+        }
@@ -0,0 +1,94 @@
+import datetime
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from api import bulk, capacity
+from api.caching import PROMPT_DETAIL_VERSION, PROMPT_LIST_VERSION, TAGS_VERSION, bump_version
+from api.models import Prompt, Comment
+from api.synthetic import Generator
+
+class Command(BaseCommand):
+    help = (
+        'Generates a deterministic synthetic dataset for scale and load testing '
+        '(see api/synthetic.py). Row limits are not applied.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prompts', type=int, default=1000, help='Number of prompts to generate.')
+        parser.add_argument('--comments-per-prompt', type=float, default=3, help='Average comments per prompt.')
+        parser.add_argument('--seed', type=int, default=42, help='RNG seed; the same seed gives the same data.')
+        parser.add_argument('--tags', type=int, default=500, help='Size of the tag vocabulary.')
+        parser.add_argument('--zipf', type=float, default=1.1, help='Zipf exponent of the tag distribution.')
+        parser.add_argument('--days', type=int, default=730, help='Spread created_at over this many past days.')
+        parser.add_argument(
+            '--until', type=datetime.date.fromisoformat, default=None,
+            help='Latest timestamp date (YYYY-MM-DD, default: today). Pin it to reproduce a dataset exactly.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help='Prompts per insert batch.')
+        parser.add_argument(
+            '--method', choices=bulk.METHODS, default=bulk.COPY,
+            help="'copy' (Postgres COPY, fastest) or 'bulk' (bulk_create plus one UPDATE per batch to keep the timestamps)."
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help=(
+                'Delete all prompts and comments first, in the same transaction as the first batch. '
+                'Later batches commit separately: a failure after the first leaves a partial dataset.'
+            )
+        )
+
+    def handle(self, *args, **options):
+        if options['prompts'] < 0 or options['tags'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--prompts must be >= 0; --tags and --batch-size must be >= 1.")
+        generator = Generator(
+            seed=options['seed'],
+            comments_per_prompt=options['comments_per_prompt'],
+            tag_count=options['tags'],
+            zipf_s=options['zipf'],
+            days=options['days'],
+            now=self.get_until(options['until']),
+        )
+        started = time.monotonic()
+        prompt_total = comment_total = 0
+
+        # One transaction per batch keeps memory and WAL bounded at large sizes.
+        # --clear truncates inside the first one, so if that batch fails the old
+        # data is still there.
+        clear = options['clear']
+        for prompts, comments in generator.batches(options['prompts'], options['batch_size']):
+            with transaction.atomic():
+                if clear:
+                    self.truncate()
+                    clear = False
+                prompt_total += bulk.insert_objects(Prompt, prompts, options['method'], options['batch_size'])
+                comment_total += bulk.insert_objects(Comment, comments, options['method'], options['batch_size'])
+            self.stdout.write(f"  ...{prompt_total} prompts, {comment_total} comments")
+        if clear: # --prompts 0
+            with transaction.atomic():
+                self.truncate()
+
+        # Inserts (and the TRUNCATE) bypassed the signals, so refresh cached state by hand.
+        bump_version(TAGS_VERSION)
+        bump_version(PROMPT_LIST_VERSION)
+        if options['clear']:
+            bump_version(PROMPT_DETAIL_VERSION)
+        capacity.reconcile()
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {prompt_total} prompts and {comment_total} comments in {time.monotonic() - started:.1f}s."
+        ))
+
+    @staticmethod
+    def truncate():
+        with connection.cursor() as cursor:
+            # Deferred FK checks still pending in an outer transaction would
+            # block the TRUNCATE, so run them now (as seed_db does).
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            cursor.execute(f"TRUNCATE {Comment._meta.db_table}, {Prompt._meta.db_table}")
+            cursor.execute("SET CONSTRAINTS ALL DEFERRED")
+
+    @staticmethod
+    def get_until(until):
+        # Midnight UTC rather than "now", so the same seed gives the same rows all day.
+        until = until or timezone.now().date()
+        return datetime.datetime.combine(until, datetime.time.min, tzinfo=datetime.timezone.utc)
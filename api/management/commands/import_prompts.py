@@ -0,0 +1,71 @@
+import gzip
+import os
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from api.importing import PromptImporter
+
+class Command(BaseCommand):
+    help = (
+        'Imports (or updates, by prompt_id) prompts from an NDJSON file, one prompt '
+        'object per line. Lines are validated like POST /api/prompts/ in a pool of '
+        'worker processes and loaded with COPY and INSERT ... ON CONFLICT, one '
+        'transaction per batch. Invalid lines are written to a reject file with '
+        'their line number and errors. Row limits are not applied.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="NDJSON file (.gz is decompressed on the fly), or '-' for stdin.")
+        parser.add_argument('--batch-size', type=int, default=5000, help='Lines per validation and COPY batch.')
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Validation processes (default: CPU count - 1); 0 validates in this process.'
+        )
+        parser.add_argument(
+            '--rejects', default=None,
+            help="File for rejected lines (default: <path>.rejects.ndjson, or rejects.ndjson for stdin)."
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if options['batch_size'] < 1 or (options['workers'] is not None and options['workers'] < 0):
+            raise CommandError("--batch-size must be >= 1 and --workers >= 0.")
+        if path != '-' and not os.path.exists(path):
+            raise CommandError(f"Import file not found at {path}")
+        rejects_path = options['rejects'] or (
+            'rejects.ndjson' if path == '-' else f"{path.removesuffix('.gz')}.rejects.ndjson"
+        )
+
+        started = time.monotonic()
+        with self.open_input(path) as f, open(rejects_path, 'wb') as reject_file:
+            importer = PromptImporter(
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                reject_file=reject_file,
+                progress=lambda stats: self.stdout.write(
+                    f"  ...{stats.lines} lines: {stats.inserted} inserted, {stats.updated} updated, {stats.rejected} rejected"
+                ),
+            )
+            stats = importer.run(f)
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats.inserted + stats.updated} prompts ({stats.inserted} new, {stats.updated} updated) "
+            f"from {stats.lines} lines in {elapsed:.1f}s ({stats.lines / max(elapsed, 1e-9) * 60:,.0f} lines/min)."
+        ))
+        if stats.duplicates:
+            self.stdout.write(self.style.WARNING(
+                f"{stats.duplicates} line(s) were superseded by a later line with the same prompt_id."
+            ))
+        if stats.rejected:
+            self.stdout.write(self.style.WARNING(f"Rejected {stats.rejected} line(s); see {rejects_path}."))
+        else:
+            os.remove(rejects_path)
+
+    @staticmethod
+    def open_input(path):
+        if path == '-':
+            return os.fdopen(os.dup(sys.stdin.buffer.fileno()), 'rb')
+        if path.endswith('.gz'):
+            return gzip.open(path, 'rb')
+        return open(path, 'rb')
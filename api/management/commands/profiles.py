@@ -0,0 +1,82 @@
+import argparse
+import os
+import pstats
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.profiling import function_times, list_captures, make_token
+
+class Command(BaseCommand):
+    help = (
+        'Manages request profiles captured by ProfilingMiddleware: list captures, '
+        'diff two of them by function, or print a signed header value that turns '
+        'profiling on for a request.'
+    )
+
+    def add_arguments(self, parser):
+        directory = argparse.ArgumentParser(add_help=False)
+        directory.add_argument('--dir', default=None, help='Capture directory (default: PROFILING_DIR).')
+        subparsers = parser.add_subparsers(dest='action', required=True)
+
+        list_parser = subparsers.add_parser('list', parents=[directory], help='List captures, newest first.')
+        list_parser.add_argument('--limit', type=int, default=20)
+
+        diff_parser = subparsers.add_parser('diff', parents=[directory], help='Compare per-function time between two captures.')
+        diff_parser.add_argument('before', help='Capture id (or unique prefix) of the baseline.')
+        diff_parser.add_argument('after', help='Capture id (or unique prefix) to compare with it.')
+        diff_parser.add_argument('--limit', type=int, default=25, help='Functions to show.')
+        diff_parser.add_argument(
+            '--sort', choices=('tottime', 'cumtime'), default='tottime',
+            help='Rank by change in own time (tottime) or including callees (cumtime).'
+        )
+
+        subparsers.add_parser('token', help='Print a signed value for the PROFILING_HEADER request header.')
+
+    def handle(self, *args, **options):
+        self.directory = options.get('dir') or settings.PROFILING_DIR
+        getattr(self, f"handle_{options['action']}")(options)
+
+    def handle_token(self, options):
+        self.stdout.write(f"{settings.PROFILING_HEADER}: {make_token()}")
+        self.stdout.write(f"(valid for {settings.PROFILING_TOKEN_MAX_AGE} seconds)")
+
+    def handle_list(self, options):
+        captures = list_captures(self.directory)
+        if not captures:
+            self.stdout.write(f"No captures in {self.directory}.")
+            return
+        for capture in captures[:options['limit']]:
+            self.stdout.write(
+                f"{capture['id']:<64} {capture['status']:>3}  {capture['duration_ms']:>9.2f}ms  "
+                f"{capture['method']} {capture['path']}"
+            )
+
+    def handle_diff(self, options):
+        before = self.load(options['before'])
+        after = self.load(options['after'])
+        index = 0 if options['sort'] == 'tottime' else 1
+        rows = []
+        for label in set(before) | set(after):
+            old = before.get(label, (0.0, 0.0, 0))
+            new = after.get(label, (0.0, 0.0, 0))
+            rows.append((new[index] - old[index], old[index], new[index], old[2], new[2], label))
+        rows.sort(key=lambda row: abs(row[0]), reverse=True)
+
+        total_before = sum(value[0] for value in before.values()) * 1000
+        total_after = sum(value[0] for value in after.values()) * 1000
+        self.stdout.write(f"Total: {total_before:.2f}ms -> {total_after:.2f}ms ({total_after - total_before:+.2f}ms)")
+        self.stdout.write(f"{'delta ms':>10} {'before ms':>10} {'after ms':>10} {'calls':>13}  function ({options['sort']})")
+        for delta, old, new, old_calls, new_calls, label in rows[:options['limit']]:
+            self.stdout.write(
+                f"{delta * 1000:>+10.2f} {old * 1000:>10.2f} {new * 1000:>10.2f} {f'{old_calls}->{new_calls}':>13}  {label}"
+            )
+
+    def load(self, capture_id):
+        """Per-function times for the capture matching `capture_id` (or a unique prefix)."""
+        matches = [capture['id'] for capture in list_captures(self.directory) if capture['id'].startswith(capture_id)]
+        if len(matches) != 1:
+            raise CommandError(f"'{capture_id}' matches {len(matches)} captures in {self.directory}.")
+        path = os.path.join(self.directory, f'{matches[0]}.prof')
+        try:
+            return function_times(pstats.Stats(path))
+        except OSError as e:
+            raise CommandError(f"Could not read {path}: {e}") from e
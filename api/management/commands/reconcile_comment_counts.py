@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from api.models import Prompt
+
+class Command(BaseCommand):
+    help = 'Repairs drift in the denormalized Prompt.comment_count column'
+
+    def handle(self, *args, **options):
+        repaired = Prompt.objects.reconcile_comment_counts()
+        if repaired:
+            self.stdout.write(self.style.WARNING(f"Repaired comment_count for {repaired} prompt(s)."))
+        else:
+            self.stdout.write(self.style.SUCCESS("All comment counts are consistent."))
@@ -1,75 +1,138 @@
-import json
 import os
-from django.core.management.base import BaseCommand
-from django.conf import settings
-from api.models import Prompt, Comment # Adjust the import path if your models are elsewhere
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+from api import bulk, capacity
+from api.caching import PROMPT_DETAIL_VERSION, PROMPT_LIST_VERSION, TAGS_VERSION, bump_version
+from api.models import Prompt, Comment, prepare_new # Adjust the import path if your models are elsewhere
 
 class Command(BaseCommand):
-    help = 'Seeds the database with initial data from seed_data.json'
+    help = (
+        'Replaces all prompts and comments with the data in a seed file '
+        '(default: seed_data.json next to this command). The file is streamed and '
+        'rows are inserted in batches with COPY inside a single transaction.'
+    )
 
-    def handle(self, *args, **options):
-        script_dir = os.path.dirname(__file__)
-        seed_file_path = os.path.join(script_dir, 'seed_data.json')
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file', dest='path',
+            default=os.path.join(os.path.dirname(__file__), 'seed_data.json'),
+            help=(
+                'Seed file: a JSON document like seed_data.json, or NDJSON (.ndjson/.jsonl), '
+                'including the output of GET /api/prompts/export/.'
+            )
+        )
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per COPY/bulk_create batch.')
+        parser.add_argument(
+            '--method', choices=bulk.METHODS, default=bulk.COPY,
+            help="'copy' (Postgres COPY, keeps timestamps from the file) or 'bulk' (bulk_create)."
+        )
 
+    def handle(self, *args, **options):
+        seed_file_path = options['path']
         if not os.path.exists(seed_file_path):
-            self.stdout.write(self.style.ERROR(f"Seed file not found at {seed_file_path}"))
-            return
+            raise CommandError(f"Seed file not found at {seed_file_path}")
+        self.method = options['method']
+        self.batch_size = max(options['batch_size'], 1)
+
+        with transaction.atomic():
+            self.stdout.write("Clearing existing Prompt and Comment data...")
+            # TRUNCATE instead of delete(): no per-row signals or cascades.
+            with connection.cursor() as cursor:
+                # Deferred FK checks still pending in an outer transaction would
+                # block the TRUNCATE, so run them now.
+                cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+                cursor.execute(f"TRUNCATE {Comment._meta.db_table}, {Prompt._meta.db_table}")
+                cursor.execute("SET CONSTRAINTS ALL DEFERRED")
+            self.stdout.write(self.style.SUCCESS("Existing data cleared."))
+            try:
+                prompt_count, comment_count, skipped = self.load(seed_file_path)
+            except DatabaseError as e: # e.g. a value too long for its column, a duplicate id
+                # Raised out of the atomic block, so everything is rolled back.
+                raise CommandError(f"The database rejected the seed data (nothing was changed): {e}")
+            # bulk paths bypass the comment_count signals; one UPDATE fixes them all.
+            Prompt.objects.reconcile_comment_counts()
 
-        with open(seed_file_path, 'r') as f:
-            data = json.load(f)
+        # Signals didn't run either, so retire cached state by hand (including
+        # the detail responses of every prompt that was just truncated away).
+        bump_version(TAGS_VERSION)
+        bump_version(PROMPT_LIST_VERSION)
+        bump_version(PROMPT_DETAIL_VERSION)
+        capacity.reconcile()
 
-        self.stdout.write("Clearing existing Prompt and Comment data...")
-        Comment.objects.all().delete()
-        Prompt.objects.all().delete()
-        self.stdout.write(self.style.SUCCESS("Existing data cleared."))
+        self.stdout.write(self.style.SUCCESS(f"Created {prompt_count} prompts and {comment_count} comments."))
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"Skipped {skipped} comment(s) whose prompt wasn't found."))
+        self.stdout.write(self.style.SUCCESS("Database seeding completed."))
 
-        prompts_data = data.get('prompts', [])
-        comments_data = data.get('comments', [])
-        # --- CHANGE: Store prompts by their actual DB ID ---
-        created_prompts_by_id = {}
+    def load(self, path):
+        """Streams the file into the DB. Returns (prompts, comments, skipped comments)."""
+        # Comments reference prompts by their intended ID: an explicit "id" in the
+        # file, or the prompt's 1-based position otherwise. Prompts that carry a
+        # `prompt_id` (exports) keep it, and comments nested under a prompt's
+        # "comments" (export ?include=comments) belong to that prompt.
+        prompt_ids = {}
+        prompts, comments, pending = [], [], []
+        prompt_count = comment_count = 0
 
-        # Create Prompts
-        self.stdout.write(f"Creating {len(prompts_data)} prompts...")
-        # --- CHANGE: Keep track of the order/intended ID ---
-        intended_id_counter = 1
-        for prompt_data in prompts_data:
-            try:
-                prompt = Prompt.objects.create(
-                    title=prompt_data['title'],
-                    content=prompt_data['content'],
-                    tags=prompt_data.get('tags', [])
-                )
-                # --- CHANGE: Map the intended ID (from JSON) to the created prompt object ---
-                # We assume the order in the JSON corresponds to IDs 1, 2, 3...
-                created_prompts_by_id[intended_id_counter] = prompt
-                self.stdout.write(f"  Created prompt (Intended ID {intended_id_counter}): {prompt.title}")
-                intended_id_counter += 1
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"  Error creating prompt '{prompt_data.get('title', 'N/A')}': {e}"))
-        self.stdout.write(self.style.SUCCESS("Prompts created."))
+        def flush_prompts():
+            nonlocal prompt_count
+            prompt_count += bulk.insert_objects(Prompt, prompts, self.method, self.batch_size)
+            prompts.clear()
 
-        # Create Comments
-        self.stdout.write(f"Creating {len(comments_data)} comments...")
-        for comment_data in comments_data:
-            # --- CHANGE: Get the prompt_id from the JSON data ---
-            prompt_id_from_json = comment_data.get('prompt_id')
-            # --- CHANGE: Look up the prompt object using the ID ---
-            prompt_instance = created_prompts_by_id.get(prompt_id_from_json)
+        def flush_comments():
+            nonlocal comment_count
+            if prompts:
+                flush_prompts() # FK targets first
+            comment_count += bulk.insert_objects(Comment, comments, self.method, self.batch_size)
+            comments.clear()
+            self.stdout.write(f"  ...{prompt_count} prompts, {comment_count} comments")
 
-            if not prompt_instance:
-                # --- CHANGE: Update warning message ---
-                self.stdout.write(self.style.WARNING(f"  Skipping comment: Prompt with intended ID '{prompt_id_from_json}' not found or wasn't created."))
-                continue
+        try:
+            for kind, data in bulk.iter_records(path):
+                if kind == 'prompt':
+                    prompt = prepare_new(Prompt(
+                        title=data['title'],
+                        content=data['content'],
+                        tags=data.get('tags', []),
+                        username=data.get('username'),
+                        created_at=data.get('created_at'),
+                        updated_at=data.get('updated_at'),
+                    ))
+                    if data.get('prompt_id'):
+                        prompt.prompt_id = uuid.UUID(data['prompt_id'])
+                    prompt_ids[data.get('id', data.get('prompt_id', len(prompt_ids) + 1))] = prompt.prompt_id
+                    prompts.append(prompt)
+                    comments.extend(self.build_comment(comment, prompt.prompt_id) for comment in data.get('comments', []))
+                    if len(comments) >= self.batch_size:
+                        flush_comments()
+                    if len(prompts) >= self.batch_size:
+                        flush_prompts()
+                        self.stdout.write(f"  ...{prompt_count} prompts")
+                elif data.get('prompt_id') in prompt_ids:
+                    comments.append(self.build_comment(data, prompt_ids[data['prompt_id']]))
+                    if len(comments) >= self.batch_size:
+                        flush_comments()
+                else:
+                    pending.append(data) # Its prompt may still come later in the file
+        except (KeyError, ValueError, TypeError) as e:
+            raise CommandError(f"Invalid seed data: {e!r}")
 
-            try:
-                Comment.objects.create(
-                    prompt=prompt_instance,
-                    content=comment_data['content']
-                )
-                # --- CHANGE: Update success message ---
-                self.stdout.write(f"  Created comment for prompt ID {prompt_id_from_json} ('{prompt_instance.title}')")
-            except Exception as e:
-                 # --- CHANGE: Update error message ---
-                 self.stdout.write(self.style.ERROR(f"  Error creating comment for prompt ID {prompt_id_from_json}: {e}"))
+        skipped = 0
+        for data in pending:
+            if data.get('prompt_id') in prompt_ids:
+                comments.append(self.build_comment(data, prompt_ids[data['prompt_id']]))
+            else:
+                skipped += 1
+        flush_comments()
+        return prompt_count, comment_count, skipped
 
-        self.stdout.write(self.style.SUCCESS("Database seeding completed."))
+    @staticmethod
+    def build_comment(data, prompt_id):
+        return prepare_new(Comment(
+            prompt_id=prompt_id,
+            content=data['content'],
+            username=data.get('username'),
+            created_at=data.get('created_at'),
+            updated_at=data.get('updated_at'),
+        ))
@@ -0,0 +1,260 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger('api.metrics')
+
+# --- Metrics Registry ---
+# Request counters, latency histograms and cache/DB/rate-limit counters, kept in
+# plain dicts in each process (behind a lock, for threaded workers) and exposed
+# in Prometheus text format at /metrics. Every process only ever writes its own
+# snapshot file (METRICS_DIR/<pid>.json, replaced atomically at most every
+# METRICS_FLUSH_INTERVAL seconds) and a scrape sums the files of the processes
+# still running, so the totals cover every live worker whichever one answers.
+# Without METRICS_DIR only the answering process is reported.
+
+# Seconds; aimed at SLOs on list/detail latency.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+# name -> (type, help)
+METRICS = {
+    'api_requests_total': (COUNTER, 'Requests handled, by route name, method and status code.'),
+    'api_request_errors_total': (COUNTER, 'Requests that ended in a 5xx response, by route name and method.'),
+    'api_request_duration_seconds': (HISTOGRAM, 'Request latency in seconds, by route name and method.'),
+    'api_ratelimit_rejections_total': (COUNTER, 'Requests rejected by the rate limiter, by route name.'),
+    'api_cache_requests_total': (COUNTER, 'Cache lookups, by result (hit or miss).'),
+    'api_db_connections_total': (COUNTER, 'Requests that used the database, by whether the connection was new or reused.'),
+    'api_cache_hit_ratio': (GAUGE, 'Cache hits / lookups since the metrics directory was cleared.'),
+    'api_db_connection_reuse_ratio': (GAUGE, 'Reused / total DB connections since the metrics directory was cleared.'),
+    'api_metrics_processes': (GAUGE, 'Running processes whose metrics are included.'),
+}
+
+
+class Registry:
+    """One process's metric values. Labels are passed as tuples of (name, value) pairs."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.counters = {}
+        self.histograms = {} # key -> [bucket counts..., +Inf count, sum]
+        self.flushed_at = 0.0
+
+    def check_pid(self):
+        # After a fork (e.g. gunicorn --preload) the child starts from a copy of
+        # the parent's numbers, which the parent's own file already reports.
+        if os.getpid() != self.pid:
+            self.reset()
+
+    def inc(self, name, labels=(), amount=1):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        key = (name, labels)
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, value)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+            histogram[bucket] += 1
+            histogram[-1] += value
+
+    # --- Cross-process aggregation ---
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, labels, list(values)] for (name, labels), values in self.histograms.items()],
+            }
+
+    def flush(self, directory):
+        """Writes this process's snapshot to `directory` (atomically)."""
+        self.check_pid()
+        path = os.path.join(directory, f'{self.pid}.json')
+        temp_path = f'{path}.tmp'
+        os.makedirs(directory, exist_ok=True)
+        with open(temp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temp_path, path)
+        self.flushed_at = time.monotonic()
+
+    def maybe_flush(self):
+        directory = settings.METRICS_DIR
+        if directory and time.monotonic() - self.flushed_at >= settings.METRICS_FLUSH_INTERVAL:
+            # Runs inside a request: a bad METRICS_DIR must never turn it into a 500.
+            # Wait a full interval before trying again either way.
+            try:
+                self.flush(directory)
+            except OSError:
+                logger.exception("Could not write metrics snapshot to %s", directory)
+                self.flushed_at = time.monotonic()
+
+
+registry = Registry()
+
+
+def _pid_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True # Exists, owned by another user
+    return True
+
+
+def collect(directory=None):
+    """
+    Returns `(counters, histograms, process_count)` summed over the snapshots
+    of running processes in `directory`, or over this process alone if there is
+    none. Snapshots of processes that have exited are deleted: their counters
+    drop out of the totals, which Prometheus treats as a counter reset.
+    """
+    if not directory:
+        snapshots = [registry.snapshot()]
+    else:
+        registry.flush(directory)
+        snapshots = []
+        for filename in os.listdir(directory):
+            if not filename.endswith('.json'):
+                continue
+            pid = filename[:-len('.json')]
+            if pid.isdigit() and not _pid_running(int(pid)):
+                try:
+                    os.remove(os.path.join(directory, filename))
+                except OSError:
+                    pass # Already removed by another scrape
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue # Removed or unreadable; skip it for this scrape
+
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            total = histograms.get(key)
+            histograms[key] = values if total is None else [a + b for a, b in zip(total, values)]
+    return counters, histograms, len(snapshots)
+
+
+# --- Prometheus Exposition ---
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _series(name, labels, value):
+    if labels:
+        label_text = ','.join(f'{key}="{_escape(label)}"' for key, label in labels)
+        return f'{name}{{{label_text}}} {value}'
+    return f'{name} {value}'
+
+
+def _ratio(counters, name, label, numerator):
+    values = {labels[0][1]: value for (metric, labels), value in counters.items() if metric == name and labels[0][0] == label}
+    total = sum(values.values())
+    return values.get(numerator, 0) / total if total else 0.0
+
+
+def render(directory=None):
+    """Formats the aggregated metrics in the Prometheus text exposition format."""
+    counters, histograms, process_count = collect(directory)
+    gauges = {
+        'api_cache_hit_ratio': _ratio(counters, 'api_cache_requests_total', 'result', 'hit'),
+        'api_db_connection_reuse_ratio': _ratio(counters, 'api_db_connections_total', 'state', 'reused'),
+        'api_metrics_processes': process_count,
+    }
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == COUNTER:
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(_series(name, labels, value))
+        elif kind == GAUGE:
+            lines.append(_series(name, (), gauges[name]))
+        else:
+            for (metric, labels), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), values[:-1]):
+                    cumulative += count
+                    lines.append(_series(f'{name}_bucket', labels + (('le', bound),), cumulative))
+                lines.append(_series(f'{name}_sum', labels, values[-1]))
+                lines.append(_series(f'{name}_count', labels, cumulative))
+    return '\n'.join(lines) + '\n'
+
+
+# --- Recording Helpers ---
+def route_name(request):
+    """The URL name of the matched route; unmatched paths share one label."""
+    match = getattr(request, 'resolver_match', None)
+    return (match.view_name or match.url_name or 'unnamed') if match else 'unmatched'
+
+
+def record_cache_lookup(hits, misses=0):
+    if hits:
+        registry.inc('api_cache_requests_total', (('result', 'hit'),), hits)
+    if misses:
+        registry.inc('api_cache_requests_total', (('result', 'miss'),), misses)
+
+
+def record_ratelimit_rejection(request):
+    registry.inc('api_ratelimit_rejections_total', (('route', route_name(request)),))
+
+
+class MetricsMiddleware:
+    """Records one request's count, latency and DB connection use."""
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        registry.check_pid()
+        # Persistent connections (CONN_MAX_AGE) are already open when reused.
+        was_connected = connection.connection is not None
+        used_db = []
+
+        def note_db_use(execute, sql, params, many, context):
+            used_db.append(True)
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(note_db_use):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        labels = (('route', route_name(request)), ('method', request.method))
+        registry.inc('api_requests_total', labels + (('status', str(response.status_code)),))
+        if response.status_code >= 500:
+            registry.inc('api_request_errors_total', labels)
+        registry.observe('api_request_duration_seconds', elapsed, labels)
+        if used_db:
+            registry.inc('api_db_connections_total', (('state', 'reused' if was_connected else 'new'),))
+        registry.maybe_flush()
+        return response
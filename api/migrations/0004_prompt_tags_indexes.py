@@ -0,0 +1,56 @@
+# Generated by Django 5.2 on 2026-10-16 22:34
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+# Generated columns may only call IMMUTABLE functions, and Postgres has no
+# built-in to lower-case every element of an array, so provide one.
+CREATE_LOWER_TAGS_FUNCTION = """
+CREATE OR REPLACE FUNCTION api_lower_tags(tags varchar[])
+RETURNS varchar[]
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+AS $$ SELECT ARRAY(SELECT lower(tag) FROM unnest(tags) AS tag)::varchar[] $$;
+"""
+
+DROP_LOWER_TAGS_FUNCTION = "DROP FUNCTION IF EXISTS api_lower_tags(varchar[]);"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_prompt_title_trigram"),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_LOWER_TAGS_FUNCTION, DROP_LOWER_TAGS_FUNCTION),
+        migrations.AddField(
+            model_name="prompt",
+            name="tags_lower",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.Func(
+                    models.F("tags"),
+                    function="api_lower_tags",
+                    output_field=django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=30), size=None
+                    ),
+                ),
+                output_field=django.contrib.postgres.fields.ArrayField(
+                    base_field=models.CharField(max_length=30), size=None
+                ),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="prompt",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["tags"], name="prompt_tags_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="prompt",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["tags_lower"], name="prompt_tags_lower_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-16 22:36
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0004_prompt_tags_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["prompt", "created_at", "comment_id"],
+                name="comment_prompt_keyset_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="prompt",
+            index=models.Index(
+                fields=["updated_at", "prompt_id"], name="prompt_updated_keyset_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="prompt",
+            index=models.Index(
+                django.db.models.functions.text.Lower("title"),
+                models.F("prompt_id"),
+                name="prompt_title_keyset_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-16 22:37
+
+from django.db import migrations, models
+
+BACKFILL_COMMENT_COUNTS = """
+UPDATE api_prompt
+SET comment_count = counts.total
+FROM (SELECT prompt_id, COUNT(*) AS total FROM api_comment GROUP BY prompt_id) AS counts
+WHERE api_prompt.prompt_id = counts.prompt_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0005_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="prompt",
+            name="comment_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(BACKFILL_COMMENT_COUNTS, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-16 22:39
+
+import django.db.models.functions.math
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0006_prompt_comment_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="prompt",
+            name="random_key",
+            field=models.FloatField(
+                db_default=django.db.models.functions.math.Random(), editable=False
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="prompt",
+            index=models.Index(fields=["random_key"], name="prompt_random_key_idx"),
+        ),
+    ]
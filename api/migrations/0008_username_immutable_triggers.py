@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-16 23:05
+
+from django.db import migrations
+
+# username is set once on creation. Model saves already leave it out of their
+# UPDATEs; this guard also covers queryset.update() and raw SQL, with no extra
+# round trip on any write.
+CREATE_KEEP_USERNAME_TRIGGERS = """
+CREATE OR REPLACE FUNCTION api_keep_username()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.username := OLD.username;
+    RETURN NEW;
+END;
+$$;
+
+CREATE TRIGGER api_prompt_keep_username
+BEFORE UPDATE OF username ON api_prompt
+FOR EACH ROW EXECUTE FUNCTION api_keep_username();
+
+CREATE TRIGGER api_comment_keep_username
+BEFORE UPDATE OF username ON api_comment
+FOR EACH ROW EXECUTE FUNCTION api_keep_username();
+"""
+
+DROP_KEEP_USERNAME_TRIGGERS = """
+DROP TRIGGER IF EXISTS api_comment_keep_username ON api_comment;
+DROP TRIGGER IF EXISTS api_prompt_keep_username ON api_prompt;
+DROP FUNCTION IF EXISTS api_keep_username();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0007_prompt_random_key"),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_KEEP_USERNAME_TRIGGERS, DROP_KEEP_USERNAME_TRIGGERS),
+    ]
@@ -1,12 +1,20 @@
+import re
 import uuid
 import secrets
 import random
-from django.db import models
+from django.db import models, connections
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.validators import MaxLengthValidator, MinLengthValidator
 from django.core.exceptions import ValidationError
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Lower, Random, Upper
 from django.utils.translation import gettext_lazy as _
 
+# Text search configuration used for the prompt search document and queries.
+SEARCH_CONFIG = 'english'
+
 # --- Helper Functions ---
 
 def generate_modification_code():
@@ -33,6 +41,137 @@ def validate_tags(tags):
         if len(tag) > 30:
             raise ValidationError(_('Each tag must be 30 characters or less (before cleaning).'))
 
+# --- Custom Lookups ---
+
+@models.UUIDField.register_lookup
+class AnyLookup(models.Lookup):
+    """
+    `field__any=[...]`: `field = ANY(%s::uuid[])` with the whole list as one
+    array parameter, so the statement is the same whatever the list length.
+    """
+    lookup_name = 'any'
+    prepare_rhs = False # The value is a list, not a single UUID
+
+    def get_db_prep_lookup(self, value, connection):
+        field = self.lhs.output_field
+        return '%s', [[field.get_db_prep_value(item, connection) for item in value]]
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        db_type = self.lhs.output_field.db_type(connection)
+        return f'{lhs} = ANY({rhs}::{db_type}[])', (*lhs_params, *rhs_params)
+
+def restore_loaded_username(instance):
+    """Puts back the username an instance was loaded with, if it was loaded at all."""
+    loaded_values = getattr(instance, '_loaded_values', None)
+    if loaded_values and 'username' in loaded_values:
+        instance.username = loaded_values['username']
+
+def get_update_fields(instance, update_fields, exclude):
+    """
+    Returns the update_fields for saving an existing instance: the given ones, or
+    every loaded, non-generated column when None, minus the `exclude` names.
+    """
+    if update_fields is None:
+        deferred = instance.get_deferred_fields()
+        update_fields = [
+            field.name for field in instance._meta.concrete_fields
+            if not field.primary_key and not field.generated and field.attname not in deferred
+        ]
+    return [name for name in update_fields if name not in exclude]
+
+def prepare_new(instance):
+    """
+    Fills in what save() generates for a new Prompt or Comment (username if blank,
+    modification code), for bulk paths that bypass save(). Returns the instance.
+    """
+    if not instance.username:
+        instance.username = generate_username()[:50]
+    instance.modification_code = generate_modification_code()
+    return instance
+
+# --- Managers ---
+
+class PromptManager(models.Manager):
+    def get_queryset(self):
+        # The generated search/filter columns are only ever used inside SQL,
+        # so don't ship them back to Python with every row.
+        return super().get_queryset().defer('search_vector', 'tags_lower')
+
+    def create_many(self, items, batch_size=500):
+        """
+        Inserts already-validated prompt data (dicts of field values) with
+        bulk_create, generating usernames and modification codes the same way
+        Prompt.save does. Returns the created instances in input order.
+
+        bulk_create skips save() and signals: callers wrap this in a transaction
+        and handle capacity and cache invalidation themselves.
+        """
+        prompts = [prepare_new(self.model(**item)) for item in items]
+        return self.bulk_create(prompts, batch_size=batch_size)
+
+    def reconcile_comment_counts(self):
+        """
+        Recomputes the denormalized comment_count for every prompt whose stored
+        value has drifted (e.g. after bulk inserts that bypass signals).
+        Returns the number of prompts that were repaired.
+        """
+        actual_count = Coalesce(
+            Subquery(
+                Comment.objects.filter(prompt=OuterRef('pk'))
+                .order_by()
+                .values('prompt')
+                .annotate(total=Count('*'))
+                .values('total')
+            ),
+            0
+        )
+        return self.exclude(comment_count=actual_count).update(comment_count=actual_count)
+
+    def random_sample(self, count=1, tags=None):
+        """
+        Returns up to `count` random prompts (optionally having any of `tags`) in at
+        most two index range scans on random_key instead of ORDER BY random(): start
+        at a random point and wrap around to the beginning if the tail runs out.
+        Neighbouring rows tend to be drawn together, which is fine for discovery.
+        """
+        queryset = self.get_queryset()
+        if tags:
+            queryset = queryset.filter(tags_lower__overlap=[tag.lower() for tag in tags])
+        pivot = random.random()
+        picked = list(queryset.filter(random_key__gte=pivot).order_by('random_key')[:count])
+        if len(picked) < count:
+            picked += list(queryset.filter(random_key__lt=pivot).order_by('random_key')[:count - len(picked)])
+        return picked
+
+    def tag_counts(self, prefix=None, min_count=1, order='name', limit=None):
+        """
+        Returns (tag, usage_count) pairs aggregated in a single SQL query, so only
+        the final list leaves the database. Names sort by code point (like Python's
+        sorted()), counts sort descending with the name as tie-breaker.
+        """
+        where = ["tag <> ''"]
+        params = []
+        if prefix:
+            where.append("tag ILIKE %s")
+            params.append(re.sub(r'([\\%_])', r'\\\1', prefix) + '%')
+        params.append(min_count)
+        order_by = 'usage_count DESC, tag COLLATE "C"' if order == 'count' else 'tag COLLATE "C"'
+        sql = (
+            f'SELECT tag, COUNT(*) AS usage_count '
+            f'FROM {self.model._meta.db_table}, unnest(tags) AS tag '
+            f'WHERE {" AND ".join(where)} '
+            f'GROUP BY tag HAVING COUNT(*) >= %s '
+            f'ORDER BY {order_by}'
+        )
+        if limit is not None:
+            sql += ' LIMIT %s'
+            params.append(limit)
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
 # --- Models ---
 
 class Prompt(models.Model):
@@ -55,6 +194,58 @@ class Prompt(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized number of comments, kept in step by the Comment signal
+    # handlers in signals.py (see also the reconcile_comment_counts command).
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Uniform random sort key assigned by Postgres on insert; lets the random
+    # prompt endpoint seek into an index instead of sorting the whole table.
+    random_key = models.FloatField(db_default=Random(), editable=False)
+    # Lower-cased copy of `tags` for case-insensitive (and indexed) tag filtering.
+    # api_lower_tags() is an IMMUTABLE SQL helper created in migration 0004.
+    tags_lower = models.GeneratedField(
+        expression=models.Func(
+            models.F('tags'),
+            function='api_lower_tags',
+            output_field=ArrayField(models.CharField(max_length=30)),
+        ),
+        output_field=ArrayField(models.CharField(max_length=30)),
+        db_persist=True,
+    )
+    # Full-text search document, maintained by Postgres on every write.
+    # Title matches are weighted higher ('A') than content matches ('B').
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('title', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('content', weight='B', config=SEARCH_CONFIG)
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = PromptManager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded values so changes can be detected without a query.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='prompt_search_vector_idx'),
+            GinIndex(fields=['tags'], name='prompt_tags_idx'),
+            GinIndex(fields=['tags_lower'], name='prompt_tags_lower_idx'),
+            # Trigram indexes (pg_trgm): the plain column serves similarity
+            # operators (%, %>), the UPPER() expression matches the SQL Django
+            # emits for __icontains, so '%term%' lookups stop scanning the table.
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='prompt_title_trgm_idx'),
+            GinIndex(OpClass(Upper('title'), name='gin_trgm_ops'), name='prompt_title_upper_trgm_idx'),
+            models.Index(fields=['random_key'], name='prompt_random_key_idx'),
+            # Keyset pagination keys for the `sort` options.
+            models.Index(fields=['updated_at', 'prompt_id'], name='prompt_updated_keyset_idx'),
+            models.Index(Lower('title'), models.F('prompt_id'), name='prompt_title_keyset_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         is_new = self._state.adding # Use this to check if it's a new instance
@@ -69,17 +260,16 @@ class Prompt(models.Model):
         if is_new: # No need to check if self.modification_code exists, always generate for new
             self.modification_code = generate_modification_code()
 
-        # Prevent username update after creation
-        if not is_new: # Only run this block if it's an UPDATE (not new)
-            try:
-                # Fetch the original state from the database
-                original = Prompt.objects.get(pk=self.pk)
-                if original.username != self.username:
-                     # Reset username if it was changed during update
-                     self.username = original.username
-            except Prompt.DoesNotExist:
-                # This case should ideally not happen during an update, but handle defensively
-                pass
+        # Prevent username update after creation. username is left out of the
+        # UPDATE (see _get_update_fields) and the DB trigger from migration 0008
+        # guards every other write path; restore the loaded value in memory only.
+        # comment_count is only ever changed with F() updates, so a possibly stale
+        # in-memory value is never written back either.
+        if not is_new:
+            restore_loaded_username(self)
+            kwargs['update_fields'] = get_update_fields(
+                self, kwargs.get('update_fields'), exclude=('username', 'comment_count')
+            )
 
         super().save(*args, **kwargs) # Call the "real" save() method.
 
@@ -113,19 +303,28 @@ class Comment(models.Model):
         if is_new:
             self.modification_code = generate_modification_code()
 
-        # Prevent username update after creation
-        if not is_new: # Only run this block if it's an UPDATE
-            try:
-                original = Comment.objects.get(pk=self.pk)
-                if original.username != self.username:
-                     self.username = original.username
-            except Comment.DoesNotExist:
-                pass
+        # Prevent username update after creation (same approach as Prompt.save)
+        if not is_new:
+            restore_loaded_username(self)
+            kwargs['update_fields'] = get_update_fields(self, kwargs.get('update_fields'), exclude=('username',))
 
         super().save(*args, **kwargs)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded values so username can be restored without a query.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def __str__(self):
-        return f"Comment on '{self.prompt.title}' by {self.username or 'Anonymous'}"
+        # Only use the prompt's title if it is already loaded; never query for it.
+        prompt = self.prompt.title if Comment.prompt.is_cached(self) else self.prompt_id
+        return f"Comment on '{prompt}' by {self.username or 'Anonymous'}"
 
     class Meta:
         ordering = ['-created_at'] # Default ordering for comments (newest first)
+        indexes = [
+            # Serves per-prompt comment pages in both pagination modes.
+            models.Index(fields=['prompt', 'created_at', 'comment_id'], name='comment_prompt_keyset_idx'),
+        ]
@@ -0,0 +1,183 @@
+import base64
+import binascii
+import datetime
+import json
+import uuid
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db.models import F, Field, Func, Value
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+# --- Page Number Pagination ---
+class StandardResultsSetPagination(PageNumberPagination):
+    page_size = 10
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Views that already counted the rows (see conditional.py) set
+        # `known_count`, which saves the paginator's COUNT(*).
+        self.known_count = getattr(view, 'known_count', None)
+        return super().paginate_queryset(queryset, request, view=view)
+
+    def django_paginator_class(self, object_list, per_page):
+        paginator = DjangoPaginator(object_list, per_page)
+        if self.known_count is not None:
+            paginator.count = self.known_count
+        return paginator
+
+
+# --- Keyset (Cursor) Pagination ---
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination driven by a keyset instead of OFFSET.
+
+    The view provides the keys through `get_keyset_ordering()`, which returns
+    `(expressions, descending)`. The last expression must be unique (the primary
+    key) so every row has a distinct position. Each page is fetched with a single
+    `ROW(keys...) < ROW(cursor...)` query that an index on the same keys can serve,
+    so the cost of a page does not depend on its depth and no COUNT(*) is run.
+    """
+    page_size = 10
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+
+        keys, descending = view.get_keyset_ordering()
+        self.aliases = [f'_keyset_{index}' for index in range(len(keys))]
+        queryset = queryset.annotate(**dict(zip(self.aliases, keys)))
+        output_fields = [queryset.query.annotations[alias].output_field for alias in self.aliases]
+
+        cursor = self.decode_cursor(request, output_fields)
+        reverse = cursor is not None and cursor['reverse']
+        # Walking backwards (a "previous" cursor) scans the ordering the other way
+        # round and flips the page back afterwards.
+        scan_descending = descending != reverse
+
+        if cursor is not None:
+            row = Func(*[F(alias) for alias in self.aliases], function='ROW', output_field=Field())
+            bound = Func(
+                *[Value(value, output_field=field) for value, field in zip(cursor['position'], output_fields)],
+                function='ROW',
+                output_field=Field()
+            )
+            lookup = '_keyset_row__lt' if scan_descending else '_keyset_row__gt'
+            queryset = queryset.alias(_keyset_row=row).filter(**{lookup: bound})
+
+        ordering = [F(alias).desc() if scan_descending else F(alias).asc() for alias in self.aliases]
+        results = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.next_position = self._get_position(results[-1]) if results and self.has_next else None
+        self.previous_position = self._get_position(results[0]) if results and self.has_previous else None
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def encode_cursor(self, position, reverse):
+        """Returns the current URL with an opaque cursor for the given position."""
+        payload = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(remove_query_param(self.base_url, 'page'), self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request, output_fields):
+        """Returns {'position': [...], 'reverse': bool} for the request's cursor, or None."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            position = payload['p']
+            if not isinstance(position, list) or len(position) != len(output_fields):
+                raise ValueError
+            position = [field.to_python(value) for value, field in zip(position, output_fields)]
+            return {'position': position, 'reverse': bool(payload.get('r'))}
+        except (TypeError, ValueError, KeyError, binascii.Error, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _get_position(self, row):
+        values = [row[alias] if isinstance(row, dict) else getattr(row, alias) for alias in self.aliases]
+        return [self._encode_value(value) for value in values]
+
+    @staticmethod
+    def _encode_value(value):
+        # Keep full precision: a truncated timestamp would skip or repeat rows.
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return value
+
+
+# --- View Mixin ---
+class PaginationModeMixin:
+    """
+    Lets clients of a list view opt into keyset pagination with `?pagination=cursor`
+    (or by following a `cursor` link). Views using it implement `get_keyset_ordering()`.
+    """
+    cursor_pagination_class = KeysetPagination
+
+    def use_cursor_pagination(self):
+        params = self.request.query_params
+        return (
+            params.get('pagination', '').lower() == 'cursor'
+            or self.cursor_pagination_class.cursor_query_param in params
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.use_cursor_pagination():
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
@@ -0,0 +1,43 @@
+import codecs
+
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from .renderers import ORJSONRenderer, msgpack
+
+# --- Parsers ---
+# Request-body counterparts of api/renderers.py.
+
+
+class ORJSONParser(BaseParser):
+    """Parses JSON request bodies with orjson (rejecting NaN/Infinity like DRF's JSONParser)."""
+    media_type = 'application/json'
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            body = stream.read() if stream is not None else b''
+            if codecs.lookup(encoding).name != 'utf-8':
+                body = body.decode(encoding)
+            return orjson.loads(body)
+        except (ValueError, LookupError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+if msgpack is not None:
+    from .renderers import MessagePackRenderer
+
+    class MessagePackParser(BaseParser):
+        """Parses `application/msgpack` request bodies."""
+        media_type = 'application/msgpack'
+        renderer_class = MessagePackRenderer
+
+        def parse(self, stream, media_type=None, parser_context=None):
+            try:
+                return msgpack.unpackb(stream.read() if stream is not None else b'', raw=False)
+            except (ValueError, msgpack.UnpackException) as exc:
+                raise ParseError('MessagePack parse error - %s' % str(exc))
@@ -0,0 +1,174 @@
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+from django.utils import timezone
+
+# --- Request Profiling ---
+# Opt-in profiling of single requests, for finding where Python time goes in a
+# slow request (DRF, the ORM, bleach, validators...). A request is profiled when
+# it carries a valid signed PROFILING_HEADER (see `manage.py profiles token`) or
+# its route name is in PROFILING_ROUTES. Each capture writes to PROFILING_DIR:
+#   <id>.prof       cProfile stats (pstats, snakeviz, `profiles diff`)
+#   <id>.collapsed  sampled stacks in collapsed format (flamegraph.pl, speedscope)
+#   <id>.json       request metadata (`profiles list`)
+# The middleware is only installed when PROFILING_ENABLED is on, so it costs
+# nothing otherwise.
+
+SIGNING_SALT = 'api.profiling'
+TOKEN_VALUE = 'profile'
+
+# cProfile can only be active once per process; concurrent requests in other
+# threads run unprofiled while a capture is in progress.
+_profiler_lock = threading.Lock()
+
+
+def make_token():
+    """A signed header value allowing profiled requests for PROFILING_TOKEN_MAX_AGE seconds."""
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign(TOKEN_VALUE)
+
+
+def token_is_valid(token):
+    try:
+        value = signing.TimestampSigner(salt=SIGNING_SALT).unsign(token, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return value == TOKEN_VALUE
+
+
+class StackSampler:
+    """
+    Records the stack of one thread every `interval` seconds from a background
+    thread. Counts are keyed by collapsed stack ("outer;...;inner").
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.counts.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+def _slug(value):
+    return re.sub(r'[^A-Za-z0-9]+', '-', value).strip('-')[:60] or 'root'
+
+
+class ProfilingMiddleware:
+    """Profiles requests selected by should_profile() and adds an X-Profile-Id header."""
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+
+    def __call__(self, request):
+        route = self.get_route(request)
+        if not self.should_profile(request, route) or not _profiler_lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self.profile(request, route)
+        finally:
+            _profiler_lock.release()
+
+    def profile(self, request, route):
+        profiler = cProfile.Profile()
+        sampler = StackSampler(threading.get_ident(), settings.PROFILING_SAMPLE_INTERVAL)
+        sampler.start()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - started
+            sampler.stop()
+
+        capture_id = f"{timezone.now():%Y%m%dT%H%M%S%f}-{request.method.lower()}-{_slug(route or request.path)}"
+        base = os.path.join(settings.PROFILING_DIR, capture_id)
+        profiler.dump_stats(f'{base}.prof')
+        sampler.write(f'{base}.collapsed')
+        with open(f'{base}.json', 'w') as f:
+            json.dump({
+                'id': capture_id,
+                'method': request.method,
+                'path': request.get_full_path(),
+                'route': route,
+                'status': response.status_code,
+                'duration_ms': round(elapsed * 1000, 2),
+                'samples': sum(sampler.counts.values()),
+                'created': timezone.now().isoformat(),
+            }, f, indent=2)
+        response['X-Profile-Id'] = capture_id
+        return response
+
+    @staticmethod
+    def get_route(request):
+        try:
+            return resolve(request.path_info).view_name
+        except Resolver404:
+            return None
+
+    @staticmethod
+    def should_profile(request, route):
+        if route and route in settings.PROFILING_ROUTES:
+            return True
+        token = request.headers.get(settings.PROFILING_HEADER)
+        return bool(token) and token_is_valid(token)
+
+
+# --- Captures ---
+def list_captures(directory):
+    """Metadata of every capture in `directory`, newest first."""
+    captures = []
+    for filename in os.listdir(directory) if os.path.isdir(directory) else ():
+        if filename.endswith('.json'):
+            try:
+                with open(os.path.join(directory, filename)) as f:
+                    captures.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return sorted(captures, key=lambda capture: capture['id'], reverse=True)
+
+
+def function_times(stats):
+    """`{function label: (total time, cumulative time, calls)}` from a pstats.Stats."""
+    times = {}
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        label = f'{name} ({os.path.basename(filename)}:{line})' if line else name
+        total, cumulative, count = times.get(label, (0.0, 0.0, 0))
+        times[label] = (total + tottime, cumulative + cumtime, count + calls)
+    return times
@@ -0,0 +1,128 @@
+import logging
+import re
+import traceback
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger('api.queries')
+
+# --- Query Budgets ---
+# The most queries one request to each route may run, by URL name and method,
+# with a cold cache. api/tests.py drives every route (reading streamed responses
+# to the end) and fails when a view goes over its budget (or a route has none),
+# so query regressions fail CI. Raise a budget only together with the change
+# that needs it.
+QUERY_BUDGETS = {
+    'api:api-root': {'GET': 0},
+    # GET: validators (MAX/COUNT, reused by the paginator) + page; fuzzy adds set_config().
+    # POST: capacity seed (cold cache only) + INSERT + random_key refresh.
+    'api:prompt-list-create': {'GET': 3, 'POST': 3},
+    # Up to two random_key seeks (wrap-around) + comments.
+    'api:prompt-random': {'GET': 3},
+    # One = ANY(...) query for up to PROMPT_BATCH_MAX_IDS ids + latest comments.
+    'api:prompt-batch': {'POST': 2},
+    'api:prompt-bulk-create': {'POST': 2},
+    # Per PROMPT_EXPORT_CHUNK_SIZE prompts: the cursor fetch + comments (include=comments).
+    # These run while the response streams, so QueryInspectionMiddleware never sees
+    # them; only the test below (which consumes the stream) enforces this budget.
+    'api:prompt-export': {'GET': 2},
+    'api:prompt-detail': {'GET': 3, 'PUT': 3, 'PATCH': 3, 'DELETE': 3},
+    'api:comment-list-create': {'GET': 3, 'POST': 4},
+    'api:comment-detail': {'GET': 2, 'PUT': 2, 'PATCH': 2, 'DELETE': 3},
+    'api:tag-list': {'GET': 1},
+    'api:cache-test': {'GET': 0, 'POST': 0, 'DELETE': 0},
+}
+
+
+def get_budget(view_name, method):
+    """Returns the query budget for a route and method, or None if it has none."""
+    return QUERY_BUDGETS.get(view_name, {}).get(method)
+
+
+_WHITESPACE = re.compile(r'\s+')
+_STRING_LITERAL = re.compile(r"'(?:''|[^'])*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'IN \((?:%s|\?)(?:, (?:%s|\?))*\)')
+
+
+def fingerprint(sql):
+    """Normalises a statement so queries differing only in their values compare equal."""
+    sql = _WHITESPACE.sub(' ', sql.strip())
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+class QueryRecorder:
+    """
+    connection.execute_wrapper() hook counting statements per fingerprint. The
+    stack is captured once a fingerprint repeats `threshold` times, not per query.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = Counter()
+        self.stacks = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        key = fingerprint(sql)
+        self.counts[key] += 1
+        if self.counts[key] == self.threshold:
+            self.stacks[key] = ''.join(_project_frames(traceback.extract_stack()[:-1]))
+        return execute(sql, params, many, context)
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def repeated(self):
+        """Yields `(fingerprint, count, stack)` for likely N+1 patterns."""
+        for key, count in self.counts.most_common():
+            if count < self.threshold:
+                break
+            yield key, count, self.stacks.get(key, '')
+
+
+def _project_frames(frames):
+    # Only our own code is useful in the report; Django/DRF frames are noise.
+    base_dir = str(settings.BASE_DIR)
+    project = [frame for frame in frames if frame.filename.startswith(base_dir) and 'site-packages' not in frame.filename]
+    return traceback.format_list(project or frames[-8:])
+
+
+class QueryInspectionMiddleware:
+    """
+    Development aid, active when DEBUG and QUERY_INSPECTION are on: logs requests
+    that exceed their route's query budget, and statements repeated at least
+    N_PLUS_ONE_THRESHOLD times in one request along with where they came from.
+    Queries run while a streaming response is consumed are not seen.
+    """
+
+    def __init__(self, get_response):
+        if not (settings.DEBUG and settings.QUERY_INSPECTION):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder(settings.N_PLUS_ONE_THRESHOLD)
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        self.report(request, recorder)
+        return response
+
+    def report(self, request, recorder):
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else request.path
+        budget = get_budget(view_name, request.method)
+        if budget is not None and recorder.total > budget:
+            logger.warning(
+                "Query budget exceeded: %s %s ran %d queries (budget %d).",
+                request.method, request.path, recorder.total, budget
+            )
+        for key, count, stack in recorder.repeated():
+            logger.warning(
+                "Possible N+1 in %s %s: %d x %s\n%s", request.method, request.path, count, key, stack
+            )
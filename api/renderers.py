@@ -0,0 +1,52 @@
+import orjson
+from django.utils.http import parse_header_parameters
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError: # Optional: MessagePack support is only offered when installed
+    msgpack = None
+
+# --- Renderers ---
+# orjson-backed JSON (the default) and optional MessagePack, picked by content
+# negotiation (Accept header or ?format=). Serializers already turn model values
+# into primitives; anything left over goes through DRF's own JSONEncoder.default()
+# so Decimals, lazy strings, timedeltas etc. come out as they did before.
+
+_drf_default = JSONEncoder().default
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Compact UTF-8 JSON via orjson. UUIDs and datetimes are encoded natively
+    (datetimes in UTC end in "Z"; unlike DRF's encoder, microseconds are kept).
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None # JSON is always UTF-8
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        option = self.options
+        # Honour indentation requests (`Accept: application/json; indent=4`, or the
+        # browsable API's renderer_context) the way orjson can: two spaces.
+        if (renderer_context or {}).get('indent') or 'indent' in parse_header_parameters(accepted_media_type or '')[1]:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_drf_default, option=option)
+
+
+if msgpack is not None:
+    class MessagePackRenderer(BaseRenderer):
+        """`application/msgpack` responses for service-to-service clients."""
+        media_type = 'application/msgpack'
+        format = 'msgpack'
+        charset = None
+        render_style = 'binary'
+
+        def render(self, data, accepted_media_type=None, renderer_context=None):
+            if data is None:
+                return b''
+            return msgpack.packb(data, default=_drf_default, use_bin_type=True)
@@ -3,6 +3,7 @@ import bleach
 from rest_framework import serializers
 from .models import Prompt, Comment
 from .validators import validate_tags
+from .timing import SANITIZE, SERIALIZE, measure
 
 # --- Define allowed HTML (optional, empty means strip all) ---
 # If you wanted to allow specific safe tags like bold/italic:
@@ -14,7 +15,37 @@ ALLOWED_ATTRIBUTES = {}
 # --- End Define ---
 
 
-class CommentSerializer(serializers.ModelSerializer):
+# Characters bleach.clean() may change: markup, entities, and the C0 controls
+# (other than tab and newline) that html5lib rewrites. Text without any of them
+# comes back unchanged, so it skips the (slow) HTML parse.
+_NEEDS_CLEANING = re.compile(r'[<>&\x00-\x08\x0b-\x1f]')
+
+
+def sanitize(value):
+    """Strips HTML from user input (timed for the Server-Timing header)."""
+    with measure(SANITIZE):
+        if not _NEEDS_CLEANING.search(value):
+            return value
+        return bleach.clean(value, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+
+
+# --- Timed Serialization ---
+# `.data` is where DRF turns instances into primitives; time it for the
+# Server-Timing header. Nested serializers only run to_representation(), so
+# they are part of their parent's measurement.
+class TimedDataMixin:
+    @property
+    def data(self):
+        with measure(SERIALIZE):
+            return super().data
+
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    pass
+# --- End Timed Serialization ---
+
+
+class CommentSerializer(TimedDataMixin, serializers.ModelSerializer):
     username = serializers.CharField(
         max_length=50,
         required=False,
@@ -25,6 +56,7 @@ class CommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Comment
+        list_serializer_class = TimedListSerializer
         fields = [
             'comment_id', 'prompt', 'content', 'username', 'modification_code',
             'created_at', 'updated_at',
@@ -39,12 +71,12 @@ class CommentSerializer(serializers.ModelSerializer):
     # --- Add bleach validation for content ---
     def validate_content(self, value):
         """Strip HTML tags from comment content."""
-        cleaned_value = bleach.clean(value, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+        cleaned_value = sanitize(value)
         return cleaned_value
     # --- End Add ---
 
 
-class PromptSerializer(serializers.ModelSerializer):
+class PromptSerializer(TimedDataMixin, serializers.ModelSerializer):
     username = serializers.CharField(
         max_length=50,
         required=False,
@@ -58,6 +90,7 @@ class PromptSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Prompt
+        list_serializer_class = TimedListSerializer
         fields = [
             'prompt_id', 'title', 'content', 'username', 'tags',
             'modification_code', 'created_at', 'updated_at', 'comments',
@@ -72,7 +105,7 @@ class PromptSerializer(serializers.ModelSerializer):
     # --- Add bleach validation for title and content ---
     def validate_title(self, value):
         """Strip HTML tags from prompt title."""
-        cleaned_value = bleach.clean(value, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+        cleaned_value = sanitize(value)
         # Optional: Add extra validation after cleaning if needed
         if not cleaned_value:
              raise serializers.ValidationError("Title cannot be empty after HTML stripping.")
@@ -80,7 +113,7 @@ class PromptSerializer(serializers.ModelSerializer):
 
     def validate_content(self, value):
         """Strip HTML tags from prompt content."""
-        cleaned_value = bleach.clean(value, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+        cleaned_value = sanitize(value)
         # Optional: Add extra validation after cleaning if needed
         if not cleaned_value:
              raise serializers.ValidationError("Content cannot be empty after HTML stripping.")
@@ -136,6 +169,18 @@ class PromptSerializer(serializers.ModelSerializer):
         return final_tags # Return the cleaned, deduplicated list
 
 
+class PromptDetailSerializer(PromptSerializer):
+    """
+    PromptSerializer without the nested `comments` field, for views that attach
+    their own (paginated/limited) comment block instead of serializing them all.
+    """
+    comments = None
+
+    class Meta(PromptSerializer.Meta):
+        fields = [field for field in PromptSerializer.Meta.fields if field != 'comments']
+        read_only_fields = [field for field in PromptSerializer.Meta.read_only_fields if field != 'comments']
+
+
 # --- Update PromptListSerializer (Minimal Change for comment_count) ---
 class PromptListSerializer(PromptSerializer):
     username = serializers.CharField(read_only=True) # Keep existing override
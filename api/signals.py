@@ -0,0 +1,103 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import capacity
+from .models import Prompt, Comment
+from .caching import PROMPT_LIST_VERSION, TAGS_VERSION, bump_version, prompt_version
+
+
+# --- Comment Count Maintenance ---
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    """Bumps the parent prompt's denormalized comment_count on comment creation."""
+    if created:
+        Prompt.objects.filter(pk=instance.prompt_id).update(comment_count=F('comment_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, origin=None, **kwargs):
+    """Lowers the parent prompt's comment_count when a comment is deleted."""
+    # When the prompt itself is being deleted (cascade), there is nothing to update.
+    if isinstance(origin, Prompt) or getattr(origin, 'model', None) is Prompt:
+        return
+    Prompt.objects.filter(pk=instance.prompt_id).update(
+        comment_count=Greatest(F('comment_count') - 1, 0)
+    )
+
+
+# --- Tag Cache Invalidation ---
+@receiver(post_save, sender=Prompt)
+def invalidate_tags_on_save(sender, instance, created, update_fields=None, **kwargs):
+    """Bumps the tag list version when a saved prompt's tags actually changed."""
+    if update_fields is not None and 'tags' not in update_fields:
+        return
+    loaded_values = getattr(instance, '_loaded_values', None)
+    if created:
+        changed = bool(instance.tags)
+    elif loaded_values is None or 'tags' not in loaded_values:
+        changed = True # Not loaded from the DB, so we can't tell: assume it did.
+    else:
+        changed = (loaded_values['tags'] or []) != (instance.tags or [])
+    if changed:
+        bump_version(TAGS_VERSION)
+    # The saved tags are the baseline for any later save of this instance.
+    instance._loaded_values = {**(loaded_values or {}), 'tags': list(instance.tags or [])}
+
+
+@receiver(post_delete, sender=Prompt)
+def invalidate_tags_on_delete(sender, instance, **kwargs):
+    """Bumps the tag list version when a prompt with tags is deleted."""
+    if instance.tags:
+        bump_version(TAGS_VERSION)
+
+
+# --- Prompt Detail Cache Invalidation ---
+@receiver(post_save, sender=Prompt)
+@receiver(post_delete, sender=Prompt)
+def invalidate_prompt_detail(sender, instance, **kwargs):
+    """Retires cached detail responses for a prompt that was written or deleted."""
+    bump_version(prompt_version(instance.pk))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_prompt_detail_for_comment(sender, instance, origin=None, **kwargs):
+    """Retires cached detail responses of the prompt a comment belongs to."""
+    # Cascades from a prompt delete are covered by the prompt's own handler.
+    if isinstance(origin, Prompt) or getattr(origin, 'model', None) is Prompt:
+        return
+    bump_version(prompt_version(instance.prompt_id))
+
+
+# --- Prompt List Validators ---
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_prompt_lists_for_comment(sender, instance, created=False, origin=None, **kwargs):
+    """
+    Retires prompt list ETags when a comment_count changes. Prompt writes move
+    updated_at or the row count, which the list validators already cover.
+    """
+    if kwargs['signal'] is post_save and not created:
+        return
+    if isinstance(origin, Prompt) or getattr(origin, 'model', None) is Prompt:
+        return
+    bump_version(PROMPT_LIST_VERSION)
+
+
+# --- Capacity Accounting ---
+@receiver(post_delete, sender=Prompt)
+def release_prompt_capacity(sender, instance, **kwargs):
+    """Gives back the prompt's slot plus those of its cascaded comments in one go."""
+    capacity.release(capacity.PROMPTS)
+    if instance.comment_count:
+        capacity.release(capacity.COMMENTS, instance.comment_count)
+
+
+@receiver(post_delete, sender=Comment)
+def release_comment_capacity(sender, instance, origin=None, **kwargs):
+    """Gives back a deleted comment's slot (cascades are counted by the prompt)."""
+    if isinstance(origin, Prompt) or getattr(origin, 'model', None) is Prompt:
+        return
+    capacity.release(capacity.COMMENTS)
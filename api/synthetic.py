@@ -0,0 +1,155 @@
+import bisect
+import datetime
+import itertools
+import math
+import random
+import uuid
+
+from django.utils import timezone
+
+from .models import Prompt, Comment
+
+# --- Synthetic Data ---
+# Deterministic fake prompts and comments for scale and load testing. Everything
+# (ids, text, tags, timestamps, usernames, codes) comes from one seeded RNG, so
+# the same arguments always produce the same rows; only random_key, which the DB
+# fills in, differs between runs.
+
+WORDS = (
+    "prompt model context token answer question example summary explain code "
+    "python javascript react django postgres query index cache latency request "
+    "response error debug test deploy server client api endpoint schema table "
+    "write rewrite improve translate classify extract list compare review style "
+    "story poem email essay outline plan data chart report user customer product "
+    "the a an of to and in for with on as by from that this it is be are was can "
+    "should would could will not more most fast slow simple clear short long"
+).split()
+
+TAG_STEMS = (
+    "python javascript react django sql postgres writing marketing email story "
+    "poetry coding debugging testing devops data analysis education career "
+    "productivity summarization translation research design ux seo finance "
+    "health travel cooking gaming music legal science math history"
+).split()
+
+TITLE_MAX = 150
+CONTENT_MAX = 15000
+COMMENT_MAX = 2000
+
+
+class Generator:
+    """
+    Builds unsaved Prompt/Comment instances in batches.
+
+    Content lengths are log-normal (median around `content_median` characters,
+    capped at the model maximum), tags follow a Zipf distribution with exponent
+    `zipf_s` over a vocabulary of `tag_count` tags, comment counts per prompt are
+    exponentially distributed around `comments_per_prompt`, and timestamps are
+    spread over the last `days` days.
+    """
+
+    def __init__(self, seed=42, comments_per_prompt=3, tag_count=500, zipf_s=1.1, days=730,
+                 content_median=600, comment_median=160, now=None):
+        self.rng = random.Random(seed)
+        self.comments_per_prompt = comments_per_prompt
+        self.days = days
+        self.now = now or timezone.now()
+        self.content_median = content_median
+        self.comment_median = comment_median
+        self.tags = self._build_tag_vocabulary(tag_count)
+        weights = [1 / (rank ** zipf_s) for rank in range(1, len(self.tags) + 1)]
+        self.tag_cum_weights = list(itertools.accumulate(weights))
+        # Slicing one long random text is much faster than joining words per row.
+        self.corpus = ' '.join(self.rng.choice(WORDS) for _ in range(CONTENT_MAX // 3))
+
+    def _build_tag_vocabulary(self, tag_count):
+        # The first stems read like real tags; the long tail gets numbered variants.
+        tags = []
+        for round_number in itertools.count():
+            for stem in TAG_STEMS:
+                if len(tags) == tag_count:
+                    return tags
+                tags.append(stem if round_number == 0 else f"{stem}-{round_number}")
+
+    # --- Field helpers ---
+    def _uuid(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def _length(self, median, maximum, sigma=0.9):
+        return max(1, min(maximum, int(self.rng.lognormvariate(math.log(median), sigma))))
+
+    def _text(self, length):
+        start = self.rng.randrange(0, len(self.corpus) - length)
+        return self.corpus[start:start + length].strip() or 'text'
+
+    def _title(self):
+        words = self.rng.randint(3, 9)
+        return ' '.join(self.rng.choice(WORDS) for _ in range(words)).capitalize()[:TITLE_MAX]
+
+    def _pick_tags(self):
+        count = min(self.rng.choice((0, 1, 2, 2, 3, 3, 3, 4, 5)), len(self.tags))
+        picked = []
+        total = self.tag_cum_weights[-1]
+        while len(picked) < count:
+            index = bisect.bisect(self.tag_cum_weights, self.rng.random() * total)
+            tag = self.tags[min(index, len(self.tags) - 1)]
+            if tag not in picked:
+                picked.append(tag)
+        return picked
+
+    def _username(self):
+        return f"{self.rng.choice(WORDS)}-{self.rng.choice(WORDS)}-{self.rng.randrange(10000)}"
+
+    def _code(self):
+        return f"{self.rng.getrandbits(32):08x}"
+
+    def _moment_after(self, start):
+        """A random datetime between `start` and now, skewed towards `start`."""
+        span = (self.now - start).total_seconds()
+        return start + datetime.timedelta(seconds=span * self.rng.random() ** 3)
+
+    # --- Rows ---
+    def prompt(self):
+        created_at = self.now - datetime.timedelta(seconds=self.rng.random() * self.days * 86400)
+        # About a third of the prompts were edited at some point.
+        updated_at = self._moment_after(created_at) if self.rng.random() < 0.3 else created_at
+        return Prompt(
+            prompt_id=self._uuid(),
+            title=self._title(),
+            content=self._text(self._length(self.content_median, CONTENT_MAX)),
+            username=self._username(),
+            tags=self._pick_tags(),
+            modification_code=self._code(),
+            created_at=created_at,
+            updated_at=updated_at,
+        )
+
+    def comments_for(self, prompt):
+        if self.comments_per_prompt <= 0:
+            return []
+        count = min(round(self.rng.expovariate(1 / self.comments_per_prompt)), int(self.comments_per_prompt * 10))
+        comments = []
+        for _ in range(count):
+            created_at = self._moment_after(prompt.created_at)
+            comments.append(Comment(
+                comment_id=self._uuid(),
+                prompt_id=prompt.prompt_id,
+                content=self._text(self._length(self.comment_median, COMMENT_MAX)),
+                username=self._username(),
+                modification_code=self._code(),
+                created_at=created_at,
+                updated_at=created_at,
+            ))
+        return comments
+
+    def batches(self, prompt_count, batch_size=5000):
+        """Yields `(prompts, comments)` batches covering `prompt_count` prompts."""
+        for offset in range(0, prompt_count, batch_size):
+            prompts, comments = [], []
+            for _ in range(min(batch_size, prompt_count - offset)):
+                prompt = self.prompt()
+                prompt_comments = self.comments_for(prompt)
+                prompt.comment_count = len(prompt_comments) # Known up front: no reconcile needed
+                prompts.append(prompt)
+                comments.extend(prompt_comments)
+            yield prompts, comments
@@ -1,10 +1,17 @@
+import gzip
+import importlib.util
+import os
+import unittest
 import warnings
+import orjson
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from django.test import override_settings, SimpleTestCase # Import SimpleTestCase for setUpModule context
 from .models import Prompt, Comment
 from django.core.cache import cache # Import cache for setup/teardown
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 # --- Suppress WhiteNoise warning ---
 warnings.filterwarnings(
@@ -567,6 +574,345 @@ class PromptAPITests(APITestCase):
         self.assertEqual(response_no_match.status_code, status.HTTP_200_OK)
         self.assertEqual(response_no_match.data['count'], 0) # No prompts should match
 
+    def test_list_prompts_full_text_search(self):
+        """
+        Ensure GET /api/prompts/?search= matches stemmed words in title or content.
+        """
+        self._create_prompt(title="Optimizing SQL queries", content="Indexes help a lot.")
+        self._create_prompt(title="CSS layout", content="How do I optimize my grid?")
+        self._create_prompt(title="Unrelated", content="Nothing to see here.")
+
+        url = reverse('api:prompt-list-create') + '?search=optimize'
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        titles = {p['title'] for p in response.data['results']}
+        self.assertSetEqual(titles, {"Optimizing SQL queries", "CSS layout"})
+
+    def test_list_prompts_search_sort_by_relevance(self):
+        """
+        Ensure sort=relevance ranks title matches above content-only matches.
+        """
+        self._create_prompt(title="Docker networking", content="Containers talking to each other.")
+        self._create_prompt(title="Kubernetes basics", content="Pods are not docker containers.")
+
+        url = reverse('api:prompt-list-create') + '?search=docker&sort=relevance'
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titles = [p['title'] for p in response.data['results']]
+        self.assertListEqual(titles, ["Docker networking", "Kubernetes basics"])
+
+    def test_list_prompts_search_icontains_fallback(self):
+        """
+        Ensure search_mode=icontains keeps the legacy substring matching.
+        """
+        self._create_prompt(title="React useEffect loop", content="Infinite requests.")
+
+        base_url = reverse('api:prompt-list-create')
+        # Partial words are not full-text tokens...
+        response_fts = self.client.get(base_url + '?search=useEff')
+        self.assertEqual(response_fts.data['count'], 0)
+        # ...but the substring fallback still finds them.
+        response_icontains = self.client.get(base_url + '?search=useEff&search_mode=icontains')
+        self.assertEqual(response_icontains.status_code, status.HTTP_200_OK)
+        self.assertEqual(response_icontains.data['count'], 1)
+
+    def test_list_prompts_fuzzy_search(self):
+        """
+        Ensure ?fuzzy=1 matches partial words and typos in titles, closest first.
+        """
+        self._create_prompt(title="React useEffect Infinite Loop Debugging")
+        self._create_prompt(title="Kubernetes Pod CrashLoopBackOff")
+        self._create_prompt(title="CSS Grid Layout")
+
+        base_url = reverse('api:prompt-list-create')
+        response_typo = self.client.get(base_url + '?search=useEfect&fuzzy=1')
+        self.assertEqual(response_typo.status_code, status.HTTP_200_OK)
+        self.assertEqual(response_typo.data['count'], 1)
+        self.assertEqual(response_typo.data['results'][0]['title'], "React useEffect Infinite Loop Debugging")
+
+        response_partial = self.client.get(base_url + '?search=kubernet&fuzzy=1')
+        self.assertEqual(response_partial.data['count'], 1)
+        self.assertEqual(response_partial.data['results'][0]['title'], "Kubernetes Pod CrashLoopBackOff")
+
+        # A strict threshold rejects the misspelling.
+        response_strict = self.client.get(base_url + '?search=useEfect&fuzzy=1&threshold=0.95')
+        self.assertEqual(response_strict.data['count'], 0)
+
+    def test_list_prompts_fuzzy_search_invalid_threshold(self):
+        """
+        Ensure a non-numeric or non-finite threshold returns 400.
+        """
+        for threshold in ('high', 'nan', 'inf', '-Infinity'):
+            url = reverse('api:prompt-list-create') + f'?search=react&fuzzy=1&threshold={threshold}'
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, threshold)
+            self.assertIn('threshold', response.data)
+
+    def test_list_prompts_filter_by_tags_case_insensitive(self):
+        """
+        Ensure tag filtering ignores case on both the stored tags and the query.
+        """
+        p1 = self._create_prompt(title="Upper", tags=["Python", "API"])
+        p2 = self._create_prompt(title="Lower", tags=["python"])
+        self._create_prompt(title="Other", tags=["rust"])
+
+        url = reverse('api:prompt-list-create') + '?tags=PYTHON'
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        retrieved_ids = {item['prompt_id'] for item in response.data['results']}
+        self.assertSetEqual(retrieved_ids, {str(p1.prompt_id), str(p2.prompt_id)})
+
+    def test_list_prompts_filter_by_tags_modes(self):
+        """
+        Ensure tag_mode=all requires every tag and tag_mode=none excludes any of them.
+        """
+        both = self._create_prompt(title="Both", tags=["python", "api"])
+        python_only = self._create_prompt(title="Python Only", tags=["python"])
+        # Created without tags: tags (and so tags_lower) is NULL.
+        untagged = Prompt.objects.create(title="Untagged", content="No tags")
+        empty_tags = self._create_prompt(title="Empty Tags", tags=[])
+
+        base_url = reverse('api:prompt-list-create')
+
+        response_all = self.client.get(base_url + '?tags=python,api&tag_mode=all')
+        self.assertEqual(response_all.status_code, status.HTTP_200_OK)
+        self.assertSetEqual(
+            {item['prompt_id'] for item in response_all.data['results']},
+            {str(both.prompt_id)}
+        )
+
+        response_none = self.client.get(base_url + '?tags=api&tag_mode=none')
+        self.assertEqual(response_none.status_code, status.HTTP_200_OK)
+        self.assertSetEqual(
+            {item['prompt_id'] for item in response_none.data['results']},
+            {str(python_only.prompt_id), str(untagged.prompt_id), str(empty_tags.prompt_id)}
+        )
+        # The export shares the filter.
+        export = self.client.get(reverse('api:prompt-export') + '?tags=api&tag_mode=none')
+        self.assertEqual(
+            {orjson.loads(line)['prompt_id'] for line in b''.join(export.streaming_content).splitlines()},
+            {str(python_only.prompt_id), str(untagged.prompt_id), str(empty_tags.prompt_id)}
+        )
+
+        response_invalid = self.client.get(base_url + '?tags=api&tag_mode=some')
+        self.assertEqual(response_invalid.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tag_mode', response_invalid.data)
+
+    def test_list_prompts_cursor_pagination(self):
+        """
+        Ensure ?pagination=cursor walks every prompt once, forwards and backwards, without a count.
+        """
+        for i in range(12):
+            self._create_prompt(title=f"Cursor {i % 3}") # Duplicate titles exercise the tie-breaker
+
+        url = reverse('api:prompt-list-create') + '?pagination=cursor&sort=title_asc&limit=5'
+        seen = []
+        pages = []
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            # One keyset query for the page: no COUNT or MAX aggregate over the set.
+            self.assertEqual(len(ctx.captured_queries), 1, [q['sql'] for q in ctx.captured_queries])
+            self.assertNotIn('COUNT(', ctx.captured_queries[0]['sql'])
+            pages.append(response.data)
+            seen.extend(item['prompt_id'] for item in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual([len(page['results']) for page in pages], [5, 5, 2])
+        self.assertEqual(len(set(seen)), 12)
+        self.assertIsNone(pages[0]['previous'])
+        titles = [item['title'] for page in pages for item in page['results']]
+        self.assertListEqual(titles, sorted(titles))
+
+        # Going back from the last page returns exactly the middle page.
+        response_back = self.client.get(pages[2]['previous'])
+        self.assertEqual(response_back.status_code, status.HTTP_200_OK)
+        self.assertListEqual(response_back.data['results'], pages[1]['results'])
+
+        # Pages still revalidate, by an ETag derived from their content.
+        response_304 = self.client.get(pages[2]['previous'], HTTP_IF_NONE_MATCH=response_back['ETag'])
+        self.assertEqual(response_304.status_code, status.HTTP_304_NOT_MODIFIED)
+        Comment.objects.create(prompt=Prompt.objects.get(pk=pages[1]['results'][0]['prompt_id']), content="New")
+        response_changed = self.client.get(pages[2]['previous'], HTTP_IF_NONE_MATCH=response_back['ETag'])
+        self.assertEqual(response_changed.status_code, status.HTTP_200_OK)
+
+    def test_list_prompts_cursor_pagination_invalid_cursor(self):
+        """
+        Ensure a malformed cursor returns 404, like DRF's own cursor pagination.
+        """
+        url = reverse('api:prompt-list-create') + '?cursor=not-a-cursor'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_prompt_cached_until_written(self):
+        """
+        Ensure GET /api/prompts/{id}/ is served from cache and refreshed after
+        the prompt or one of its comments changes.
+        """
+        prompt = self._create_prompt(title="Cached Title")
+        url = reverse('api:prompt-detail', kwargs={'prompt_id': prompt.prompt_id})
+
+        self.assertEqual(self.client.get(url).data['title'], "Cached Title")
+        with self.assertNumQueries(0):
+            response_cached = self.client.get(url)
+        self.assertEqual(response_cached.data['title'], "Cached Title")
+
+        # A new comment invalidates the cached entry.
+        Comment.objects.create(prompt=prompt, content="Fresh comment")
+        response_comment = self.client.get(url)
+        self.assertEqual(response_comment.data['comments']['count'], 1)
+
+        # So does an update through the API.
+        self.client.patch(url, {'title': 'New Title', 'modification_code': prompt.modification_code}, format='json')
+        self.assertEqual(self.client.get(url).data['title'], "New Title")
+
+        # Comment pages are cached separately.
+        response_page = self.client.get(url + '?limit=1')
+        self.assertEqual(len(response_page.data['comments']['results']), 1)
+
+    def test_retrieve_prompt_cache_scoping(self):
+        """
+        Ensure version keys created for unknown prompt ids expire, and cached
+        details (with absolute comment links) are kept apart per scheme.
+        """
+        import time, uuid
+        from unittest import mock
+        from django.conf import settings
+        from .caching import get_version, prompt_version
+        unknown = uuid.uuid4()
+        url = reverse('api:prompt-detail', kwargs={'prompt_id': unknown})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        version = get_version(prompt_version(unknown))
+        later = time.time() + 2 * settings.PROMPT_DETAIL_CACHE_TIMEOUT + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            self.assertIsNone(cache.get(f'version:{prompt_version(unknown)}'))
+        self.assertGreater(get_version(prompt_version(unknown)), version) # Re-seeded, never reused
+
+        prompt = self._create_prompt()
+        Comment.objects.create(prompt=prompt, content="Linked")
+        url = reverse('api:prompt-detail', kwargs={'prompt_id': prompt.prompt_id}) + '?limit=1'
+        Comment.objects.create(prompt=prompt, content="Second")
+        self.assertTrue(self.client.get(url).data['comments']['next'].startswith('http://'))
+        self.assertTrue(self.client.get(url, secure=True).data['comments']['next'].startswith('https://'))
+
+    def test_list_prompts_conditional_get(self):
+        """
+        Ensure the prompt list answers a matching If-None-Match with 304, and that a
+        new comment (which only changes comment_count) produces a new ETag.
+        """
+        prompt = self._create_prompt(title="Conditional")
+        url = reverse('api:prompt-list-create')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        response_304 = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response_304.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response_304['ETag'], etag)
+
+        # Other query strings are other representations.
+        response_other = self.client.get(url + '?sort=title_asc', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response_other.status_code, status.HTTP_200_OK)
+
+        Comment.objects.create(prompt=prompt, content="Bumps comment_count")
+        response_changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response_changed.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response_changed['ETag'], etag)
+
+    def test_retrieve_prompt_conditional_get(self):
+        """
+        Ensure GET /api/prompts/{id}/ revalidates without touching the DB and
+        returns 200 again once the prompt changes.
+        """
+        prompt = self._create_prompt()
+        url = reverse('api:prompt-detail', kwargs={'prompt_id': prompt.prompt_id})
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(0):
+            response_304 = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response_304.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response_ims = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response_ims.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.patch(url, {'title': 'Changed', 'modification_code': prompt.modification_code}, format='json')
+        response_changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response_changed.status_code, status.HTTP_200_OK)
+        self.assertEqual(response_changed.data['title'], 'Changed')
+
+    def test_prompt_username_immutable_without_extra_query(self):
+        """
+        Ensure updates keep the original username without re-reading the row,
+        including queryset.update() which bypasses save().
+        """
+        prompt = self._create_prompt()
+        original_username = prompt.username
+        prompt = Prompt.objects.get(pk=prompt.pk)
+        prompt.username = "renamed"
+        prompt.title = "Edited"
+        with CaptureQueriesContext(connection) as ctx:
+            prompt.save()
+        self.assertFalse(any(q['sql'].startswith('SELECT') for q in ctx.captured_queries))
+        self.assertEqual(prompt.username, original_username)
+
+        Prompt.objects.filter(pk=prompt.pk).update(username="renamed")
+        prompt.refresh_from_db()
+        self.assertEqual(prompt.username, original_username)
+        self.assertEqual(prompt.title, "Edited")
+
+    @override_settings(PROMPT_ROW_LIMIT=2)
+    def test_create_prompt_capacity_limit(self):
+        """
+        Ensure the prompt row limit is enforced from the cached counter, without a
+        COUNT(*) per create, and that deletes free their slot.
+        """
+        cache.clear()
+        url = reverse('api:prompt-list-create')
+        data = {'title': 'Capacity', 'content': 'Capacity content.'}
+        first = self.client.post(url, data, format='json')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.post(url, data, format='json').status_code, status.HTTP_201_CREATED)
+        self.assertFalse(any('COUNT(' in q['sql'] for q in ctx.captured_queries))
+
+        response_full = self.client.post(url, data, format='json')
+        self.assertEqual(response_full.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(
+            response_full.data['detail'],
+            "Cannot create new prompt. The system has reached its maximum capacity of 2 prompts."
+        )
+        self.assertEqual(Prompt.objects.count(), 2)
+
+        Prompt.objects.get(pk=first.data['prompt_id']).delete()
+        self.assertEqual(self.client.post(url, data, format='json').status_code, status.HTTP_201_CREATED)
+
+    def test_capacity_counter_never_goes_negative(self):
+        """
+        Ensure a reservation that fails after a re-seed forgot it gives its slot
+        back without pushing the counter below zero.
+        """
+        from . import capacity
+        cache.clear()
+        Prompt.objects.all().delete()
+        with self.assertRaises(RuntimeError):
+            with capacity.reserve(capacity.PROMPTS):
+                self.assertEqual(capacity.get_count(capacity.PROMPTS), 1)
+                capacity.reconcile(capacity.PROMPTS) # Re-seeded mid-insert: 0
+                raise RuntimeError('insert failed')
+        self.assertEqual(capacity.get_count(capacity.PROMPTS), 0)
+        capacity.release(capacity.PROMPTS)
+        self.assertEqual(capacity.get_count(capacity.PROMPTS), 0)
+
     # --- End of Prompt API Tests ---
 
 
@@ -760,8 +1106,374 @@ class CommentAPITests(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
+    def test_list_comments_cursor_pagination(self):
+        """
+        Ensure ?pagination=cursor pages comments newest first with opaque next links.
+        """
+        comments = [Comment.objects.create(prompt=self.prompt, content=f"Comment {i}") for i in range(3)]
+
+        response = self.client.get(self.base_url + '?pagination=cursor&limit=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        first_page_ids = [item['comment_id'] for item in response.data['results']]
+        self.assertListEqual(first_page_ids, [str(comments[2].comment_id), str(comments[1].comment_id)])
+
+        response_next = self.client.get(response.data['next'])
+        self.assertEqual(response_next.status_code, status.HTTP_200_OK)
+        self.assertListEqual(
+            [item['comment_id'] for item in response_next.data['results']],
+            [str(comments[0].comment_id)]
+        )
+        self.assertIsNone(response_next.data['next'])
+        self.assertIsNotNone(response_next.data['previous'])
+
+    def test_comment_count_maintained_on_create_and_delete(self):
+        """
+        Ensure the prompt's stored comment_count follows comment creation and deletion.
+        """
+        response = self.client.post(self.base_url, {'content': 'First!'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.post(self.base_url, {'content': 'Second.'}, format='json')
+        self.prompt.refresh_from_db()
+        self.assertEqual(self.prompt.comment_count, 2)
+
+        comment = Comment.objects.get(comment_id=response.data['comment_id'])
+        delete_url = reverse('api:comment-detail', kwargs={'comment_id': comment.comment_id})
+        self.client.delete(delete_url, {'modification_code': comment.modification_code}, format='json')
+        self.prompt.refresh_from_db()
+        self.assertEqual(self.prompt.comment_count, 1)
+
+        # Updating the prompt must not overwrite the counter with a stale value.
+        stale_prompt = Prompt.objects.get(pk=self.prompt.pk)
+        Comment.objects.create(prompt=self.prompt, content="Third.")
+        stale_prompt.title = "Renamed"
+        stale_prompt.save()
+        self.prompt.refresh_from_db()
+        self.assertEqual(self.prompt.comment_count, 2)
+
+    def test_reconcile_comment_counts_command(self):
+        """
+        Ensure reconcile_comment_counts repairs drifted counters.
+        """
+        from django.core.management import call_command
+        from io import StringIO
+        Comment.objects.bulk_create([Comment(prompt=self.prompt, content="Bulk") for _ in range(3)])
+        self.prompt.refresh_from_db()
+        self.assertEqual(self.prompt.comment_count, 0) # bulk_create bypasses signals
+
+        out = StringIO()
+        call_command('reconcile_comment_counts', stdout=out)
+        self.prompt.refresh_from_db()
+        self.assertEqual(self.prompt.comment_count, 3)
+        self.assertIn('1 prompt', out.getvalue())
+
+    def test_comment_conditional_get(self):
+        """
+        Ensure the comment list and comment detail answer conditional requests with 304.
+        """
+        comment = Comment.objects.create(prompt=self.prompt, content="Conditional")
+        response_list = self.client.get(self.base_url)
+        response_list_304 = self.client.get(self.base_url, HTTP_IF_NONE_MATCH=response_list['ETag'])
+        self.assertEqual(response_list_304.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        url = reverse('api:comment-detail', kwargs={'comment_id': comment.comment_id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(1):
+            response_304 = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response_304.status_code, status.HTTP_304_NOT_MODIFIED)
+        response_ims = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response_ims.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Deleting a comment changes the list's ETag.
+        comment.delete()
+        response_list_changed = self.client.get(self.base_url, HTTP_IF_NONE_MATCH=response_list['ETag'])
+        self.assertEqual(response_list_changed.status_code, status.HTTP_200_OK)
+
+    def test_comment_username_immutable(self):
+        """
+        Ensure a comment's username can't be changed by save() or queryset.update().
+        """
+        comment = Comment.objects.create(prompt=self.prompt, content="Original", username="Author")
+        comment = Comment.objects.get(pk=comment.pk)
+        comment.username = "Someone Else"
+        comment.content = "Edited"
+        with CaptureQueriesContext(connection) as ctx:
+            comment.save()
+        self.assertFalse(any(q['sql'].startswith('SELECT') for q in ctx.captured_queries))
+        self.assertEqual(comment.username, "Author")
+
+        Comment.objects.filter(pk=comment.pk).update(username="Someone Else")
+        comment.refresh_from_db()
+        self.assertEqual(comment.username, "Author")
+        self.assertEqual(comment.content, "Edited")
+
+    @override_settings(COMMENT_IP_QUOTA=1)
+    def test_create_comment_ip_quota(self):
+        """
+        Ensure the optional per-IP comment quota returns 403 once used up.
+        """
+        cache.clear()
+        data = {'content': 'Quota comment'}
+        self.assertEqual(self.client.post(self.base_url, data, format='json').status_code, status.HTTP_201_CREATED)
+        response = self.client.post(self.base_url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertIn('quota of 1 comments', response.data['detail'])
+        # Other clients are unaffected.
+        response_other = self.client.post(self.base_url, data, format='json', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response_other.status_code, status.HTTP_201_CREATED)
+
     # --- End Comment API Tests ---
 
+# --- Seed DB Command Tests ---
+
+class SeedDbCommandTests(APITestCase):
+    """
+    Tests for the seed_db command and the streaming loaders in api/bulk.py.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_db_command(self):
+        """
+        Ensure seed_db replaces the data from the bundled seed file and maps
+        comments onto the prompts they reference.
+        """
+        from django.core.management import call_command
+        from io import StringIO
+        import json
+        call_command('seed_db', stdout=StringIO())
+        path = os.path.join(os.path.dirname(__file__), 'management', 'commands', 'seed_data.json')
+        with open(path) as f:
+            data = json.load(f)
+        self.assertEqual(Prompt.objects.count(), len(data['prompts']))
+        self.assertEqual(Comment.objects.count(), len(data['comments']))
+        first = Prompt.objects.get(title=data['prompts'][0]['title'])
+        expected = [c['content'] for c in data['comments'] if c['prompt_id'] == 1]
+        self.assertCountEqual(first.comments.values_list('content', flat=True), expected)
+        self.assertEqual(first.comment_count, len(expected))
+        self.assertEqual(len(first.modification_code), 8)
+
+    def test_seed_db_ndjson_file(self):
+        """
+        Ensure seed_db streams NDJSON from an arbitrary path with both insert
+        methods, keeping special characters intact.
+        """
+        from django.core.management import call_command
+        from io import StringIO
+        import json, tempfile
+        content = 'Tabs\tnewlines\nand back\\slashes "quoted"'
+        lines = [
+            {'type': 'comment', 'prompt_id': 'b', 'content': 'Comment before its prompt'},
+            {'type': 'prompt', 'id': 'a', 'title': 'First', 'content': content, 'tags': ['x-1', 'Y']},
+            {'type': 'prompt', 'id': 'b', 'title': 'Second', 'content': 'Plain',
+             'created_at': '2024-01-02T03:04:05+00:00', 'updated_at': '2024-01-02T03:04:05+00:00'},
+            {'prompt_id': 'a', 'content': 'On first'},
+            {'prompt_id': 'missing', 'content': 'Orphan'},
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as f:
+            f.write('\n'.join(json.dumps(line) for line in lines))
+        self.addCleanup(os.remove, f.name)
+
+        for method in ('copy', 'bulk'):
+            out = StringIO()
+            call_command('seed_db', file=f.name, method=method, batch_size=1, stdout=out)
+            self.assertIn('Skipped 1 comment', out.getvalue())
+            first = Prompt.objects.get(title='First')
+            self.assertEqual(first.content, content)
+            self.assertEqual(first.tags, ['x-1', 'Y'])
+            self.assertEqual(first.comment_count, 1)
+            second = Prompt.objects.get(title='Second')
+            self.assertEqual(second.comments.get().content, 'Comment before its prompt')
+        # COPY keeps timestamps from the file; bulk_create stamps them.
+        call_command('seed_db', file=f.name, stdout=StringIO())
+        self.assertEqual(Prompt.objects.get(title='Second').created_at.year, 2024)
+
+    def test_seed_db_loads_export(self):
+        """
+        Ensure the output of GET /api/prompts/export/?include=comments loads back
+        as prompts (keeping their ids) with their comments.
+        """
+        from django.core.management import call_command
+        from io import StringIO
+        import tempfile
+        tagged = Prompt.objects.create(title="Exported", content="Round trip", tags=['one'])
+        Comment.objects.create(prompt=tagged, content="Exported comment")
+        untagged = Prompt.objects.create(title="Untagged export", content="No comments")
+
+        response = self.client.get(reverse('api:prompt-export'), {'include': 'comments'})
+        with tempfile.NamedTemporaryFile('wb', suffix='.ndjson', delete=False) as f:
+            f.write(b''.join(response.streaming_content))
+        self.addCleanup(os.remove, f.name)
+        call_command('seed_db', file=f.name, stdout=StringIO())
+
+        self.assertEqual(Prompt.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 1)
+        loaded = Prompt.objects.get(pk=tagged.prompt_id)
+        self.assertEqual((loaded.title, loaded.content, loaded.tags), ("Exported", "Round trip", ['one']))
+        self.assertEqual(loaded.created_at, tagged.created_at)
+        self.assertEqual(loaded.comment_count, 1)
+        self.assertEqual(loaded.comments.get().content, "Exported comment")
+        self.assertEqual(Prompt.objects.get(pk=untagged.prompt_id).comment_count, 0)
+
+    def test_seed_db_retires_cached_details(self):
+        """
+        Ensure prompts removed by seed_db's TRUNCATE are no longer served from
+        the detail cache.
+        """
+        from django.core.management import call_command
+        from io import StringIO
+        prompt = Prompt.objects.create(title="Truncated", content="Cached detail")
+        url = reverse('api:prompt-detail', kwargs={'prompt_id': prompt.prompt_id})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        call_command('seed_db', stdout=StringIO())
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_seed_db_database_errors(self):
+        """
+        Ensure rows the database rejects fail the command cleanly and leave
+        the existing data in place.
+        """
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        from io import StringIO
+        import json, tempfile
+        Prompt.objects.create(title="Survivor", content="Still here")
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson', delete=False) as f:
+            f.write(json.dumps({'type': 'prompt', 'title': 'x' * 151, 'content': 'Too long a title'}))
+        self.addCleanup(os.remove, f.name)
+        with self.assertRaisesMessage(CommandError, 'The database rejected the seed data'):
+            call_command('seed_db', file=f.name, stdout=StringIO())
+        self.assertEqual(list(Prompt.objects.values_list('title', flat=True)), ["Survivor"])
+
+# --- End Seed DB Command Tests ---
+
+# --- Generate Dataset Command Tests ---
+
+class GenerateDatasetCommandTests(APITestCase):
+    """
+    Tests for the generate_dataset command and the synthetic data generator.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.prompt = Prompt.objects.create(title="Test Prompt", content="...")
+
+    def test_generate_dataset_command(self):
+        """
+        Ensure generate_dataset inserts consistent rows and is deterministic by seed.
+        """
+        from django.core.management import call_command
+        from io import StringIO
+        from .synthetic import Generator
+
+        call_command('generate_dataset', prompts=30, comments_per_prompt=4, tags=20, batch_size=7, stdout=StringIO())
+        self.assertEqual(Prompt.objects.count(), 31) # Plus the prompt from setUp
+        self.assertEqual(Prompt.objects.reconcile_comment_counts(), 0) # Counts were written correctly
+        self.assertTrue(all(len(p.content) <= 15000 for p in Prompt.objects.all()))
+
+        def sample(seed):
+            prompts, comments = next(Generator(seed=seed, now=self.prompt.created_at).batches(5))
+            return [(p.prompt_id, p.title, p.tags, p.created_at) for p in prompts], [c.content for c in comments]
+        self.assertEqual(sample(7), sample(7))
+        self.assertNotEqual(sample(7), sample(8))
+
+    def test_generate_dataset_keeps_timestamps(self):
+        """
+        Ensure both insert methods keep the generated created_at/updated_at
+        instead of bulk_create's auto_now stamps.
+        """
+        import datetime
+        from django.core.management import call_command
+        from io import StringIO
+        from .synthetic import Generator
+        until = datetime.date(2024, 1, 1)
+        prompts, comments = next(Generator(seed=3, comments_per_prompt=2, days=30, now=datetime.datetime(
+            2024, 1, 1, tzinfo=datetime.timezone.utc
+        )).batches(10))
+        for method in ('copy', 'bulk'):
+            call_command(
+                'generate_dataset', prompts=10, comments_per_prompt=2, days=30, seed=3, until=until,
+                method=method, clear=True, stdout=StringIO()
+            )
+            stored = dict(Prompt.objects.values_list('prompt_id', 'created_at'))
+            self.assertEqual(stored, {p.prompt_id: p.created_at for p in prompts}, method)
+            stored = dict(Comment.objects.values_list('comment_id', 'updated_at'))
+            self.assertEqual(stored, {c.comment_id: c.updated_at for c in comments}, method)
+
+    def test_generate_dataset_clear(self):
+        """
+        Ensure --clear replaces the data atomically with the first batch and
+        retires cached details of the removed prompts.
+        """
+        from unittest import mock
+        from django.core.management import call_command
+        from io import StringIO
+        url = reverse('api:prompt-detail', kwargs={'prompt_id': self.prompt.prompt_id})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK) # Now cached
+
+        # A failing first batch rolls the TRUNCATE back with it.
+        with mock.patch('api.bulk.insert_objects', side_effect=RuntimeError('disk full')):
+            with self.assertRaises(RuntimeError):
+                call_command('generate_dataset', prompts=5, clear=True, stdout=StringIO())
+        self.assertTrue(Prompt.objects.filter(pk=self.prompt.pk).exists())
+
+        call_command('generate_dataset', prompts=5, clear=True, tags=5, stdout=StringIO())
+        self.assertEqual(Prompt.objects.count(), 5)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+# --- End Generate Dataset Command Tests ---
+
+# --- Benchmark Command Tests ---
+
+class BenchmarkCommandTests(APITestCase):
+    """
+    Tests for the benchmark runner behind the benchmark command.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.prompt = Prompt.objects.create(title="Test Prompt", content="...")
+
+    def test_benchmark_runner(self):
+        """
+        Ensure the benchmark runner reports percentiles, query counts and sizes.
+        """
+        from .benchmark import percentile, run_benchmarks
+        self.assertEqual(percentile([1, 2, 3, 4], 50), 2.5)
+        Comment.objects.create(prompt=self.prompt, content="Benchmark me")
+        results = run_benchmarks(iterations=3, warmup=1, only=['prompt_detail', 'comment_delete'])
+        self.assertEqual(set(results), {'prompt_detail', 'comment_delete'})
+        self.assertEqual(results['prompt_detail']['status_codes'], {'200': 3})
+        self.assertEqual(results['comment_delete']['status_codes'], {'204': 3})
+        for key in ('latency_ms', 'db_time_ms', 'queries', 'response_bytes'):
+            self.assertLessEqual(results['prompt_detail'][key]['p50'], results['prompt_detail'][key]['p99'])
+
+    def test_benchmark_query_strings_are_encoded(self):
+        """
+        Ensure scenario query strings are URL-encoded, whatever the fixture words contain.
+        """
+        import random
+        from django.http import QueryDict
+        from .benchmark import _get
+        word = 'c++ & c# 100% done'
+        path, _, _ = _get('/api/prompts/', search=lambda f, r: word, page=2)({}, random.Random(0))
+        self.assertEqual(QueryDict(path.split('?', 1)[1]).dict(), {'search': word, 'page': '2'})
+
+    def test_benchmark_uses_isolated_cache(self):
+        """
+        Ensure scenarios run under isolated_caches() leave the app's cache keys alone.
+        """
+        from .benchmark import isolated_caches, run_benchmarks
+        with override_settings(CACHES=isolated_caches()):
+            results = run_benchmarks(iterations=1, warmup=0, only=['prompt_create'])
+            self.assertEqual(results['prompt_create']['status_codes'], {'201': 1})
+            self.assertIsNotNone(cache.get('capacity:count:prompts'))
+        self.assertIsNone(cache.get('capacity:count:prompts'))
+
+# --- End Benchmark Command Tests ---
+
 # --- Random Prompt View Tests ---
 
 class RandomPromptViewTests(APITestCase):
@@ -819,6 +1531,48 @@ class RandomPromptViewTests(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
+    def test_get_random_prompt_bounded_queries(self):
+        """
+        Ensure GET /api/prompts/random/ uses a fixed number of queries and includes comments.
+        """
+        prompt = self._create_prompt(title="Only One")
+        for i in range(12):
+            Comment.objects.create(prompt=prompt, content=f"Comment {i}")
+
+        url = reverse('api:prompt-random')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        # Index seek (plus at most one wrap-around seek) + latest comments
+        self.assertLessEqual(len(queries), 3)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['comments']), 10)
+        self.assertEqual(response.data['comment_pagination']['total_count'], 12)
+        self.assertTrue(response.data['comment_pagination']['has_more'])
+
+    def test_get_random_prompts_with_count_and_tags(self):
+        """
+        Ensure ?count=N returns N distinct prompts and ?tags= restricts the draw.
+        """
+        tagged = [self._create_prompt(title=f"Tagged {i}", tags=["Widget"]) for i in range(3)]
+        self._create_prompt(title="Untagged", tags=["other"])
+
+        url = reverse('api:prompt-random')
+        response = self.client.get(url + '?count=3&tags=widget')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(response.data, list)
+        self.assertSetEqual(
+            {item['prompt_id'] for item in response.data},
+            {str(p.prompt_id) for p in tagged}
+        )
+
+        response_all = self.client.get(url + '?count=10')
+        self.assertEqual(len(response_all.data), 4) # Capped by the number of prompts
+        self.assertEqual(len({item['prompt_id'] for item in response_all.data}), 4)
+
+        response_invalid = self.client.get(url + '?count=0')
+        self.assertEqual(response_invalid.status_code, status.HTTP_400_BAD_REQUEST)
+
 # --- End Random Prompt View Tests ---
 
 # --- Batch Prompt View Tests (FOR RETRIEVAL) ---
@@ -928,8 +1682,867 @@ class BatchPromptViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('ids', response.data)
 
+    def test_batch_retrieve_preserves_order_and_dedupes(self):
+        """
+        Ensure results follow the requested order with duplicates removed.
+        """
+        prompts = [self._create_prompt(title=f"Ordered {i}") for i in range(3)]
+        url = reverse('api:prompt-batch')
+        ids = [str(prompts[2].prompt_id), str(prompts[0].prompt_id), str(prompts[2].prompt_id), str(prompts[1].prompt_id)]
+        response = self.client.post(url, {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['title'] for item in response.data], ["Ordered 2", "Ordered 0", "Ordered 1"])
+
+    @override_settings(PROMPT_BATCH_MAX_IDS=2)
+    def test_batch_retrieve_too_many_ids(self):
+        """
+        Ensure requests above PROMPT_BATCH_MAX_IDS are rejected with 400.
+        """
+        url = reverse('api:prompt-batch')
+        response = self.client.post(url, {'ids': ['a', 'b', 'c']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ids', response.data)
+
+    def test_batch_retrieve_latest_comments(self):
+        """
+        Ensure ?include=latest_comments&n=2 attaches each prompt's two newest
+        comments using a single comment query.
+        """
+        p1 = self._create_prompt(title="With comments")
+        p2 = self._create_prompt(title="Without comments")
+        for i in range(3):
+            Comment.objects.create(prompt=p1, content=f"Comment {i}")
+        url = reverse('api:prompt-batch') + '?include=latest_comments&n=2'
+        with self.assertNumQueries(2):
+            response = self.client.post(url, {'ids': [str(p1.prompt_id), str(p2.prompt_id)]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([c['content'] for c in response.data[0]['latest_comments']], ["Comment 2", "Comment 1"])
+        self.assertEqual(response.data[1]['latest_comments'], [])
+
+        response_bad = self.client.post(
+            reverse('api:prompt-batch') + '?include=latest_comments&n=0', {'ids': [str(p1.prompt_id)]}, format='json'
+        )
+        self.assertEqual(response_bad.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_retrieve_conditional(self):
+        """
+        Ensure POST /api/prompts/batch/ returns 304 for a matching If-None-Match.
+        """
+        p1 = self._create_prompt(title="Batch ETag")
+        url = reverse('api:prompt-batch')
+        data = {'ids': [str(p1.prompt_id)]}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response_304 = self.client.post(url, data, format='json', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response_304.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        p1.title = "Batch ETag (edited)"
+        p1.save()
+        response_changed = self.client.post(url, data, format='json', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response_changed.status_code, status.HTTP_200_OK)
+
 # --- End Batch Prompt View Tests ---
 
+# --- Bulk Prompt Create Tests ---
+
+class BulkPromptCreateViewTests(APITestCase):
+    """
+    Tests for the /api/prompts/bulk/ endpoint.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('api:prompt-bulk-create')
+
+    def test_bulk_create_success(self):
+        """
+        Ensure POST /api/prompts/bulk/ creates all prompts with one INSERT and
+        returns their ids and modification codes in input order.
+        """
+        data = [
+            {'title': f'Bulk {i}', 'content': '<b>Bulk</b> content', 'tags': ['bulk']}
+            for i in range(3)
+        ]
+        data[0]['username'] = 'importer'
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(sum(q['sql'].startswith('INSERT') for q in ctx.captured_queries), 1)
+
+        prompts = [Prompt.objects.get(pk=item['prompt_id']) for item in response.data]
+        self.assertEqual([p.title for p in prompts], ['Bulk 0', 'Bulk 1', 'Bulk 2'])
+        self.assertEqual(prompts[0].username, 'importer')
+        self.assertTrue(prompts[1].username)
+        self.assertEqual(prompts[0].content, 'Bulk content') # Sanitized like single creates
+        for prompt, item in zip(prompts, response.data):
+            self.assertEqual(prompt.modification_code, item['modification_code'])
+            self.assertEqual(len(prompt.modification_code), 8)
+        # The tag list reflects the new prompts straight away.
+        self.assertIn('bulk', self.client.get(reverse('api:tag-list')).data)
+
+    def test_bulk_create_per_item_errors(self):
+        """
+        Ensure one invalid item rejects the whole batch with errors per item.
+        """
+        data = [{'title': 'Fine', 'content': 'Fine'}, {'title': '', 'content': 'No title'}]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('title', response.data[1])
+        self.assertEqual(Prompt.objects.count(), 0)
+
+    @override_settings(PROMPT_BULK_MAX_ITEMS=2)
+    def test_bulk_create_too_many_items(self):
+        """
+        Ensure batches above PROMPT_BULK_MAX_ITEMS are rejected.
+        """
+        data = [{'title': f'Bulk {i}', 'content': 'x'} for i in range(3)]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Prompt.objects.count(), 0)
+
+    @override_settings(PROMPT_ROW_LIMIT=2)
+    def test_bulk_create_respects_capacity(self):
+        """
+        Ensure a batch that would exceed the prompt row limit is refused whole.
+        """
+        data = [{'title': f'Bulk {i}', 'content': 'x'} for i in range(3)]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Prompt.objects.count(), 0)
+
+# --- End Bulk Prompt Create Tests ---
+
+# --- Prompt Import Tests ---
+
+class PromptImportTests(APITestCase):
+    """
+    Tests for the import_prompts command (api/importing.py).
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.existing = Prompt.objects.create(title='Existing', content='Old', username='original', tags=['old'])
+
+    def write_file(self, records):
+        import tempfile
+        with tempfile.NamedTemporaryFile('wb', suffix='.ndjson', delete=False) as f:
+            for record in records:
+                f.write(record if isinstance(record, bytes) else orjson.dumps(record))
+                f.write(b'\n')
+        self.addCleanup(os.remove, f.name)
+        return f.name
+
+    def run_import(self, path, **options):
+        from django.core.management import call_command
+        from io import StringIO
+        out = StringIO()
+        call_command('import_prompts', path, stdout=out, **options)
+        return out.getvalue()
+
+    def test_import_validates_like_the_api(self):
+        """
+        Ensure valid lines are inserted sanitized and invalid ones are written
+        to the reject file with their line number and errors.
+        """
+        path = self.write_file([
+            {'title': '<b>Bold</b> title', 'content': 'Tabs\tand "quotes" & <i>tags</i>', 'tags': [' x-1 ', 'Y']},
+            b'{not json',
+            {'title': '', 'content': 'No title'},
+            b'',
+            {'title': 'Dated', 'content': 'Plain', 'username': 'importer', 'created_at': '2024-01-02T03:04:05Z'},
+            {'title': 'Bad tag', 'content': 'x', 'tags': ['no spaces']},
+        ])
+        out = self.run_import(path, workers=0, batch_size=2)
+        self.assertIn('2 new, 0 updated', out)
+        self.assertIn('Rejected 3 line(s)', out)
+
+        bold = Prompt.objects.get(title='Bold title')
+        self.assertEqual(bold.content, 'Tabs\tand "quotes" &amp; tags')
+        self.assertEqual(bold.tags, ['x-1', 'Y'])
+        self.assertEqual(len(bold.modification_code), 8)
+        self.assertTrue(bold.username)
+        dated = Prompt.objects.get(title='Dated')
+        self.assertEqual((dated.username, dated.created_at.year), ('importer', 2024))
+
+        self.addCleanup(os.remove, path + '.rejects.ndjson')
+        with open(path + '.rejects.ndjson', 'rb') as f:
+            rejects = [orjson.loads(line) for line in f]
+        self.assertEqual([r['line'] for r in rejects], [2, 3, 6])
+        self.assertIn('Invalid JSON', rejects[0]['errors']['non_field_errors'][0])
+        self.assertIn('title', rejects[1]['errors'])
+        self.assertEqual(rejects[1]['record'], '{"title":"","content":"No title"}')
+        self.assertIn('tags', rejects[2]['errors'])
+
+    def test_import_merges_on_prompt_id(self):
+        """
+        Ensure lines with an existing prompt_id update it (keeping its username
+        and modification code), the last of repeated ids wins, and the tag
+        list and detail caches are refreshed. Runs through the worker pool.
+        """
+        self.assertEqual(self.client.get(reverse('api:tag-list')).data, ['old'])
+        detail_url = reverse('api:prompt-detail', kwargs={'prompt_id': self.existing.prompt_id})
+        self.client.get(detail_url) # Now cached
+        new_id = '6a0b5a4e-3a4c-4a1b-9a7e-6f1d2c3b4a59'
+        path = self.write_file([
+            {'prompt_id': str(self.existing.prompt_id), 'title': 'First update', 'content': 'x'},
+            {'prompt_id': new_id, 'title': 'Fresh', 'content': 'New'},
+            {'prompt_id': str(self.existing.prompt_id), 'title': 'Updated', 'content': 'New content',
+             'username': 'hijack', 'tags': ['fresh']},
+        ])
+        out = self.run_import(path, workers=1)
+        self.assertIn('1 new, 1 updated', out)
+        self.assertIn('1 line(s) were superseded', out)
+
+        existing = Prompt.objects.get(pk=self.existing.pk)
+        self.assertEqual((existing.title, existing.content, existing.tags), ('Updated', 'New content', ['fresh']))
+        self.assertEqual(existing.username, 'original')
+        self.assertEqual(existing.modification_code, self.existing.modification_code)
+        self.assertEqual(existing.created_at, self.existing.created_at)
+        self.assertEqual(str(Prompt.objects.get(title='Fresh').prompt_id), new_id)
+        self.assertEqual(self.client.get(reverse('api:tag-list')).data, ['fresh'])
+        self.assertEqual(self.client.get(detail_url).data['title'], 'Updated')
+        self.assertFalse(os.path.exists(path + '.rejects.ndjson')) # Nothing rejected
+
+    def test_sanitize_fast_path_matches_bleach(self):
+        """
+        Ensure text that skips bleach (no markup, entities or control
+        characters) is exactly what bleach would have returned.
+        """
+        import bleach
+        from .serializers import sanitize
+        for value in ['Plain text', 'Quotes "\' and = signs', 'Tabs\tand\nnewlines', 'Émoji 😀 ünïcode', '']:
+            self.assertEqual(sanitize(value), bleach.clean(value, tags=[], attributes={}, strip=True))
+        self.assertEqual(sanitize('<b>a</b> & b\r\n'), 'a &amp; b\n')
+
+# --- End Prompt Import Tests ---
+
+# --- Prompt Export Tests ---
+
+class PromptExportViewTests(APITestCase):
+    """
+    Tests for the /api/prompts/export/ NDJSON stream.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('api:prompt-export')
+        self.alpha = Prompt.objects.create(title='Alpha export', content='First', tags=['one'])
+        self.beta = Prompt.objects.create(title='Beta export', content='Second', tags=['two'])
+        Comment.objects.create(prompt=self.alpha, content='Older')
+        Comment.objects.create(prompt=self.alpha, content='Newer')
+
+    def read_lines(self, response):
+        body = b''.join(response.streaming_content)
+        if response.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return [orjson.loads(line) for line in body.splitlines()]
+
+    def test_export_streams_ndjson(self):
+        """
+        Ensure every prompt is streamed as one list-serializer object per line.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        from .serializers import PromptListSerializer
+        lines = self.read_lines(response)
+        expected = PromptListSerializer(Prompt.objects.all(), many=True).data
+        self.assertCountEqual(lines, orjson.loads(orjson.dumps(expected, default=str)))
+
+    def test_export_filters(self):
+        """
+        Ensure the list view's search and tag filters apply to the export.
+        """
+        lines = self.read_lines(self.client.get(self.url, {'tags': 'two'}))
+        self.assertEqual([line['prompt_id'] for line in lines], [str(self.beta.prompt_id)])
+        lines = self.read_lines(self.client.get(self.url, {'search': 'alpha', 'search_mode': 'icontains'}))
+        self.assertEqual([line['prompt_id'] for line in lines], [str(self.alpha.prompt_id)])
+        response = self.client.get(self.url, {'tags': 'one', 'tag_mode': 'bogus'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(PROMPT_EXPORT_CHUNK_SIZE=1)
+    def test_export_include_comments(self):
+        """
+        Ensure include=comments nests each prompt's comments, newest first,
+        across chunk boundaries.
+        """
+        lines = {line['prompt_id']: line for line in self.read_lines(self.client.get(self.url, {'include': 'comments'}))}
+        self.assertEqual([c['content'] for c in lines[str(self.alpha.prompt_id)]['comments']], ['Newer', 'Older'])
+        self.assertEqual(lines[str(self.beta.prompt_id)]['comments'], [])
+
+    def test_export_gzip(self):
+        """
+        Ensure the stream is gzip-compressed when the client accepts it.
+        """
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(self.read_lines(response)), 2)
+
+    def test_export_gzip_q_values(self):
+        """
+        Ensure Accept-Encoding q-values are honoured: q=0 refuses gzip, and
+        a wildcard accepts it.
+        """
+        for header, compressed in (
+            ('gzip;q=0, identity', False),
+            ('deflate, *;q=0', False),
+            ('GZIP; q=0.5', True),
+            ('deflate, *', True),
+            ('*, gzip;q=0', False),
+        ):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING=header)
+            self.assertEqual(response.has_header('Content-Encoding'), compressed, header)
+            self.assertEqual(len(self.read_lines(response)), 2)
+
+# --- End Prompt Export Tests ---
+
+# --- Fast Serializer Tests ---
+
+class FastSerializerTests(APITestCase):
+    """
+    The fast read path (api/fast_serializers.py) must render exactly the same
+    JSON as the DRF serializers it stands in for.
+    """
+
+    def setUp(self):
+        import datetime
+        from django.utils import timezone
+        cache.clear()
+        moment = timezone.now().replace(microsecond=0) # isoformat() drops zero microseconds
+        self.prompts = [
+            Prompt.objects.create(title="Plain", content="Text", tags=["python", "Django"]),
+            Prompt.objects.create(title="Ünïcode “quotes” \\ \"", content="Emoji 🚀\nnewline", tags=[]),
+            Prompt.objects.create(title="No user", content="x", username=None),
+        ]
+        Prompt.objects.filter(pk=self.prompts[2].pk).update(created_at=moment, updated_at=moment - datetime.timedelta(days=400))
+        for index in range(3):
+            Comment.objects.create(prompt=self.prompts[0], content=f"Comment {index} <ok>")
+        Comment.objects.create(prompt=self.prompts[1], content="Other", username=None)
+
+    def render(self, data):
+        from rest_framework.renderers import JSONRenderer
+        return JSONRenderer().render(data)
+
+    def assert_same_json(self, fast, serializer_class, queryset):
+        expected = self.render(serializer_class(queryset, many=True).data)
+        self.assertEqual(self.render(fast.serialize(queryset.values(*fast.columns))), expected)
+
+    def test_byte_identical_to_drf_serializers(self):
+        """
+        Ensure prompt list and comment output matches the DRF serializers byte for
+        byte, in UTC and in another active timezone.
+        """
+        from django.utils import timezone
+        from .fast_serializers import comment_fast, prompt_list_fast
+        from .serializers import CommentSerializer, PromptListSerializer
+        for zone in ('UTC', 'Asia/Kolkata'):
+            with timezone.override(zone):
+                self.assert_same_json(prompt_list_fast, PromptListSerializer, Prompt.objects.order_by('title'))
+                self.assert_same_json(comment_fast, CommentSerializer, Comment.objects.order_by('content'))
+
+    def test_views_render_the_same_json(self):
+        """
+        Ensure the list and batch endpoints return the bytes the DRF serializers
+        would have produced.
+        """
+        import json
+        from django.db.models.functions import Lower
+        from .serializers import CommentSerializer, PromptListSerializer
+        response = self.client.get(reverse('api:prompt-list-create'), {'sort': 'title_asc'})
+        expected = self.render(PromptListSerializer(Prompt.objects.order_by(Lower('title')), many=True).data)
+        self.assertEqual(self.render(json.loads(response.content)['results']), expected)
+        self.assertIn(expected[1:-1], response.content) # Same bytes inside the paginated envelope
+
+        url = reverse('api:comment-list-create', kwargs={'prompt_id': self.prompts[0].prompt_id})
+        response = self.client.get(url, {'pagination': 'cursor'})
+        comments = Comment.objects.filter(prompt=self.prompts[0]).order_by('-created_at', '-comment_id')
+        self.assertIn(self.render(CommentSerializer(comments, many=True).data)[1:-1], response.content)
+
+        ids = [str(prompt.prompt_id) for prompt in reversed(self.prompts)]
+        response = self.client.post(
+            reverse('api:prompt-batch') + '?include=latest_comments&n=2', {'ids': ids}, format='json'
+        )
+        fresh = Prompt.objects.in_bulk([prompt.pk for prompt in self.prompts])
+        ordered = [fresh[prompt.pk] for prompt in reversed(self.prompts)]
+        expected = PromptListSerializer(ordered, many=True).data
+        for item, prompt in zip(expected, ordered):
+            latest = Comment.objects.filter(prompt=prompt).order_by('-created_at', '-comment_id')[:2]
+            item['latest_comments'] = CommentSerializer(latest, many=True).data
+        self.assertEqual(response.content, self.render(expected))
+
+    def test_unsupported_fields_are_rejected(self):
+        """
+        Ensure serializers with fields the fast path can't reproduce are refused.
+        """
+        from django.core.exceptions import ImproperlyConfigured
+        from rest_framework import serializers
+        from .fast_serializers import FastSerializer
+
+        class WithMethodField(serializers.ModelSerializer):
+            shout = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Prompt
+                fields = ['prompt_id', 'shout']
+
+            def get_shout(self, obj):
+                return obj.title.upper()
+
+        with self.assertRaises(ImproperlyConfigured):
+            FastSerializer(WithMethodField)
+
+# --- End Fast Serializer Tests ---
+
+# --- Renderer / Parser Tests ---
+
+class RendererParserTests(APITestCase):
+    """
+    Tests for the orjson and MessagePack renderers and parsers.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.prompt = Prompt.objects.create(title="Rendered", content="Ünïcode 🚀", tags=["json"])
+
+    def test_json_is_rendered_with_orjson(self):
+        """
+        Ensure JSON responses are compact UTF-8 and identical to DRF's encoder for
+        serializer output, including UUIDs and Z-suffixed datetimes.
+        """
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import ORJSONRenderer
+        from .serializers import CommentSerializer
+        comment = Comment.objects.create(prompt=self.prompt, content="Rendered comment")
+        response = self.client.get(reverse('api:comment-detail', kwargs={'comment_id': comment.comment_id}))
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.content, JSONRenderer().render(CommentSerializer(comment).data))
+        self.assertIn('"Ünïcode 🚀"'.encode(), ORJSONRenderer().render({'content': self.prompt.content}))
+        indented = ORJSONRenderer().render({'a': 1}, 'application/json; indent=4')
+        self.assertEqual(indented, b'{\n  "a": 1\n}')
+
+    def test_json_parse_errors(self):
+        """
+        Ensure malformed JSON bodies (and NaN) are rejected with 400.
+        """
+        for body in ('{"title": ', '{"title": NaN}'):
+            response = self.client.post(reverse('api:prompt-list-create'), body, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('JSON parse error', response.json()['detail'])
+
+    def test_json_request_body_is_parsed(self):
+        """
+        Ensure JSON request bodies still create prompts.
+        """
+        data = {'title': 'Parsed', 'content': 'Parsed body', 'tags': ['orjson']}
+        response = self.client.post(reverse('api:prompt-list-create'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['tags'], ['orjson'])
+
+    @unittest.skipUnless(importlib.util.find_spec('msgpack'), 'msgpack is not installed')
+    def test_msgpack_negotiation(self):
+        """
+        Ensure MessagePack is used for requests and responses when negotiated.
+        """
+        import msgpack
+        url = reverse('api:prompt-detail', kwargs={'prompt_id': self.prompt.prompt_id})
+        response = self.client.get(url, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content)['prompt_id'], str(self.prompt.prompt_id))
+
+        body = msgpack.packb({'title': 'Packed', 'content': 'Packed body'})
+        response = self.client.post(reverse('api:prompt-list-create'), body, content_type='application/msgpack')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+# --- End Renderer / Parser Tests ---
+
+# --- Query Budget Tests ---
+
+class QueryBudgetTests(APITestCase):
+    """
+    Enforces the per-route query budgets declared in api/query_budget.py.
+    """
+
+    def setUp(self):
+        cache.clear()
+        from .synthetic import Generator
+        from . import bulk
+        for prompts, comments in Generator(seed=1, comments_per_prompt=8, tag_count=10).batches(15):
+            bulk.insert_objects(Prompt, prompts)
+            bulk.insert_objects(Comment, comments)
+
+    def test_every_route_has_a_budget(self):
+        """
+        Ensure every route in api/urls.py declares a query budget.
+        """
+        from .query_budget import QUERY_BUDGETS
+        from .urls import urlpatterns
+        for pattern in urlpatterns:
+            self.assertIn(f'api:{pattern.name}', QUERY_BUDGETS)
+
+    def test_views_stay_within_query_budgets(self):
+        """
+        Ensure each benchmark scenario (which covers every route) runs no more
+        queries than its route's budget, on a cold cache.
+        """
+        import json, random
+        from django.urls import resolve
+        from .benchmark import default_scenarios, load_fixtures
+        from .query_budget import get_budget
+        rng = random.Random(0)
+        fixtures = load_fixtures(rng)
+        for scenario in default_scenarios():
+            path, data, headers = scenario.build(fixtures, rng)
+            cache.clear() # Budgets are for a cold cache; keeps version keys fresh too
+            kwargs = {'content_type': 'application/json', 'data': json.dumps(data)} if data is not None else {}
+            with CaptureQueriesContext(connection) as ctx:
+                response = getattr(self.client, scenario.method)(path, **kwargs, **headers)
+                if response.streaming:
+                    b''.join(response.streaming_content) # Streamed views query as they go
+            self.assertLess(response.status_code, 400, scenario.name)
+            budget = get_budget(resolve(path.split('?')[0]).view_name, scenario.method.upper())
+            self.assertIsNotNone(budget, scenario.name)
+            # Savepoints only exist because each test runs inside a transaction.
+            queries = [q['sql'] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]
+            self.assertLessEqual(
+                len(queries), budget,
+                f"{scenario.name} ran {len(queries)} queries (budget {budget}):\n" + '\n'.join(queries)
+            )
+
+    def test_batch_budget_holds_at_max_ids(self):
+        """
+        Ensure a batch request with PROMPT_BATCH_MAX_IDS ids (and latest
+        comments) stays within its budget, not just the benchmark's 50 ids.
+        """
+        import uuid
+        from django.conf import settings
+        from .query_budget import get_budget
+        ids = [str(pk) for pk in Prompt.objects.values_list('pk', flat=True)]
+        ids += [str(uuid.uuid4()) for _ in range(settings.PROMPT_BATCH_MAX_IDS - len(ids))]
+        url = reverse('api:prompt-batch') + '?include=latest_comments&n=3'
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(url, {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), Prompt.objects.count())
+        queries = [q['sql'] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertLessEqual(len(queries), get_budget('api:prompt-batch', 'POST'), '\n'.join(queries))
+
+    @override_settings(DEBUG=True, QUERY_INSPECTION=True, N_PLUS_ONE_THRESHOLD=3)
+    def test_n_plus_one_detector(self):
+        """
+        Ensure the inspection middleware logs repeated statements with a stack.
+        """
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from .query_budget import QueryInspectionMiddleware, fingerprint
+
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s) AND n = 5"),
+            fingerprint("SELECT *  FROM t WHERE id IN (%s) AND n = 7"),
+        )
+
+        def n_plus_one_view(request):
+            for comment in Comment.objects.all()[:4]:
+                comment.prompt.title # One query per comment
+            return HttpResponse()
+
+        middleware = QueryInspectionMiddleware(n_plus_one_view)
+        with self.assertLogs('api.queries', level='WARNING') as logs:
+            middleware(RequestFactory().get('/api/anything/'))
+        self.assertTrue(any('Possible N+1' in line and 'n_plus_one_view' in line for line in logs.output))
+
+# --- End Query Budget Tests ---
+
+# --- Server Timing Tests ---
+
+class ServerTimingTests(APITestCase):
+    """
+    Tests for the Server-Timing middleware in api/timing.py.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.prompt = Prompt.objects.create(title="Timed", content="Timed content", tags=["timing"])
+        Comment.objects.create(prompt=self.prompt, content="Timed comment")
+
+    def parse_header(self, response):
+        metrics = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            metrics[name] = dict(param.split('=', 1) for param in params)
+        return metrics
+
+    def test_header_breaks_down_request_time(self):
+        """
+        Ensure a GET reports DB, cache and serialization time with call counts.
+        """
+        response = self.client.get(reverse('api:prompt-list-create'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        metrics = self.parse_header(response)
+        self.assertEqual(set(metrics), {'db', 'cache', 'serialize', 'sanitize', 'total'})
+        self.assertNotEqual(metrics['db']['desc'], '"0 calls"')
+        self.assertNotEqual(metrics['cache']['desc'], '"0 calls"')
+        # The ListSerializer's .data counts once, not once per item.
+        self.assertEqual(metrics['serialize']['desc'], '"1 call"')
+        self.assertGreaterEqual(float(metrics['total']['dur']), float(metrics['db']['dur']))
+
+    def test_header_reports_sanitization(self):
+        """
+        Ensure bleach sanitization of a new prompt's title and content is timed.
+        """
+        data = {'title': '<b>Bold</b> title', 'content': '<script>x</script>Body'}
+        response = self.client.post(reverse('api:prompt-list-create'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.parse_header(response)['sanitize']['desc'], '"2 calls"')
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_requests_have_no_header(self):
+        """
+        Ensure requests outside the sample are not instrumented.
+        """
+        response = self.client.get(reverse('api:prompt-list-create'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(SERVER_TIMING_LOG=True)
+    def test_structured_log_line(self):
+        """
+        Ensure SERVER_TIMING_LOG writes one JSON record per timed request.
+        """
+        import json
+        path = reverse('api:comment-list-create', kwargs={'prompt_id': self.prompt.prompt_id})
+        with self.assertLogs('api.timing', level='INFO') as logs:
+            self.client.get(path)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['route'], 'api:comment-list-create')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['db_calls'], 0)
+        self.assertIn('serialize_ms', record)
+
+# --- End Server Timing Tests ---
+
+# --- Metrics Tests ---
+
+@override_settings(METRICS_TOKEN='secret')
+class MetricsTests(APITestCase):
+    """
+    Tests for the metrics registry (api/metrics.py) and the /metrics endpoint.
+    """
+
+    def setUp(self):
+        from . import metrics
+        cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer secret')
+        self.prompt = Prompt.objects.create(title="Measured", content="Measured content")
+        metrics.registry.reset() # After setup, whose signal handlers use the cache
+
+    def test_requests_are_counted_by_route(self):
+        """
+        Ensure requests are counted and timed by route name, method and status.
+        """
+        self.client.get(reverse('api:prompt-list-create'))
+        self.client.get(reverse('api:prompt-list-create'))
+        self.client.get(reverse('api:prompt-detail', kwargs={'prompt_id': '00000000-0000-0000-0000-000000000000'}))
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('api_requests_total{route="api:prompt-list-create",method="GET",status="200"} 2', body)
+        self.assertIn('api_requests_total{route="api:prompt-detail",method="GET",status="404"} 1', body)
+        self.assertIn('api_request_duration_seconds_bucket{route="api:prompt-list-create",method="GET",le="+Inf"} 2', body)
+        self.assertIn('api_request_duration_seconds_count{route="api:prompt-list-create",method="GET"} 2', body)
+        self.assertIn('# TYPE api_request_duration_seconds histogram', body)
+
+    def test_cache_and_ratelimit_counters(self):
+        """
+        Ensure cache lookups are split into hits and misses and that
+        rate-limit rejections are counted.
+        """
+        from django.test import RequestFactory
+        from . import metrics
+        from .views import ratelimited_error
+        cache.set('metrics-test', 1)
+        cache.get('metrics-test')
+        cache.get('metrics-missing')
+        cache.get_many(['metrics-test', 'metrics-missing'])
+        ratelimited_error(RequestFactory().get('/api/prompts/'), None)
+        counters, _, _ = metrics.collect()
+        self.assertEqual(counters[('api_cache_requests_total', (('result', 'hit'),))], 2)
+        self.assertEqual(counters[('api_cache_requests_total', (('result', 'miss'),))], 2)
+        self.assertEqual(counters[('api_ratelimit_rejections_total', (('route', 'unmatched'),))], 1)
+        self.assertIn('api_cache_hit_ratio 0.5', metrics.render())
+
+    def test_swallowed_redis_errors_count_as_misses(self):
+        """
+        Ensure lookups that django-redis answers from a swallowed connection
+        error (IGNORE_EXCEPTIONS) are misses, not hits.
+        """
+        from . import metrics
+        from .cache_backends import TimedRedisCache
+        unreachable = TimedRedisCache('redis://127.0.0.1:1/0', {'OPTIONS': {
+            'IGNORE_EXCEPTIONS': True, 'SOCKET_CONNECT_TIMEOUT': 0.5,
+        }})
+        self.assertEqual(unreachable.get('key', 'fallback'), 'fallback')
+        self.assertEqual(unreachable.get_many(['a', 'b']), {})
+        counters, _, _ = metrics.collect()
+        self.assertEqual(counters[('api_cache_requests_total', (('result', 'miss'),))], 3)
+        self.assertNotIn(('api_cache_requests_total', (('result', 'hit'),)), counters)
+
+    def test_snapshots_are_summed_across_processes(self):
+        """
+        Ensure /metrics adds up the snapshot files of every running worker
+        process and prunes those of processes that have exited.
+        """
+        import json, subprocess, sys, tempfile
+        from . import metrics
+        exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+        exited.wait()
+        with tempfile.TemporaryDirectory() as directory:
+            other = metrics.Registry()
+            other.inc('api_requests_total', (('route', 'api:tag-list'), ('method', 'GET'), ('status', '200')), 5)
+            for pid in (os.getppid(), exited.pid): # A running process and a gone one
+                with open(os.path.join(directory, f'{pid}.json'), 'w') as f:
+                    json.dump(other.snapshot(), f)
+            with override_settings(METRICS_DIR=directory):
+                self.client.get(reverse('api:tag-list'))
+                body = self.client.get('/metrics').content.decode()
+                self.assertTrue(os.path.exists(os.path.join(directory, f'{os.getpid()}.json')))
+                self.assertFalse(os.path.exists(os.path.join(directory, f'{exited.pid}.json')))
+        self.assertIn('api_requests_total{route="api:tag-list",method="GET",status="200"} 6', body)
+        self.assertIn('api_metrics_processes 2', body)
+
+    def test_flush_errors_never_fail_requests(self):
+        """
+        Ensure a missing METRICS_DIR is created, and one that can't be written
+        is logged without failing the request (nor retried before the interval).
+        """
+        import tempfile
+        from . import metrics
+        with tempfile.TemporaryDirectory() as parent:
+            missing = os.path.join(parent, 'metrics')
+            with override_settings(METRICS_DIR=missing, METRICS_FLUSH_INTERVAL=0):
+                self.assertEqual(self.client.get(reverse('api:tag-list')).status_code, status.HTTP_200_OK)
+            self.assertTrue(os.path.exists(os.path.join(missing, f'{os.getpid()}.json')))
+
+            blocked = os.path.join(parent, 'file')
+            open(blocked, 'w').close() # A file where the directory should be
+            metrics.registry.flushed_at = 0.0
+            with override_settings(METRICS_DIR=blocked, METRICS_FLUSH_INTERVAL=60):
+                with self.assertLogs('api.metrics', 'ERROR'):
+                    self.assertEqual(self.client.get(reverse('api:tag-list')).status_code, status.HTTP_200_OK)
+                self.assertGreater(metrics.registry.flushed_at, 0.0)
+
+    def test_token_protects_endpoint(self):
+        """
+        Ensure /metrics requires the bearer token, and is refused without a
+        METRICS_TOKEN unless DEBUG is on.
+        """
+        self.client.credentials()
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+            with override_settings(DEBUG=True):
+                self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_200_OK)
+
+    def test_registry_is_thread_safe(self):
+        """
+        Ensure concurrent increments from threaded workers are not lost.
+        """
+        import threading
+        from . import metrics
+        registry = metrics.Registry()
+
+        def work():
+            for _ in range(2000):
+                registry.inc('api_requests_total')
+                registry.observe('api_request_duration_seconds', 0.01)
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(registry.counters[('api_requests_total', ())], 16000)
+        self.assertEqual(sum(registry.histograms[('api_request_duration_seconds', ())][:-1]), 16000)
+
+# --- End Metrics Tests ---
+
+# --- Profiling Tests ---
+
+class ProfilingTests(APITestCase):
+    """
+    Tests for the opt-in request profiler (api/profiling.py) and the
+    `profiles` management command.
+    """
+
+    def setUp(self):
+        import shutil, tempfile
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings_override = override_settings(PROFILING_ENABLED=True, PROFILING_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        Prompt.objects.create(title="Profiled", content="Profiled content")
+
+    def test_disabled_middleware_is_not_installed(self):
+        """
+        Ensure the middleware removes itself when PROFILING_ENABLED is off.
+        """
+        from django.core.exceptions import MiddlewareNotUsed
+        from .profiling import ProfilingMiddleware
+        with override_settings(PROFILING_ENABLED=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilingMiddleware(lambda request: None)
+
+    def test_signed_header_captures_profile(self):
+        """
+        Ensure a request with a valid signed header is profiled, and requests
+        without one (or with a forged one) are not.
+        """
+        from .profiling import make_token
+        url = reverse('api:prompt-list-create')
+        self.assertNotIn('X-Profile-Id', self.client.get(url))
+        self.assertNotIn('X-Profile-Id', self.client.get(url, HTTP_X_PROFILE='profile:forged'))
+
+        response = self.client.get(url, HTTP_X_PROFILE=make_token())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        capture_id = response['X-Profile-Id']
+        for extension in ('prof', 'collapsed', 'json'):
+            self.assertTrue(os.path.exists(os.path.join(self.directory, f'{capture_id}.{extension}')))
+        self.assertEqual(len(os.listdir(self.directory)), 3)
+
+    def test_route_allowlist_and_command(self):
+        """
+        Ensure PROFILING_ROUTES profiles matching routes and that `profiles`
+        lists and diffs the captures.
+        """
+        from io import StringIO
+        from django.core.management import call_command
+        with override_settings(PROFILING_ROUTES=['api:tag-list']):
+            first = self.client.get(reverse('api:tag-list'))['X-Profile-Id']
+            second = self.client.get(reverse('api:tag-list'), {'with_counts': 'true'})['X-Profile-Id']
+            self.assertNotIn('X-Profile-Id', self.client.get(reverse('api:prompt-list-create')))
+
+        out = StringIO()
+        call_command('profiles', 'list', stdout=out)
+        self.assertIn(first, out.getvalue())
+        self.assertIn('/api/tags/?with_counts=true', out.getvalue())
+
+        out = StringIO()
+        call_command('profiles', 'diff', first, second, '--limit', '5', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('Total:'))
+        self.assertEqual(len(lines), 7) # Total, header, 5 functions
+
+# --- End Profiling Tests ---
+
 # --- Tag List View Tests ---
 
 class TagListViewTests(APITestCase):
@@ -937,6 +2550,10 @@ class TagListViewTests(APITestCase):
     Tests for the /api/tags/ endpoint.
     """
 
+    def setUp(self):
+        """Clear cached tag responses (the DB is rolled back between tests, the cache is not)."""
+        cache.clear()
+
     def _create_prompt(self, title="Sample Title", content="Sample content.", tags=None):
         """Helper method copied from PromptAPITests for convenience."""
         # Default to None to test that case
@@ -997,6 +2614,80 @@ class TagListViewTests(APITestCase):
         self.assertIsInstance(response.data, list)
         self.assertEqual(len(response.data), 0) # Expect empty list
 
+    def test_list_tags_with_counts_and_filters(self):
+        """
+        Ensure GET /api/tags/ supports usage counts, prefix, min_count, order and limit.
+        """
+        self._create_prompt(title="P1", tags=["python", "api"])
+        self._create_prompt(title="P2", tags=["python", "django"])
+        self._create_prompt(title="P3", tags=["python", "api", "pytest"])
+
+        url = reverse('api:tag-list')
+
+        response = self.client.get(url + '?with_counts=true&order=count')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual(response.data, [
+            {'tag': 'python', 'count': 3},
+            {'tag': 'api', 'count': 2},
+            {'tag': 'django', 'count': 1},
+            {'tag': 'pytest', 'count': 1},
+        ])
+
+        response_prefix = self.client.get(url + '?prefix=PY')
+        self.assertListEqual(response_prefix.data, ["pytest", "python"])
+
+        response_min = self.client.get(url + '?min_count=2')
+        self.assertListEqual(response_min.data, ["api", "python"])
+
+        response_limit = self.client.get(url + '?order=count&limit=1')
+        self.assertListEqual(response_limit.data, ["python"])
+
+    def test_list_tags_invalid_params(self):
+        """
+        Ensure GET /api/tags/ returns 400 for invalid option values.
+        """
+        url = reverse('api:tag-list')
+        for query in ('?limit=0', '?min_count=abc', '?order=random'):
+            with self.subTest(query=query):
+                response = self.client.get(url + query)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_tags_cached_with_etag(self):
+        """
+        Ensure GET /api/tags/ is served from cache, revalidates with 304, and
+        is invalidated only when tags change.
+        """
+        prompt = self._create_prompt(title="P1", tags=["python"])
+        url = reverse('api:tag-list')
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/')) # Strong validator
+
+        # Revalidation and cache hits don't touch the database.
+        with self.assertNumQueries(0):
+            response_304 = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            response_cached = self.client.get(url)
+        self.assertEqual(response_304.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertListEqual(response_cached.data, ["python"])
+
+        # Editing something other than tags keeps the cached version.
+        prompt.title = "Renamed"
+        prompt.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Changing tags invalidates it.
+        prompt.tags = ["python", "django"]
+        prompt.save()
+        response_changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response_changed.status_code, status.HTTP_200_OK)
+        self.assertListEqual(response_changed.data, ["django", "python"])
+
+        # Deleting a tagged prompt invalidates it too.
+        prompt.delete()
+        self.assertListEqual(self.client.get(url).data, [])
+
 # --- End Tag List View Tests ---
 
 # --- API Root View Tests ---
@@ -0,0 +1,122 @@
+import contextvars
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger('api.timing')
+
+# --- Request Timing ---
+# Per-request breakdown of where the time went, reported in a Server-Timing
+# header (visible in the browser's network panel) and optionally as one JSON
+# log line. DB time comes from connection.execute_wrapper(); cache, serializer
+# and sanitizer time from measure() calls in api/cache_backends.py and
+# api/serializers.py. Outside a sampled request measure() is a single
+# ContextVar lookup, so the hooks can stay in place in production.
+
+DB = 'db'
+CACHE = 'cache'
+SERIALIZE = 'serialize'
+SANITIZE = 'sanitize'
+METRICS = (DB, CACHE, SERIALIZE, SANITIZE)
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Accumulated seconds and call counts per metric for one request."""
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(METRICS, 0.0)
+        self.counts = dict.fromkeys(METRICS, 0)
+        self.active = set()
+
+    def add(self, name, seconds):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add(DB, time.perf_counter() - started)
+
+    def header(self, total):
+        entries = []
+        for name, seconds in self.seconds.items():
+            count = self.counts[name]
+            entries.append(f'{name};dur={seconds * 1000:.2f};desc="{count} call{"" if count == 1 else "s"}"')
+        entries.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(entries)
+
+
+@contextmanager
+def measure(name):
+    """
+    Adds the time spent in the block to metric `name` of the current request.
+    Nested blocks for the same metric (e.g. a nested serializer) count once.
+    """
+    timings = _current.get()
+    if timings is None or name in timings.active:
+        yield
+        return
+    timings.active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.active.discard(name)
+        timings.add(name, time.perf_counter() - started)
+
+
+class ServerTimingMiddleware:
+    """
+    Times a sample (SERVER_TIMING_SAMPLE_RATE) of requests and adds the
+    Server-Timing header to their responses. Work done while a streaming
+    response is consumed happens after the header is sent and isn't counted.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.SERVER_TIMING_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(timings.db_wrapper):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+
+        response['Server-Timing'] = timings.header(total)
+        if settings.SERVER_TIMING_LOG:
+            self.log(request, response, timings, total)
+        return response
+
+    def log(self, request, response, timings, total):
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'route': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+        }
+        for name in timings.seconds:
+            record[f'{name}_ms'] = round(timings.seconds[name] * 1000, 2)
+            record[f'{name}_calls'] = timings.counts[name]
+        logger.info(json.dumps(record))
@@ -12,6 +12,8 @@ urlpatterns = [
     path('prompts/', views.PromptListCreateView.as_view(), name='prompt-list-create'),
     path('prompts/random/', views.RandomPromptView.as_view(), name='prompt-random'),
     path('prompts/batch/', views.BatchPromptView.as_view(), name='prompt-batch'),
+    path('prompts/bulk/', views.BulkPromptCreateView.as_view(), name='prompt-bulk-create'),
+    path('prompts/export/', views.PromptExportView.as_view(), name='prompt-export'),
     path('prompts/<uuid:prompt_id>/', views.PromptDetailView.as_view(), name='prompt-detail'),
 
     # --- Comment Views ---
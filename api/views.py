@@ -3,27 +3,46 @@ from rest_framework import generics, status, views
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied, NotFound, ValidationError
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Count # <--- Import Count
-from django.db.models.functions import Lower
-from django.db import connection
+from django.db.models import Q, F, Window
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models.functions import Lower, RowNumber
+from django.db import connection, transaction
 from django.db.utils import OperationalError
 from django.utils.decorators import method_decorator
-from rest_framework.pagination import PageNumberPagination
-from django.http import JsonResponse, HttpResponse # Add this import
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse # Add this import
 from django.core.cache import cache
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.utils.crypto import constant_time_compare
+from django.utils.cache import patch_vary_headers
+import itertools
+import math
 import time
+import zlib
+import orjson
 from rest_framework.reverse import reverse
 import uuid # Import the uuid module
 import os # <--- Import os
 
 # Import models and serializers
-from .models import Prompt, Comment # Ensure these are imported
+from .models import Prompt, Comment, SEARCH_CONFIG # Ensure these are imported
 from .serializers import ( # Ensure these are imported
     PromptSerializer,
+    PromptDetailSerializer,
     PromptListSerializer,
     CommentSerializer,
     PromptBatchIdSerializer
 )
+from .pagination import StandardResultsSetPagination, PaginationModeMixin
+from . import capacity, metrics
+from .caching import (
+    PROMPT_DETAIL_VERSION, PROMPT_LIST_VERSION, TAGS_VERSION, bump_version, get_version, get_versions, make_etag,
+    make_key, prompt_version,
+)
+from .conditional import ConditionalGetMixin, apply_validators, etag_matches, get_queryset_validators
+from .fast_serializers import FastListMixin, comment_fast, prompt_list_fast
+from .renderers import ORJSONRenderer
 
 # Import rate limiting decorators
 from django_ratelimit.decorators import ratelimit
@@ -40,6 +59,7 @@ def ratelimited_error(request, exception):
     """
     Custom view to return a JSON 429 response when rate limited.
     """
+    metrics.record_ratelimit_rejection(request)
     # You can customize the response format if needed
     return JsonResponse(
         # --- UPDATE THE DETAIL MESSAGE ---
@@ -110,17 +130,87 @@ class CacheTestView(views.APIView):
 
 # --- END Cache Test View ---
 
-# --- Custom Pagination ---
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'limit'
-    max_page_size = 100
+# --- Prompt Filtering ---
+class PromptFilterMixin:
+    """
+    The `search` (+ `search_mode`/`fuzzy`/`threshold`) and `tags` (+ `tag_mode`)
+    filters, shared by the prompt list and the export.
+    """
+
+    def get_fuzzy_threshold(self):
+        """Returns the similarity threshold for ?fuzzy=1 searches, or None when not fuzzy."""
+        params = self.request.query_params
+        if not params.get('search') or params.get('fuzzy', '').lower() not in ('1', 'true'):
+            return None
+        try:
+            threshold = float(params.get('threshold', settings.SEARCH_FUZZY_THRESHOLD))
+            if not math.isfinite(threshold): # float() accepts 'nan' and 'inf'
+                raise ValueError
+        except ValueError:
+            raise ValidationError({'threshold': 'Must be a number between 0 and 1.'})
+        return min(max(threshold, 0.0), 1.0)
+
+    def filter_prompts(self, queryset, fuzzy_operator=True):
+        """
+        Applies the request's search and tag filters. Returns `(queryset,
+        search_vector_query)`; the latter is the full-text query (for relevance
+        ordering) or None. The indexed fuzzy operator needs the threshold set in
+        the same transaction (see PromptListCreateView.list); with
+        `fuzzy_operator=False` the similarity is compared directly instead.
+        """
+        search_query = self.request.query_params.get('search', None)
+        search_mode = self.request.query_params.get('search_mode', 'fulltext').lower()
+        tags_query = self.request.query_params.get('tags', None)
+
+        # Search
+        search_vector_query = None
+        threshold = self.get_fuzzy_threshold()
+        if search_query:
+            if threshold is not None:
+                # Typo-tolerant title matching via the pg_trgm index.
+                queryset = queryset.annotate(similarity=TrigramWordSimilarity(search_query, 'title'))
+                if fuzzy_operator:
+                    queryset = queryset.filter(title__trigram_word_similar=search_query)
+                else:
+                    queryset = queryset.filter(similarity__gte=threshold)
+            elif search_mode == 'icontains':
+
+                # Legacy substring matching, kept as a fallback. The title side can
+                # use the UPPER(title) trigram index; content is still scanned.
+                queryset = queryset.filter(
+                    Q(title__icontains=search_query) | Q(content__icontains=search_query)
+                )
+            else:
+                # Full-text search against the GIN-indexed search_vector column.
+                search_vector_query = SearchQuery(search_query, search_type='websearch', config=SEARCH_CONFIG)
+                queryset = queryset.filter(search_vector=search_vector_query)
+
+        # Filter by Tags (case-insensitive, against the GIN-indexed tags_lower column)
+        if tags_query:
+            tags_list = [tag.strip().lower() for tag in tags_query.split(',') if tag.strip()]
+            if tags_list:
+                tag_mode = self.request.query_params.get('tag_mode', 'any').lower()
+                if tag_mode == 'any':
+                    queryset = queryset.filter(tags_lower__overlap=tags_list) # &&
+                elif tag_mode == 'all':
+                    queryset = queryset.filter(tags_lower__contains=tags_list) # @>
+                elif tag_mode == 'none':
+                    # tags_lower is NULL for prompts without tags (NOT (NULL && ...)
+                    # is NULL, not true), and those have none of the tags either.
+                    queryset = queryset.filter(Q(tags_lower__isnull=True) | ~Q(tags_lower__overlap=tags_list))
+                else:
+                    raise ValidationError({'tag_mode': "Must be one of 'any', 'all' or 'none'."})
+
+
+        return queryset, search_vector_query
+
 
 # --- Prompt Views ---
 @method_decorator(ratelimit(key='ip', rate=GLOBAL_API_RATE, method='POST', block=True), name='dispatch')
-class PromptListCreateView(generics.ListCreateAPIView):
+class PromptListCreateView(PromptFilterMixin, ConditionalGetMixin, PaginationModeMixin, FastListMixin, generics.ListCreateAPIView):
     queryset = Prompt.objects.all()
     pagination_class = StandardResultsSetPagination
+    fast_serializer = prompt_list_fast # GET output, same JSON as PromptListSerializer
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -128,18 +218,14 @@ class PromptListCreateView(generics.ListCreateAPIView):
         return PromptListSerializer
 
     def create(self, request, *args, **kwargs):
-        # --- ADD HARD LIMIT CHECK FOR PROMPTS ---
-        PROMPT_ROW_LIMIT = 500
-        if Prompt.objects.count() >= PROMPT_ROW_LIMIT:
-            return Response(
-                {"detail": f"Cannot create new prompt. The system has reached its maximum capacity of {PROMPT_ROW_LIMIT} prompts."},
-                status=status.HTTP_403_FORBIDDEN # Or status.HTTP_503_SERVICE_UNAVAILABLE
-            )
-        # --- END HARD LIMIT CHECK ---
-
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
+        # Hard limit check against the cached row counter (see capacity.py)
+        try:
+            with capacity.reserve(capacity.PROMPTS, request):
+                self.perform_create(serializer)
+        except capacity.CapacityExceeded as e:
+            return Response({"detail": str(e)}, status=status.HTTP_403_FORBIDDEN)
         instance = serializer.instance
         response_data = serializer.data
         response_data['modification_code'] = instance.modification_code
@@ -149,32 +235,48 @@ class PromptListCreateView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         serializer.save()
 
+    def list(self, request, *args, **kwargs):
+        threshold = self.get_fuzzy_threshold()
+        if threshold is None:
+            return super().list(request, *args, **kwargs)
+        # The %> operator (the one the trigram index can serve) compares against
+        # pg_trgm.word_similarity_threshold, so scope that setting to this transaction.
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                    [str(threshold)]
+                )
+            return super().list(request, *args, **kwargs)
+
+    def get_validators(self, request):
+        # Every filter/sort/page combination is its own representation. Runs inside
+        # list(), so fuzzy searches see the same similarity threshold as the page.
+        etag, last_modified, self.known_count = get_queryset_validators(
+            self.get_queryset(), 'prompt-list', get_version(PROMPT_LIST_VERSION), request.build_absolute_uri()
+        )
+        return etag, last_modified
+
+    def get_keyset_ordering(self):
+        """Keys for ?pagination=cursor, mirroring the `sort` options (prompt_id breaks ties)."""
+        sort_query = self.request.query_params.get('sort', 'updated_at_desc').lower()
+        if sort_query == 'relevance' or (self.get_fuzzy_threshold() is not None and 'sort' not in self.request.query_params):
+            raise ValidationError({'pagination': 'Cursor pagination is not available for relevance-ordered results.'})
+        keyset_map = {
+            'title_asc': ([Lower('title'), F('prompt_id')], False),
+            'title_desc': ([Lower('title'), F('prompt_id')], True),
+            'updated_at_asc': ([F('updated_at'), F('prompt_id')], False),
+            'updated_at_desc': ([F('updated_at'), F('prompt_id')], True),
+        }
+        return keyset_map.get(sort_query, keyset_map['updated_at_desc'])
+
     def get_queryset(self):
         """Optionally filter and sort the queryset."""
-        # Start with the base queryset and annotate
-        # NOTE: Using .all() here again, consistent with original structure,
-        # but applying annotation. If class queryset is used, adjust accordingly.
-        queryset = Prompt.objects.annotate(
-            comment_count=Count('comments') # <--- Add annotation here
-        )
-        search_query = self.request.query_params.get('search', None)
-        tags_query = self.request.query_params.get('tags', None)
+        # Start with the base queryset
+        # NOTE: comment_count is a denormalized column, so no join/GROUP BY is needed.
+        queryset, search_vector_query = self.filter_prompts(Prompt.objects.all())
         sort_query = self.request.query_params.get('sort', 'updated_at_desc')
-
-        # Search
-        if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) | Q(content__icontains=search_query)
-            )
-
-        # Filter by Tags
-        if tags_query:
-            tags_list = [tag.strip() for tag in tags_query.split(',') if tag.strip()]
-            if tags_list:
-                # --- CORRECTED FILTERING ---
-                # Use the ORM's __overlap lookup instead of .extra()
-                queryset = queryset.filter(tags__overlap=tags_list)
-                # --- END CORRECTION ---
+        fuzzy = self.get_fuzzy_threshold() is not None
 
         # Sort (Apply default or query param)
         sort_map = {
@@ -185,7 +287,15 @@ class PromptListCreateView(generics.ListCreateAPIView):
         }
         ordering = sort_map.get(sort_query.lower())
 
-        if ordering:
+        if fuzzy and (sort_query.lower() == 'relevance' or 'sort' not in self.request.query_params):
+            # Closest matches first unless the client asked for another order.
+            queryset = queryset.order_by('-similarity', '-updated_at')
+        elif sort_query.lower() == 'relevance' and search_vector_query is not None:
+            # Best matches first; ties fall back to the most recently updated.
+            queryset = queryset.annotate(
+                rank=SearchRank(F('search_vector'), search_vector_query)
+            ).order_by('-rank', '-updated_at')
+        elif ordering:
              queryset = queryset.order_by(ordering)
         # else:
         #     queryset = queryset.order_by('-updated_at')
@@ -197,7 +307,8 @@ class PromptListCreateView(generics.ListCreateAPIView):
 class PromptDetailView(generics.RetrieveUpdateDestroyAPIView):
     # ... (Keep ALL existing PromptDetailView code exactly the same) ...
     queryset = Prompt.objects.all()
-    serializer_class = PromptSerializer
+    # Comments are attached as a paginated block, never as the full nested list.
+    serializer_class = PromptDetailSerializer
     lookup_field = 'prompt_id'
 
     def check_modification_code(self, request, instance):
@@ -272,8 +383,41 @@ class PromptDetailView(generics.RetrieveUpdateDestroyAPIView):
         self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def get_detail_cache_key(self, request):
+        # Stamped with the prompt's version, which is bumped on any write to the
+        # prompt or its comments (see signals.py), and the global detail version
+        # bumped by bulk loads.
+        versions = get_versions(PROMPT_DETAIL_VERSION, prompt_version(self.kwargs['prompt_id']))
+        return make_key(f"prompt-detail:{self.kwargs['prompt_id']}", '.'.join(map(str, versions)), {
+            'page': request.query_params.get('page', ''),
+            'limit': request.query_params.get('limit', ''),
+            'base': request.build_absolute_uri('/'), # Comment page links are absolute URLs
+        })
+
     def retrieve(self, request, *args, **kwargs):
+        cache_key = self.get_detail_cache_key(request)
+        entry = cache.get(cache_key)
+        # The cache key identifies this exact representation, so it doubles as the
+        # ETag and revalidation needs no DB query. Last-Modified is only known once
+        # the entry has been built.
+        return apply_validators(
+            request, make_etag(cache_key), entry['last_modified'] if entry else None,
+            self._respond_from_cache, cache_key, entry
+        )
+
+    def _respond_from_cache(self, request, cache_key, entry):
+        # Read-through cache of the serialized detail response.
+        if entry is None:
+            entry = self.get_detail_data(request)
+            cache.set(cache_key, entry, timeout=settings.PROMPT_DETAIL_CACHE_TIMEOUT)
+        response = Response(entry['data'])
+        response['Last-Modified'] = http_date(int(entry['last_modified'].timestamp()))
+        return response
+
+    def get_detail_data(self, request):
+        """Returns {'data': ..., 'last_modified': ...} for the requested comment page."""
         instance = self.get_object()
+        # Comments are attached below as a paginated block, so skip the nested field.
         prompt_serializer = self.get_serializer(instance)
         prompt_data = prompt_serializer.data
         comments_queryset = instance.comments.all()
@@ -298,33 +442,45 @@ class PromptDetailView(generics.RetrieveUpdateDestroyAPIView):
              }
         prompt_data['comments'] = comments_data
         prompt_data.pop('comment_pagination', None)
-        return Response(prompt_data)
+        last_modified = max([instance.updated_at] + [comment.updated_at for comment in (page or [])])
+        return {'data': prompt_data, 'last_modified': last_modified}
 
 
 # --- Comment Views ---
 @method_decorator(ratelimit(key='ip', rate=GLOBAL_API_RATE, method='POST', block=True), name='dispatch')
-class CommentListCreateView(generics.ListCreateAPIView):
+class CommentListCreateView(ConditionalGetMixin, PaginationModeMixin, FastListMixin, generics.ListCreateAPIView):
     serializer_class = CommentSerializer
     pagination_class = StandardResultsSetPagination
+    fast_serializer = comment_fast # GET output, same JSON as CommentSerializer
+
+    def get_prompt(self):
+        """The parent prompt (404 if missing), looked up once per request."""
+        if not hasattr(self, '_prompt'):
+            self._prompt = get_object_or_404(Prompt.objects.only('prompt_id'), prompt_id=self.kwargs.get('prompt_id'))
+        return self._prompt
 
     def get_queryset(self):
-        prompt_id = self.kwargs.get('prompt_id')
-        get_object_or_404(Prompt, prompt_id=prompt_id)
-        return Comment.objects.filter(prompt_id=prompt_id)
+        return Comment.objects.filter(prompt=self.get_prompt())
 
-    def create(self, request, *args, **kwargs):
-        # --- ADD HARD LIMIT CHECK FOR COMMENTS ---
-        COMMENT_ROW_LIMIT = 500
-        if Comment.objects.count() >= COMMENT_ROW_LIMIT:
-            return Response(
-                {"detail": f"Cannot create new comment. The system has reached its maximum capacity of {COMMENT_ROW_LIMIT} comments."},
-                status=status.HTTP_403_FORBIDDEN # Or status.HTTP_503_SERVICE_UNAVAILABLE
-            )
-        # --- END HARD LIMIT CHECK ---
+    def get_keyset_ordering(self):
+        """Keys for ?pagination=cursor: newest first, comment_id breaks ties."""
+        return [F('created_at'), F('comment_id')], True
 
+    def get_validators(self, request):
+        etag, last_modified, self.known_count = get_queryset_validators(
+            self.get_queryset(), 'comment-list', request.build_absolute_uri()
+        )
+        return etag, last_modified
+
+    def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
+        # Hard limit check against the cached row counter (see capacity.py)
+        try:
+            with capacity.reserve(capacity.COMMENTS, request):
+                self.perform_create(serializer)
+        except capacity.CapacityExceeded as e:
+            return Response({"detail": str(e)}, status=status.HTTP_403_FORBIDDEN)
         instance = serializer.instance
         response_data = serializer.data
         response_data['modification_code'] = instance.modification_code
@@ -332,12 +488,10 @@ class CommentListCreateView(generics.ListCreateAPIView):
         return Response(response_data, status=status.HTTP_201_CREATED, headers=headers)
 
     def perform_create(self, serializer):
-        prompt_id = self.kwargs.get('prompt_id')
-        prompt = get_object_or_404(Prompt, prompt_id=prompt_id)
-        serializer.save(prompt=prompt)
+        serializer.save(prompt=self.get_prompt())
 
 @method_decorator(ratelimit(key='ip', rate=GLOBAL_API_RATE, method=['PUT', 'PATCH', 'DELETE'], block=True), name='dispatch')
-class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CommentDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     lookup_field = 'comment_id'
@@ -353,6 +507,16 @@ class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
         if instance.modification_code != code:
             raise PermissionDenied("Invalid modification code.") # Keep this for wrong code
 
+    def get_validators(self, request):
+        # A single comment is fully described by its updated_at. Unknown ids get no
+        # validators and fall through to the usual 404.
+        updated_at = Comment.objects.filter(
+            comment_id=self.kwargs['comment_id']
+        ).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return None, None
+        return make_etag('comment', self.kwargs['comment_id'], updated_at.isoformat()), updated_at
+
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
@@ -387,40 +551,153 @@ class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
 # --- Tag View ---
 # ... (Keep ALL existing TagListView code exactly the same) ...
 class TagListView(views.APIView):
+    """
+    Lists unique tags. Dedupe, counting, filtering and sorting all happen in SQL.
+
+    Query params: `prefix`, `min_count`, `limit`, `order=name|count` and
+    `with_counts=true` (returns `[{"tag": ..., "count": ...}]` instead of names).
+    """
     def get(self, request, *args, **kwargs):
-        all_tags_lists = Prompt.objects.exclude(tags__isnull=True).exclude(tags__len=0).values_list('tags', flat=True)
-        unique_tags = set()
-        for tag_list in all_tags_lists:
-            if tag_list:
-                unique_tags.update(tag for tag in tag_list if tag)
-        sorted_tags = sorted(list(unique_tags))
-        return Response(sorted_tags, status=status.HTTP_200_OK)
+        # Responses are cached under the current tags version, which only changes
+        # when some prompt's tags do. The ETag depends on nothing else, so
+        # revalidation is answered before touching the cache entry or the DB.
+        version = get_version(TAGS_VERSION)
+        etag = make_etag(TAGS_VERSION, version, request.get_full_path())
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        cache_key = make_key('tags', version, request.query_params)
+        data = cache.get(cache_key)
+        if data is None:
+            data = self.get_tag_data(request)
+            cache.set(cache_key, data, timeout=settings.TAGS_CACHE_TIMEOUT)
+        response = Response(data, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        return response
+
+    def get_tag_data(self, request):
+        params = request.query_params
+        order = params.get('order', 'name').lower()
+        if order not in ('name', 'count'):
+            raise ValidationError({'order': "Must be 'name' or 'count'."})
+        min_count = self._get_positive_int(params, 'min_count', default=1)
+        limit = self._get_positive_int(params, 'limit', default=None)
+
+        tag_counts = Prompt.objects.tag_counts(
+            prefix=params.get('prefix') or None,
+            min_count=min_count,
+            order=order,
+            limit=limit
+        )
+        if params.get('with_counts', '').lower() in ('1', 'true'):
+            return [{'tag': tag, 'count': count} for tag, count in tag_counts]
+        return [tag for tag, _ in tag_counts]
+
+    @staticmethod
+    def _get_positive_int(params, name, default):
+        value = params.get(name)
+        if value in (None, ''):
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            value = 0
+        if value < 1:
+            raise ValidationError({name: 'Must be a positive integer.'})
+        return value
 
 
 # --- Other Views ---
 class RandomPromptView(views.APIView):
-    # Keep original logic exactly as provided
+    """
+    Returns a random prompt with its latest comments, or with `?count=N` a list of
+    N random prompts (list shape). `?tags=a,b` restricts the draw to prompts with
+    any of those tags. Selection seeks the random_key index (see
+    PromptManager.random_sample), so the cost doesn't grow with the table.
+    """
+    max_count = 50
+    comment_page_size = 10
+
     def get(self, request, *args, **kwargs):
-        random_prompt = Prompt.objects.order_by('?').first()
-        if not random_prompt:
+        tags_query = request.query_params.get('tags', '')
+        tags_list = [tag.strip() for tag in tags_query.split(',') if tag.strip()]
+        count_query = request.query_params.get('count')
+
+        if count_query is not None:
+            try:
+                count = int(count_query)
+            except ValueError:
+                count = 0
+            if not 1 <= count <= self.max_count:
+                raise ValidationError({'count': f'Must be an integer between 1 and {self.max_count}.'})
+            prompts = Prompt.objects.random_sample(count=count, tags=tags_list)
+            return Response(PromptListSerializer(prompts, many=True).data, status=status.HTTP_200_OK)
+
+        picked = Prompt.objects.random_sample(count=1, tags=tags_list)
+        if not picked:
             return Response({"detail": "No prompts available."}, status=status.HTTP_404_NOT_FOUND)
+        random_prompt = picked[0]
 
-        comments_queryset = random_prompt.comments.all()[:10]
+        comments_queryset = random_prompt.comments.all()[:self.comment_page_size]
         comment_serializer = CommentSerializer(comments_queryset, many=True)
-        prompt_serializer = PromptSerializer(random_prompt) # Use original serializer
-        prompt_data = prompt_serializer.data
+        # Comments are attached below, so skip the nested serialization of all of them.
+        prompt_data = PromptDetailSerializer(random_prompt).data
         prompt_data['comments'] = comment_serializer.data # Use original comment handling
-        total_comments = random_prompt.comments.count()
+        total_comments = random_prompt.comment_count
         # Keep original pagination structure for this view
         prompt_data['comment_pagination'] = {
             'total_count': total_comments,
-            'page_size': 10,
-            'has_more': total_comments > 10
+            'page_size': self.comment_page_size,
+            'has_more': total_comments > self.comment_page_size
         }
         return Response(prompt_data, status=status.HTTP_200_OK)
 
 
+@method_decorator(ratelimit(key='ip', rate=GLOBAL_API_RATE, method='POST', block=True), name='dispatch')
+class BulkPromptCreateView(views.APIView):
+    """
+    Creates up to PROMPT_BULK_MAX_ITEMS prompts from a JSON list in one request.
+    Items are validated exactly like POST /api/prompts/; if any item is invalid
+    nothing is created and the response lists the errors per item (in order).
+    Valid batches are inserted with a single bulk_create in one transaction.
+    """
+    def post(self, request, *args, **kwargs):
+        serializer = PromptSerializer(
+            data=request.data, many=True, allow_empty=False, max_length=settings.PROMPT_BULK_MAX_ITEMS
+        )
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        items = serializer.validated_data
+        try:
+            with capacity.reserve(capacity.PROMPTS, request, amount=len(items)):
+                with transaction.atomic():
+                    prompts = Prompt.objects.create_many(items)
+        except capacity.CapacityExceeded as e:
+            return Response({"detail": str(e)}, status=status.HTTP_403_FORBIDDEN)
+
+        # bulk_create skips the post_save handlers, so invalidate here.
+        if any(prompt.tags for prompt in prompts):
+            bump_version(TAGS_VERSION)
+        response_data = [
+            {'prompt_id': prompt.prompt_id, 'modification_code': prompt.modification_code}
+            for prompt in prompts
+        ]
+        return Response(response_data, status=status.HTTP_201_CREATED)
+
+
 class BatchPromptView(views.APIView):
+    """
+    Returns the prompts for a list of ids, in the order requested (duplicates and
+    unknown or malformed ids are skipped), capped at PROMPT_BATCH_MAX_IDS ids.
+    `?include=latest_comments&n=3` attaches each prompt's newest comments, all
+    fetched with one windowed query.
+    """
+    default_comment_count = 3
+    max_comment_count = 10
+
     def post(self, request, *args, **kwargs):
         serializer = PromptBatchIdSerializer(data=request.data)
         if not serializer.is_valid():
@@ -428,29 +705,171 @@ class BatchPromptView(views.APIView):
 
         # Get the list of strings from the validated data
         potential_ids = serializer.validated_data.get('ids', [])
+        if len(potential_ids) > settings.PROMPT_BATCH_MAX_IDS:
+            raise ValidationError({'ids': f'Ensure this field has no more than {settings.PROMPT_BATCH_MAX_IDS} elements.'})
+        comment_count = self.get_comment_count(request)
 
-        # --- Filter for valid UUIDs ---
-        valid_prompt_ids = []
+        # --- Filter for valid UUIDs (deduplicated, first occurrence wins) ---
+        valid_prompt_ids = {}
         for item in potential_ids:
             try:
-                # Attempt to convert string to UUID
-                valid_uuid = uuid.UUID(item)
-                valid_prompt_ids.append(valid_uuid)
-            except (ValueError, TypeError):
+                valid_prompt_ids.setdefault(uuid.UUID(item), None)
+            except (ValueError, TypeError, AttributeError):
                 # Ignore items that are not valid UUID strings
                 continue
+        valid_prompt_ids = list(valid_prompt_ids)
         # --- End Filter ---
 
         # If no valid UUIDs remain after filtering, return empty list
         if not valid_prompt_ids:
             return Response([], status=status.HTTP_200_OK)
 
-        # Filter and annotate using only the valid UUIDs
-        prompts = Prompt.objects.filter(prompt_id__in=valid_prompt_ids).annotate(
-            comment_count=Count('comments')
+        # One `= ANY(array)` query for any number of ids: a single statement (and
+        # plan) instead of an IN (...) list per length. Rows are plain dicts for
+        # the fast serializers (same output as PromptListSerializer).
+        rows = Prompt.objects.filter(prompt_id__any=valid_prompt_ids).values(*prompt_list_fast.columns)
+        found = {row['prompt_id']: row for row in rows}
+        prompts = [found[prompt_id] for prompt_id in valid_prompt_ids if prompt_id in found]
+        latest_comments = self.get_latest_comments(list(found), comment_count) if comment_count else None
+
+        # The batch is a read, so it is revalidated like one: If-None-Match with the
+        # ETag of an unchanged result gets a 304 instead of the list. The rows are
+        # already loaded, so the validators cost no extra query.
+        etag_parts = [(p['prompt_id'], p['updated_at'].isoformat(), p['comment_count']) for p in prompts]
+        last_modified = max(p['updated_at'] for p in prompts) if prompts else None
+        if latest_comments is not None:
+            etag_parts.append(comment_count)
+            etag_parts.extend(
+                (c['comment_id'], c['updated_at'].isoformat()) for comments in latest_comments.values() for c in comments
+            )
+        etag = make_etag('prompt-batch', *etag_parts)
+
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            data = prompt_list_fast.serialize(prompts)
+            if latest_comments is not None:
+                for item, prompt in zip(data, prompts):
+                    item['latest_comments'] = comment_fast.serialize(latest_comments.get(prompt['prompt_id'], []))
+            response = Response(data, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(int(last_modified.timestamp()))
+        return response
+
+    def get_comment_count(self, request):
+        """Returns N for ?include=latest_comments (default 3), or 0 when not requested."""
+        include = [part.strip() for part in request.query_params.get('include', '').split(',')]
+        if 'latest_comments' not in include:
+            return 0
+        try:
+            count = int(request.query_params.get('n', self.default_comment_count))
+        except ValueError:
+            count = 0
+        if not 1 <= count <= self.max_comment_count:
+            raise ValidationError({'n': f'Must be an integer between 1 and {self.max_comment_count}.'})
+        return count
+
+    def get_latest_comments(self, prompt_ids, count):
+        """Returns {prompt_id: [newest comment rows]} for all prompts in one query."""
+        comments = Comment.objects.filter(prompt_id__in=prompt_ids).annotate(
+            row_number=Window(
+                RowNumber(), partition_by=F('prompt_id'), order_by=[F('created_at').desc(), F('comment_id').desc()]
+            )
+        ).filter(row_number__lte=count).order_by('prompt_id', 'row_number').values(*comment_fast.columns)
+        latest = {}
+        for comment in comments:
+            latest.setdefault(comment['prompt_id'], []).append(comment)
+        return latest
+
+
+def accepts_gzip(request):
+    """
+    Whether the request's Accept-Encoding allows gzip, honouring q-values
+    (`gzip;q=0` refuses it; `*` covers it when gzip isn't listed).
+    """
+    qualities = {}
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    quality = qualities.get('gzip', qualities.get('x-gzip', qualities.get('*', 0.0)))
+    return quality > 0
+
+
+@method_decorator(ratelimit(key='ip', rate=GLOBAL_API_RATE, method='GET', block=True), name='dispatch')
+class PromptExportView(PromptFilterMixin, views.APIView):
+    """
+    Streams every prompt matching the list view's `search`/`tags` filters as
+    newline-delimited JSON (one PromptListSerializer object per line), read
+    through a server-side cursor so memory use doesn't grow with the table.
+    `?include=comments` adds each prompt's comments (newest first), fetched
+    with one query per chunk of prompts. Compressed on the fly when the client
+    accepts gzip. Rows come out in table order: no sort, no OFFSET, no COUNT.
+    """
+    buffer_size = 64 * 1024 # bytes collected before each write to the client
+
+    def get(self, request, *args, **kwargs):
+        # Filters are validated here, before streaming starts, so errors are still 400s.
+        queryset, _ = self.filter_prompts(Prompt.objects.order_by(), fuzzy_operator=False)
+        include = [part.strip() for part in request.query_params.get('include', '').split(',')]
+        lines = self.iter_lines(queryset.values(*prompt_list_fast.columns), 'comments' in include)
+
+        gzip = accepts_gzip(request)
+        response = StreamingHttpResponse(
+            self.compress(lines) if gzip else self.buffer(lines), content_type='application/x-ndjson'
         )
-        response_serializer = PromptListSerializer(prompts, many=True)
-        return Response(response_serializer.data, status=status.HTTP_200_OK)
+        if gzip:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ['Accept-Encoding'])
+        response['Content-Disposition'] = 'attachment; filename="prompts.ndjson"'
+        return response
+
+    def iter_lines(self, rows, include_comments):
+        chunk_size = settings.PROMPT_EXPORT_CHUNK_SIZE
+        rows = rows.iterator(chunk_size=chunk_size)
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                return
+            data = prompt_list_fast.serialize(chunk)
+            if include_comments:
+                comments = {}
+                comment_rows = Comment.objects.filter(
+                    prompt_id__in=[row['prompt_id'] for row in chunk]
+                ).order_by('prompt_id', '-created_at').values(*comment_fast.columns)
+                for row in comment_rows:
+                    comments.setdefault(row['prompt_id'], []).append(row)
+                for item, row in zip(data, chunk):
+                    item['comments'] = comment_fast.serialize(comments.get(row['prompt_id'], []))
+            for item in data:
+                yield orjson.dumps(item, option=ORJSONRenderer.options) + b'\n'
+
+    def buffer(self, lines):
+        pending, size = [], 0
+        for line in lines:
+            pending.append(line)
+            size += len(line)
+            if size >= self.buffer_size:
+                yield b''.join(pending)
+                pending, size = [], 0
+        if pending:
+            yield b''.join(pending)
+
+    def compress(self, lines):
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) # wbits=31: gzip container
+        for block in self.buffer(lines):
+            compressed = compressor.compress(block)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
 
 
 # --- Root API View ---
@@ -477,6 +896,21 @@ class ApiRootView(views.APIView):
         response_status = status.HTTP_200_OK if db_status == "ok" else status.HTTP_503_SERVICE_UNAVAILABLE
         return Response(status_data, status=response_status)
 
+# --- Metrics View ---
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint (see api/metrics.py). Requires
+    `Authorization: Bearer <METRICS_TOKEN>`; without a METRICS_TOKEN it is only
+    served in DEBUG.
+    """
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        return HttpResponse("Metrics are disabled: set METRICS_TOKEN.", status=status.HTTP_403_FORBIDDEN, content_type="text/plain")
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse("Unauthorized", status=status.HTTP_401_UNAUTHORIZED, content_type="text/plain")
+    return HttpResponse(metrics.render(settings.METRICS_DIR), content_type="text/plain; version=0.0.4; charset=utf-8")
+# --- End Metrics View ---
+
 # --- ADD THE NEW ROOT VIEW FUNCTION ---
 def project_root_view(request):
     """
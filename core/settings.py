@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os                 
+import importlib.util
 from dotenv import load_dotenv
 import dj_database_url
 import ssl
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     # Third-party apps
     'rest_framework',
     'api',
@@ -50,6 +52,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.timing.ServerTimingMiddleware', # First, so its total covers the whole stack
+    'api.metrics.MetricsMiddleware', # Request counters and latency histograms for /metrics
+    'api.profiling.ProfilingMiddleware', # Only installed when PROFILING_ENABLED is on
     "django.middleware.security.SecurityMiddleware",
     'whitenoise.middleware.WhiteNoiseMiddleware',
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -60,6 +65,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     'django_ratelimit.middleware.RatelimitMiddleware',
+    'api.query_budget.QueryInspectionMiddleware', # Only active when QUERY_INSPECTION is on
     # 'whitenoise.middleware.WhiteNoiseMiddleware', # <<< REMOVE FROM HERE
 ]
 
@@ -114,7 +120,7 @@ REDIS_URL = os.environ.get('REDIS_URL')
 if REDIS_URL:
     CACHES = {
         "default": {
-            "BACKEND": "django_redis.cache.RedisCache",
+            "BACKEND": "api.cache_backends.TimedRedisCache", # RedisCache + Server-Timing hooks
             "LOCATION": REDIS_URL,
             "OPTIONS": {
                 "CLIENT_CLASS": "django_redis.client.DefaultClient",
@@ -130,7 +136,7 @@ else:
     # Fallback to local memory cache if REDIS_URL is not set
     CACHES = {
         'default': {
-            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'BACKEND': 'api.cache_backends.TimedLocMemCache', # LocMemCache + Server-Timing hooks
             'LOCATION': 'unique-snowflake', # Just needs a name
         }
     }
@@ -148,6 +154,93 @@ RATELIMIT_BLOCK = True
 RATELIMIT_VIEW = 'api.views.ratelimited_error' # Point to our custom function
 # --- END REPLACEMENT ---
 
+# --- Search ---
+# Minimum pg_trgm word similarity (0-1) for ?fuzzy=1 title matches.
+# Lower values tolerate more typos but return looser matches.
+SEARCH_FUZZY_THRESHOLD = float(os.environ.get('SEARCH_FUZZY_THRESHOLD', '0.5'))
+# --- End Search ---
+
+# --- Response Caching ---
+# Seconds a cached /api/tags/ response may live. Entries are also invalidated
+# whenever a prompt's tags change, so this only bounds memory use.
+TAGS_CACHE_TIMEOUT = int(os.environ.get('TAGS_CACHE_TIMEOUT', '3600'))
+# Seconds a cached prompt detail response (per comment page) may live. Writes to
+# the prompt or its comments retire entries immediately via a version counter.
+PROMPT_DETAIL_CACHE_TIMEOUT = int(os.environ.get('PROMPT_DETAIL_CACHE_TIMEOUT', '300'))
+# --- End Response Caching ---
+
+# --- Capacity ---
+# Hard row limits, enforced against a counter in the cache (see api/capacity.py).
+PROMPT_ROW_LIMIT = int(os.environ.get('PROMPT_ROW_LIMIT', '500'))
+COMMENT_ROW_LIMIT = int(os.environ.get('COMMENT_ROW_LIMIT', '500'))
+# Optional per-IP creation quotas per CAPACITY_IP_QUOTA_WINDOW seconds (0 = off).
+PROMPT_IP_QUOTA = int(os.environ.get('PROMPT_IP_QUOTA', '0'))
+COMMENT_IP_QUOTA = int(os.environ.get('COMMENT_IP_QUOTA', '0'))
+CAPACITY_IP_QUOTA_WINDOW = int(os.environ.get('CAPACITY_IP_QUOTA_WINDOW', '86400'))
+# Seconds before the cached row counts are recounted from the DB.
+CAPACITY_RECONCILE_INTERVAL = int(os.environ.get('CAPACITY_RECONCILE_INTERVAL', '300'))
+# Maximum number of prompts accepted by one POST /api/prompts/bulk/ request.
+PROMPT_BULK_MAX_ITEMS = int(os.environ.get('PROMPT_BULK_MAX_ITEMS', '1000'))
+# --- End Capacity ---
+
+# --- Query Inspection ---
+# In DEBUG, log requests over their query budget and repeated (N+1) statements;
+# see api/query_budget.py. Set to False to silence it during development.
+QUERY_INSPECTION = os.environ.get('QUERY_INSPECTION', 'True').lower() in ('1', 'true', 'yes')
+# Identical statements per request before they are reported as a likely N+1.
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', '3'))
+# --- End Query Inspection ---
+
+# --- Server Timing ---
+# Adds a Server-Timing header (db, cache, serialize, sanitize, total) to a
+# sample of responses; see api/timing.py. On by default only in DEBUG: the
+# header shows anyone how long the backend's internals take, so production
+# must opt in (ideally with a low sample rate, or SERVER_TIMING_LOG alone).
+SERVER_TIMING = os.environ.get('SERVER_TIMING', str(DEBUG)).lower() in ('1', 'true', 'yes')
+SERVER_TIMING_SAMPLE_RATE = float(os.environ.get('SERVER_TIMING_SAMPLE_RATE', '1.0'))
+# Also log each timed request as one JSON line on the 'api.timing' logger.
+SERVER_TIMING_LOG = os.environ.get('SERVER_TIMING_LOG', 'False').lower() in ('1', 'true', 'yes')
+# --- End Server Timing ---
+
+# --- Metrics ---
+# Request/latency/cache/DB metrics, served in Prometheus format at /metrics; see
+# api/metrics.py. With several worker processes, point METRICS_DIR at a
+# directory they share (and clear it on deploy) so scrapes cover all of them.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() in ('1', 'true', 'yes')
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+# Seconds between writes of a process's snapshot file.
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '5'))
+# /metrics requires `Authorization: Bearer <METRICS_TOKEN>`. Without a token it
+# is refused (403) unless DEBUG is on: it exposes per-route traffic and errors.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+# --- End Metrics ---
+
+# --- Request Profiling ---
+# Opt-in cProfile + sampled-stack captures of single requests; see
+# api/profiling.py and `manage.py profiles`. Off by default; when off the
+# middleware isn't installed at all.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False').lower() in ('1', 'true', 'yes')
+PROFILING_DIR = os.environ.get('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+# Requests carrying this header with a value from `manage.py profiles token` are profiled.
+PROFILING_HEADER = os.environ.get('PROFILING_HEADER', 'X-Profile')
+PROFILING_TOKEN_MAX_AGE = int(os.environ.get('PROFILING_TOKEN_MAX_AGE', '3600'))
+# Comma-separated route names (e.g. api:prompt-list-create) profiled on every request.
+PROFILING_ROUTES = [route for route in os.environ.get('PROFILING_ROUTES', '').split(',') if route]
+# Seconds between stack samples for the collapsed-stack (flamegraph) output.
+PROFILING_SAMPLE_INTERVAL = float(os.environ.get('PROFILING_SAMPLE_INTERVAL', '0.001'))
+# --- End Request Profiling ---
+
+# --- Batch Retrieval ---
+# Maximum number of ids accepted by one POST /api/prompts/batch/ request.
+PROMPT_BATCH_MAX_IDS = int(os.environ.get('PROMPT_BATCH_MAX_IDS', '400'))
+# --- End Batch Retrieval ---
+
+# --- Export ---
+# Rows fetched per round trip by GET /api/prompts/export/ (server-side cursor),
+# which is also the number of prompts whose comments are loaded per query.
+PROMPT_EXPORT_CHUNK_SIZE = int(os.environ.get('PROMPT_EXPORT_CHUNK_SIZE', '2000'))
+# --- End Export ---
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -194,6 +287,9 @@ STATICFILES_STORAGE = 'whitenoise.storage.StaticFilesStorage'
 # --- ADD THIS LINE TO SILENCE THE CHECK IN DEBUG MODE ---
 # This logic correctly depends on DEBUG, no change needed here
 SILENCED_SYSTEM_CHECKS = ['django_ratelimit.E003'] if DEBUG else []
+# The timed cache backends (api/cache_backends.py) subclass the stock ones, which
+# django-ratelimit doesn't recognise by name.
+SILENCED_SYSTEM_CHECKS.append('django_ratelimit.W001')
 # --- END ADDITION ---
 
 # Default primary key field type
@@ -275,9 +371,24 @@ if not DEBUG:
 
 
 # Django REST Framework Settings
+# orjson for JSON; MessagePack (application/msgpack) when the optional msgpack
+# package is installed; the browsable API only in DEBUG. See api/renderers.py.
+_MSGPACK_INSTALLED = importlib.util.find_spec('msgpack') is not None
+
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'EXCEPTION_HANDLER': 'api.exceptions.custom_exception_handler',
     # --- End Add ---
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        *(['api.renderers.MessagePackRenderer'] if _MSGPACK_INSTALLED else []),
+        *(['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.ORJSONParser',
+        *(['api.parsers.MessagePackParser'] if _MSGPACK_INSTALLED else []),
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
@@ -23,6 +23,7 @@ from api import views as api_views # Import the views from your api app
 # Define base URL patterns (always active)
 urlpatterns = [
     path('api/', include('api.urls')), # Your API urls
+    path('metrics', api_views.metrics_view, name='metrics'), # Prometheus scrape endpoint
 ]
 
 # Conditionally add the admin URL pattern if DEBUG is True